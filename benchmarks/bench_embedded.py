@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares peak memory and time to first byte of embedded job request bodies.
+
+The eager body is built as `Jobs.submit_embedded` used to: a data URI string per input, then the whole
+document encoded at once. The streamed body is a `JsonStream`, consumed block by block as the HTTP client
+sends it.
+
+Usage::
+
+    python benchmarks/bench_embedded.py [input-megabytes]
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from modzy._util import DataUri, JsonStream, encode_data_uri
+from modzy.codec import get_codec
+
+
+def body(inputs, encode):
+    return {
+        'model': {'identifier': 'ed542963de', 'version': '1.0.1'},
+        'explain': False,
+        'input': {'type': 'embedded', 'sources': {'job': {key: encode(value) for key, value in inputs.items()}}},
+    }
+
+
+def eager(inputs):
+    data = get_codec().encode(body(inputs, encode_data_uri))
+    yield data
+
+
+def streamed(inputs):
+    yield from JsonStream(body(inputs, DataUri))
+
+
+def measure(send, inputs):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    sent = 0
+    for block in send(inputs):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        sent += len(block)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return sent, first_byte, elapsed, peak
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    inputs = {'image': os.urandom(megabytes * 1024 * 1024), 'config': b'{"threshold": 0.5}'}
+    print('{} MB input'.format(megabytes))
+    for name, send in (('eager', eager), ('streamed', streamed)):
+        sent, first_byte, elapsed, peak = measure(send, inputs)
+        print('{:9} {:.0f} MB body, first byte {:7.1f} ms, total {:7.1f} ms, peak {:7.1f} MB'.format(
+            name, sent / 1e6, first_byte * 1e3, elapsed * 1e3, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measures the time taken by ``import modzy`` in fresh interpreters.
+
+Reports the median wall time of ``python -c "import modzy"`` minus the interpreter start up, the
+cumulative import time of the ``modzy`` package as measured by ``-X importtime`` and the heavy optional
+dependencies that got loaded.
+
+Usage::
+
+    python benchmarks/bench_import.py [runs]
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('grpc', 'google.protobuf', 'boto3', 'botocore', 'httpx')
+
+
+def wall_time(code, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_time(module, runs):
+    times = []
+    for _ in range(runs):
+        stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], check=True,
+                                stderr=subprocess.PIPE).stderr.decode()
+        for line in stderr.splitlines():
+            fields = [field.strip() for field in line.split('|')]
+            if len(fields) == 3 and fields[2] == module:
+                times.append(int(fields[1]) / 1e6)
+    return statistics.median(times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    baseline = wall_time('pass', runs)
+    code = 'import sys, modzy; print(" ".join(m for m in {!r} if m in sys.modules))'.format(HEAVY_MODULES)
+    loaded = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE).stdout.decode().split()
+    print('import modzy, wall time:        {:.0f} ms'.format((wall_time('import modzy', runs) - baseline) * 1e3))
+    print('import modzy, -X importtime:    {:.0f} ms'.format(import_time('modzy', runs) * 1e3))
+    print('  of which requests:            {:.0f} ms'.format(import_time('requests', runs) * 1e3))
+    print('heavy modules loaded:           {}'.format(', '.join(loaded) or 'none'))
+
+
+if __name__ == '__main__':
+    main()
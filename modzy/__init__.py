@@ -4,7 +4,27 @@
 import logging
 
 from .client import ApiClient  # noqa
-from .edge.client import EdgeClient
 __version__ = '0.11.6'
 
+# the asyncio and edge clients pull in httpx, grpc and protobuf, only import them when used
+_LAZY_ATTRIBUTES = {
+    'AsyncApiClient': '.aio',
+    'EdgeClient': '.edge.client',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
 logging.getLogger(__name__).addHandler(logging.NullHandler())
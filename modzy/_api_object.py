@@ -2,34 +2,148 @@
 
 import json
 import re
+from functools import lru_cache
 from keyword import iskeyword
 
+_CAMEL_CASE_BOUNDARY = re.compile('((?<=[a-z0-9])[A-Z]|(?!^)(?<!_)[A-Z](?=[a-z]))')
+_SAFE_ATTRIBUTE = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*$')
 
+# API responses use a small, fixed vocabulary of keys, so a bounded process-wide cache makes the
+# conversions effectively free after the first few responses
+
+
+@lru_cache(maxsize=4096)
 def to_snake_case(name):
-    return re.sub('((?<=[a-z0-9])[A-Z]|(?!^)(?<!_)[A-Z](?=[a-z]))', r'_\1', name).lower()
+    return _CAMEL_CASE_BOUNDARY.sub(r'_\1', name).lower()
 
 
+@lru_cache(maxsize=4096)
 def is_safe_attribute(name):
     if iskeyword(name):
         return False
-    return bool(re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', name))
+    return bool(_SAFE_ATTRIBUTE.match(name))
+
+
+def wrap_json(value):
+    """Wraps a decoded JSON document for attribute access.
+
+    Only the outermost level is converted; nested objects are wrapped when they are first accessed.
+    """
+    if type(value) is dict:
+        return ApiObject(value)
+    if type(value) is list:
+        # replacing the items in place frees each decoded object as soon as its wrapper is built
+        for index, item in enumerate(value):
+            value[index] = wrap_json(item)
+        return ApiList(value)
+    return value
+
+
+class ApiList(list):
+    """A JSON array whose object items have already been wrapped into `ApiObject` instances."""
+
+    def __init__(self, json_list):
+        super().__init__(wrap_json(item) for item in json_list)
 
 
 class ApiObject(dict):
     def __init__(self, json_obj, api_client=None):
         if api_client:
             object.__setattr__(self, '_api_client', api_client)
-        super().__init__(json_obj)
+        # copying item by item sizes the table for the keys; a plain copy keeps the source's table, which
+        # some decoders (orjson) over-allocate
+        super().__init__(dict.items(json_obj) if isinstance(json_obj, dict) else json_obj)
+
+    # nested JSON objects and arrays are wrapped on first access and stored back, so decoding a
+    # response does not have to build a wrapper for every nested object up front
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if type(value) is dict or type(value) is list:
+            value = wrap_json(value)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def _wrap_values(self):
+        for key, value in dict.items(self):
+            if type(value) is dict or type(value) is list:
+                dict.__setitem__(self, key, wrap_json(value))
+
+    def values(self):
+        self._wrap_values()
+        return dict.values(self)
+
+    def items(self):
+        self._wrap_values()
+        return dict.items(self)
+
+    def __iter__(self):
+        # overriding __iter__ makes dict(obj) and {**obj} read the values through __getitem__
+        return dict.__iter__(self)
+
+    def copy(self):
+        return ApiObject(self.items(), self.__dict__.get('_api_client'))
+
+    def _snake_case_keys(self):
+        # per instance index of snake_case name -> original key, rebuilt only when the key set changes
+        snake_case_keys = self.__dict__.get('_snake_case_index')
+        if snake_case_keys is None:
+            snake_case_keys = {}
+            for self_key in dict.__iter__(self):
+                if isinstance(self_key, str):
+                    # TODO: should we worry about duplicates? the first key wins
+                    snake_case_keys.setdefault(to_snake_case(self_key), self_key)
+            object.__setattr__(self, '_snake_case_index', snake_case_keys)
+        return snake_case_keys
+
+    def _invalidate_snake_case_keys(self):
+        self.__dict__.pop('_snake_case_index', None)
 
     def _find_equivalent_snake_case_key(self, key):
-        # TODO: should we worry about duplicates?
-        for self_key in self:
-            if isinstance(self_key, str):
-                snake_cased = to_snake_case(self_key)
-                if snake_cased == key:
-                    return self_key
-        raise AttributeError("'{}' object has no attribute '{}'"
-                             .format(self.__class__.__name__, key))
+        try:
+            return self._snake_case_keys()[key]
+        except KeyError:
+            raise AttributeError("'{}' object has no attribute '{}'"
+                                 .format(self.__class__.__name__, key)) from None
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._invalidate_snake_case_keys()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._invalidate_snake_case_keys()
+        dict.__delitem__(self, key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._invalidate_snake_case_keys()
+        return dict.setdefault(self, key, default)
+
+    def pop(self, *args):
+        self._invalidate_snake_case_keys()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._invalidate_snake_case_keys()
+        return dict.popitem(self)
+
+    def clear(self):
+        self._invalidate_snake_case_keys()
+        dict.clear(self)
+
+    def update(self, *args, **kwargs):
+        self._invalidate_snake_case_keys()
+        dict.update(self, *args, **kwargs)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
 
     def __getattr__(self, key):
         if key in self:
@@ -44,21 +158,17 @@ class ApiObject(dict):
         key = self._find_equivalent_snake_case_key(key)
         self[key] = value
 
-    def __delattr__(self, key, value):
+    def __delattr__(self, key):
         # should we not provide attribute deletion?
         if key in self:
             del self[key]
             return
         key = self._find_equivalent_snake_case_key(key)
-        del[key]
+        del self[key]
 
     def __dir__(self):
         items = set(super().__dir__())
-        for key in self:
-            if isinstance(key, str):
-                snake_cased = to_snake_case(key)
-                if is_safe_attribute(snake_cased):
-                    items.add(snake_cased)
+        items.update(snake_cased for snake_cased in self._snake_case_keys() if is_safe_attribute(snake_cased))
         return list(items)
 
     def __repr__(self):
@@ -1,7 +1,7 @@
 import re
 from enum import IntEnum
 
-SIZE_PATTERN = re.compile('^(\d+(\.\d+)?)([a-zA-Z]{0,2})$')
+SIZE_PATTERN = re.compile(r'^(\d+(\.\d+)?)([a-zA-Z]{0,2})$')
 
 
 class DataUnit(IntEnum):
@@ -22,4 +22,4 @@ class DataUnit(IntEnum):
 
 def human_read_to_bytes(human_size):
     match = SIZE_PATTERN.match(human_size)
-    return int(match.group(1))*DataUnit[match.group(3)]
+    return int(float(match.group(1))*DataUnit[match.group(3)])
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Incremental parsing of large JSON documents."""
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+_DEPTH = {'start_map': 1, 'start_array': 1, 'end_map': -1, 'end_array': -1}
+
+
+def iter_members(fp, sections, codec):
+    """Iterates over the members of some top level objects of a JSON document.
+
+    With `ijson` installed the document is parsed incrementally and only one member is held in
+    memory at a time, in document order. Otherwise the whole document is decoded with `codec` and the
+    members are yielded section by section.
+
+    Args:
+        fp (file): A binary file-like object with the JSON document.
+        sections (Iterable[str]): Keys of the top level objects to iterate over.
+        codec (JsonCodec): The codec used when `ijson` is not installed.
+
+    Yields:
+        Tuple[str, str, Any]: The section, the member's key and the member's decoded value.
+    """
+    sections = tuple(sections)
+    if ijson is None:
+        document = codec.decode(fp.read())
+        for section in sections:
+            members = document.get(section) if isinstance(document, dict) else None
+            for key, value in (members or {}).items():
+                yield section, key, value
+        return
+
+    sections = frozenset(sections)
+    # basic_parse doesn't compute the path of every event, so track the nesting depth here
+    events = ijson.basic_parse(fp, use_float=True)
+    depth = 0
+    section = None
+    for event, value in events:
+        if event == 'map_key':
+            if depth == 1:
+                section = value if value in sections else None
+            elif depth == 2 and section is not None:
+                yield section, value, _build(events)
+        else:
+            depth += _DEPTH.get(event, 0)
+
+
+def _build(events):
+    builder = ijson.ObjectBuilder()
+    add_event = builder.event
+    depth = 0
+    for event, value in events:
+        add_event(event, value)
+        depth += _DEPTH.get(event, 0)
+        if depth == 0:
+            return builder.value
+    raise ijson.IncompleteJSONError('unexpected end of document')
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""Parallel upload of job inputs."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_INFLIGHT_CHUNKS = 4
+
+
+class _ByteBudget:
+    # bounds the number of bytes read but not uploaded yet, shared by all the upload threads
+
+    def __init__(self, limit):
+        self._limit = limit
+        self._used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size, stop):
+        with self._condition:
+            # a chunk larger than the whole budget is still let through once nothing else is in flight
+            while self._used and self._used + size > self._limit:
+                if stop.is_set():
+                    return False
+                self._condition.wait(0.1)
+            self._used += size
+            return True
+
+    def release(self, size):
+        with self._condition:
+            self._used -= size
+            self._condition.notify_all()
+
+
+class InputUploader:
+    """Uploads the inputs of an open job, several at a time.
+
+    The chunks of one input are sent one after the other, in order, as the API appends them to the
+    input. Different inputs, of the same or different sources, are uploaded concurrently. On the first
+    failure no new chunk is sent, the uploads in flight are awaited and the error is raised.
+
+    Attributes:
+        max_inflight_chunks (int): Maximum number of chunks uploaded at the same time.
+        max_inflight_bytes (Optional[int]): Maximum number of bytes read and not uploaded yet.
+    """
+
+    def __init__(self, post_chunk, chunk_size, max_inflight_chunks=DEFAULT_MAX_INFLIGHT_CHUNKS,
+                 max_inflight_bytes=None):
+        """Creates an `InputUploader` instance.
+
+        Args:
+            post_chunk (Callable[[str, str, bytes], Any]): Uploads a chunk, given the source name, the
+                input name and the chunk.
+            chunk_size (int): The maximum size of a chunk.
+            max_inflight_chunks (int): Maximum number of chunks uploaded at the same time. 1 uploads the
+                inputs one after the other. Defaults to 4.
+            max_inflight_bytes (Optional[int]): Maximum number of bytes read and not uploaded yet. If None
+                is specified only `max_inflight_chunks` bounds the memory used. Defaults to None.
+        """
+        if max_inflight_chunks < 1:
+            raise ValueError("the max_inflight_chunks param should be a positive number")
+        self._post_chunk = post_chunk
+        self.chunk_size = chunk_size
+        self.max_inflight_chunks = max_inflight_chunks
+        self.max_inflight_bytes = max_inflight_bytes
+
+    def upload(self, inputs):
+        """Uploads inputs.
+
+        Args:
+            inputs (Iterable[Tuple[str, str, Iterable[bytes]]]): The source name, input name and chunks of
+                each input. Chunks are read lazily by the upload threads.
+
+        Raises:
+            Exception: The first error raised while reading or uploading a chunk.
+        """
+        inputs = list(inputs)
+        workers = min(self.max_inflight_chunks, len(inputs))
+        if workers <= 1:
+            for source_name, input_name, chunks in inputs:
+                for chunk in chunks:
+                    self._post_chunk(source_name, input_name, chunk)
+            return
+
+        stop = threading.Event()
+        budget = _ByteBudget(self.max_inflight_bytes) if self.max_inflight_bytes else None
+        errors = []
+
+        def upload_input(item):
+            source_name, input_name, chunks = item
+            try:
+                self._upload_input(source_name, input_name, chunks, budget, stop)
+            except BaseException as ex:
+                if not stop.is_set():
+                    errors.append(ex)
+                    stop.set()
+                logger.debug("upload of %s/%s failed: %s", source_name, input_name, ex)
+
+        with ThreadPoolExecutor(workers, thread_name_prefix='modzy-upload') as executor:
+            list(executor.map(upload_input, inputs))
+        if errors:
+            raise errors[0]
+
+    def _upload_input(self, source_name, input_name, chunks, budget, stop):
+        chunks = iter(chunks)
+        try:
+            while not stop.is_set():
+                if budget is not None and not budget.acquire(self.chunk_size, stop):
+                    return
+                try:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        return
+                    self._post_chunk(source_name, input_name, chunk)
+                finally:
+                    if budget is not None:
+                        budget.release(self.chunk_size)
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+
+class UploadJournal:
+    """Records the progress of resumable uploads in a directory, one JSON file per upload.
+
+    Files are replaced atomically, so a process killed while writing leaves the previous state behind.
+    """
+
+    def __init__(self, path):
+        """Creates an `UploadJournal` instance.
+
+        Args:
+            path (Union[str, os.PathLike]): The journal directory, created if needed.
+        """
+        self.path = os.fspath(path)
+
+    def load(self, key):
+        """Gets the state of an upload.
+
+        Args:
+            key (str): The upload key.
+
+        Returns:
+            Optional[dict]: The state, or None if there is no readable journal for this upload.
+        """
+        try:
+            with open(self._entry_path(key), 'rb') as file:
+                return json.loads(file.read())
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key, state):
+        """Stores the state of an upload.
+
+        Args:
+            key (str): The upload key.
+            state (dict): The state, JSON serializable.
+
+        Raises:
+            OSError: If the journal can't be written.
+        """
+        data = json.dumps(state).encode('utf-8')
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self._entry_path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def discard(self, key):
+        """Drops the state of an upload.
+
+        Args:
+            key (str): The upload key.
+        """
+        try:
+            os.unlink(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, '{}.json'.format(key))
+
+    def __repr__(self):
+        return "{}(path='{}')".format(self.__class__.__name__, self.path)
+
+
+def upload_key(model, version, explain, sources):
+    """Computes the key of an upload in an `UploadJournal`.
+
+    Args:
+        model (str): The model identifier.
+        version (str): The model version.
+        explain (bool): Whether an explainable result was requested.
+        sources (dict): The sources given to `Jobs.submit_file`.
+
+    Returns:
+        Optional[str]: A key that is the same when the same inputs are submitted again, or None if an input
+            can't be identified (a file-like object without a file name).
+    """
+    inputs = []
+    for source, source_inputs in sources.items():
+        for name, value in source_inputs.items():
+            identity = _input_identity(value)
+            if identity is None:
+                return None
+            inputs.append((source, name, identity))
+    inputs.sort()
+    return hashlib.sha256(json.dumps([model, version, bool(explain), inputs]).encode('utf-8')).hexdigest()[:32]
+
+
+def _input_identity(value):
+    # the uploaded part of a file is checked when resuming, this only tells inputs apart; in-memory
+    # inputs are hashed whole, as two of them can only be told apart by their content
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(value).hexdigest()
+    if not hasattr(value, 'read'):
+        return os.path.abspath(os.fspath(value))
+    name = getattr(value, 'name', None)
+    return os.path.abspath(name) if isinstance(name, str) else None
+
+
+def _prefix_digest(value, size):
+    # SHA-256 of the first `size` bytes of an input and whether more bytes follow, None if they can't be
+    # read again
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(memoryview(value)[:size]).hexdigest(), len(value) > size
+    if not hasattr(value, 'read'):
+        with open(value, 'rb') as file:
+            return _prefix_digest(file, size)
+    try:
+        position = value.tell()
+    except (AttributeError, OSError):
+        return None
+    hasher = hashlib.sha256()
+    remaining = size
+    while remaining > 0:
+        block = value.read(min(remaining, 1024 * 1024))
+        if not block:
+            break
+        hasher.update(block)
+        remaining -= len(block)
+    more = bool(value.read(1))
+    value.seek(position)
+    return (hasher.hexdigest(), more) if remaining <= 0 else None
+
+
+class InputChangedError(ValueError):
+    """Raised when an input no longer matches the part of it already uploaded."""
+
+
+class ResumableUpload:
+    """Tracks the chunks acknowledged by the API, so an interrupted upload can resume where it stopped.
+
+    The journal is updated after each acknowledged chunk, with the number of chunks and bytes uploaded
+    and a SHA-256 digest of those bytes. Before resuming, `matches` checks that the inputs still start
+    with the bytes uploaded; while resuming, the chunks already uploaded are read again and skipped, and
+    their digest is checked once more before the next chunk is sent.
+
+    Attributes:
+        broken (bool): True when the open job can't be resumed: an input changed or the journal couldn't
+            be written.
+    """
+
+    def __init__(self, journal, key, state):
+        """Creates a `ResumableUpload` instance.
+
+        Args:
+            journal (UploadJournal): The journal.
+            key (str): The upload key.
+            state (dict): The upload state, as stored in the journal.
+        """
+        self._journal = journal
+        self._key = key
+        self.state = state
+        self.broken = False
+        self._hashers = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, journal, key, job_identifier, chunk_size):
+        """Starts tracking a new upload.
+
+        Args:
+            journal (UploadJournal): The journal.
+            key (str): The upload key.
+            job_identifier (str): The identifier of the open job.
+            chunk_size (int): The chunk size, kept to split the inputs the same way when resuming.
+
+        Returns:
+            ResumableUpload: The upload.
+        """
+        upload = cls(journal, key, {'job_identifier': job_identifier, 'chunk_size': chunk_size, 'inputs': {}})
+        journal.save(key, upload.state)
+        return upload
+
+    def matches(self, sources):
+        """Checks that the inputs still start with the bytes already uploaded.
+
+        Args:
+            sources (dict): The sources given to `Jobs.submit_file`.
+
+        Returns:
+            bool: False if an input changed or can't be read again, the upload should then start over.
+        """
+        for source_name, inputs in self.state['inputs'].items():
+            for input_name, progress in inputs.items():
+                if not progress['chunks']:
+                    continue
+                value = sources.get(source_name, {}).get(input_name)
+                prefix = _prefix_digest(value, progress['bytes']) if value is not None else None
+                if prefix is None or prefix[0] != progress['sha256']:
+                    return False
+                # after a short chunk the input was complete, it can't have grown since
+                if prefix[1] and progress['bytes'] < progress['chunks'] * self.state['chunk_size']:
+                    return False
+        return True
+
+    def chunks(self, source_name, input_name, chunks):
+        """Skips the chunks of an input already uploaded.
+
+        Args:
+            source_name (str): The source name.
+            input_name (str): The input name.
+            chunks (Iterable[bytes]): All the chunks of the input.
+
+        Yields:
+            bytes: The chunks left to upload.
+
+        Raises:
+            InputChangedError: If the chunks already uploaded changed.
+        """
+        with self._lock:
+            progress = self._progress(source_name, input_name)
+            hasher = self._hashers[source_name, input_name] = hashlib.sha256()
+            uploaded, digest = progress['chunks'], progress['sha256']
+        skipped = 0
+        for chunk in chunks:
+            if skipped < uploaded:
+                hasher.update(chunk)
+                skipped += 1
+                if skipped == uploaded:
+                    self._check(source_name, input_name, hasher, digest)
+                continue
+            yield chunk
+        if skipped < uploaded:
+            self._check(source_name, input_name, hasher, digest)
+
+    def ack(self, source_name, input_name, chunk):
+        """Records an acknowledged chunk in the journal.
+
+        Args:
+            source_name (str): The source name.
+            input_name (str): The input name.
+            chunk (bytes): The chunk.
+
+        Raises:
+            OSError: If the journal can't be written.
+        """
+        with self._lock:
+            hasher = self._hashers[source_name, input_name]
+            hasher.update(chunk)
+            progress = self._progress(source_name, input_name)
+            progress['chunks'] += 1
+            progress['bytes'] += len(chunk)
+            progress['sha256'] = hasher.hexdigest()
+            try:
+                self._journal.save(self._key, self.state)
+            except OSError:
+                # the API has the chunk but the journal doesn't, resuming would send it twice
+                self.broken = True
+                raise
+
+    def discard(self):
+        """Drops the upload from the journal."""
+        self._journal.discard(self._key)
+
+    def _progress(self, source_name, input_name):
+        return self.state['inputs'].setdefault(source_name, {}).setdefault(
+            input_name, {'chunks': 0, 'bytes': 0, 'sha256': hashlib.sha256().hexdigest()})
+
+    def _check(self, source_name, input_name, hasher, digest):
+        if hasher.hexdigest() != digest:
+            self.broken = True
+            raise InputChangedError("the input {}/{} changed since its upload started, the upload can't be resumed"
+                                    .format(source_name, input_name))
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
+import json
+import mmap
 import pathlib
+import re
 import time
+import uuid
 from base64 import b64encode
 
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+from .error import BadRequestError, InternalServerError, NetworkError
+from .retry import RetryPolicy
 
-from .error import InternalServerError, NetworkError
+# the deployment progress endpoints can be briefly unavailable while a container is pulled or started
+_PROGRESS_RETRY = RetryPolicy(total=10, backoff_factor=0.5, backoff_max=10)
+# the load-process endpoint answers 400 until the container image is ready
+_LOAD_PROCESS_RETRY = RetryPolicy(total=10, backoff_factor=0.3, status_forcelist=[400],
+                                  allowed_methods=['POST'])
 
 
 def encode_data_uri(bytes_like, mimetype='application/octet-stream'):
@@ -15,6 +23,66 @@ def encode_data_uri(bytes_like, mimetype='application/octet-stream'):
     return data_uri
 
 
+class DataUri:
+    """A bytes-like input, sent as a base64 data URI by `JsonStream` without encoding it all at once."""
+
+    # a multiple of 3, so blocks encode to base64 without padding and can be concatenated
+    BLOCK_SIZE = 3 * 64 * 1024
+
+    __slots__ = ('data', 'prefix')
+
+    def __init__(self, bytes_like, mimetype='application/octet-stream'):
+        self.data = memoryview(bytes_like).cast('B')
+        self.prefix = 'data:{};base64,'.format(mimetype).encode('ascii')
+
+    def __len__(self):
+        return len(self.prefix) + (len(self.data) + 2) // 3 * 4
+
+    def __iter__(self):
+        yield self.prefix
+        for offset in range(0, len(self.data), self.BLOCK_SIZE):
+            yield b64encode(self.data[offset:offset + self.BLOCK_SIZE])
+
+
+class JsonStream:
+    """A JSON request body encoded while it is sent.
+
+    The `DataUri` values of `json_obj` are base64 encoded block by block, so sending the body takes a
+    fixed amount of memory whatever the size of the inputs. Its length is known up front, which lets the
+    request carry a ``Content-Length``, and it can be iterated again when a request is retried.
+    """
+
+    def __init__(self, json_obj):
+        token = 'modzy-data-uri-{}-'.format(uuid.uuid4().hex)
+        data_uris = []
+
+        def replace(value):
+            if isinstance(value, DataUri):
+                data_uris.append(value)
+                return '{}{}'.format(token, len(data_uris) - 1)
+            if isinstance(value, dict):
+                return {key: replace(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [replace(item) for item in value]
+            return value
+
+        pieces = re.split(re.escape(token) + r'(\d+)', json.dumps(replace(json_obj), separators=(',', ':')))
+        self._parts = [piece.encode('utf-8') if i % 2 == 0 else data_uris[int(piece)]
+                       for i, piece in enumerate(pieces)]
+        self._length = sum(map(len, self._parts))
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for part in self._parts:
+            if isinstance(part, bytes):
+                if part:
+                    yield part
+            else:
+                yield from part
+
+
 def file_to_bytes(file_like):
     if hasattr(file_like, 'read'):  # File-like object
         if hasattr(file_like, 'seekable') and file_like.seekable():
@@ -40,8 +108,8 @@ def file_to_bytes(file_like):
 
 
 def file_to_chunks(file_like, chunk_size):
-    file = None
-    should_close = False
+    # chunks are memoryviews, only valid until the next one is requested: mapped files and file objects are
+    # read without copies, into the same buffer, so an upload takes a few chunk sizes of memory at most
     if not hasattr(file_like, 'read'):
         if hasattr(file_like, '__fspath__'):  # os.PathLike
             path = file_like.__fspath__()
@@ -49,32 +117,93 @@ def file_to_chunks(file_like, chunk_size):
             path = str(file_like)
         else:
             path = file_like
-        file = open(path, 'rb')
-        should_close = True
-    else:
-        file = file_like
+        with open(path, 'rb') as file:
+            try:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):  # empty or not a regular file
+                yield from _read_chunks(file, chunk_size)
+            else:
+                yield from _mapped_chunks(mapped, chunk_size)
+        return
+
+    if hasattr(file_like, 'seekable') and file_like.seekable():
+        file_like.seek(0)
+    yield from _read_chunks(file_like, chunk_size)
 
-    if hasattr(file, 'seekable') and file.seekable():
-        file.seek(0)
 
+def _mapped_chunks(mapped, chunk_size):
+    view = memoryview(mapped)
+    try:
+        for offset in range(0, len(view), chunk_size):
+            chunk = view[offset:offset + chunk_size]
+            try:
+                yield chunk
+            finally:
+                _release(chunk)
+    finally:
+        _release(view)
+        try:
+            mapped.close()
+        except BufferError:  # a chunk is still exported, the map is closed once it is collected
+            pass
+
+
+def _read_chunks(file, chunk_size):
+    readinto = getattr(file, 'readinto', None)
+    if readinto is None:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            elif not isinstance(chunk, bytes):
+                raise TypeError("the file object's 'read' function must return bytes not {}; "
+                                "files should be opened using binary mode 'rb'"
+                                .format(type(chunk).__name__))
+            yield chunk
+        return
+
+    buffer = memoryview(bytearray(chunk_size))
     while True:
-        chunk = file.read(chunk_size)
-        if not chunk:
+        # fill the whole buffer, raw and non-blocking streams can return short reads
+        size = 0
+        while size < chunk_size:
+            read = readinto(buffer[size:])
+            if not read:
+                break
+            size += read
+        if not size:
             break
-        elif not isinstance(chunk, bytes):
-            raise TypeError("the file object's 'read' function must return bytes not {}; "
-                            "files should be opened using binary mode 'rb'"
-                            .format(type(chunk).__name__))
-        else:
+        chunk = buffer[:size]
+        try:
             yield chunk
+        finally:
+            _release(chunk)
+        if size < chunk_size:
+            break
+
 
-    if should_close:
-        file.close()
+def _release(view):
+    try:
+        view.release()
+    except BufferError:  # still exported by the caller
+        pass
 
 
 def bytes_to_chunks(byte_array, chunk_size):
-    for i in range(0, len(byte_array), chunk_size):
-        yield byte_array[i:i + chunk_size]
+    view = memoryview(byte_array)
+    for i in range(0, len(view), chunk_size):
+        yield view[i:i + chunk_size]
+
+
+def data_size(value):
+    # the size of an input once sent, text is sent UTF-8 encoded; 0 for values that aren't data
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return 0
 
 
 def depth(d):
@@ -93,13 +222,8 @@ def load_model(client, logger, identifier, version):
     # Before loading the model we need to ensure that it has been pulled.
     percentage = -1
     while percentage < 100:
-        try:
-            res = client.http.get(f"/models/{identifier}/versions/{version}/container-image")
-            new_percentage = res.get("percentage")
-        except NetworkError:
-            continue
-        except InternalServerError:
-            continue
+        res = client.http.get(f"/models/{identifier}/versions/{version}/container-image", retry=_PROGRESS_RETRY)
+        new_percentage = res.get("percentage")
 
         if new_percentage != percentage:
             logger.info(f'Loading model at {new_percentage}%')
@@ -108,20 +232,9 @@ def load_model(client, logger, identifier, version):
 
         time.sleep(1)
 
-    retry_strategy = Retry(
-        total=10,
-        backoff_factor=0.3,
-        status_forcelist=[400],
-        allowed_methods=frozenset(['POST']),
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    client.http.session.mount('https://', adapter)
-
     try:
-        res = client.http.post(f"/models/{identifier}/versions/{version}/load-process")
-    except NetworkError:
-        return
-    except InternalServerError:
+        res = client.http.post(f"/models/{identifier}/versions/{version}/load-process", retry=_LOAD_PROCESS_RETRY)
+    except (NetworkError, BadRequestError, InternalServerError):
         return
 
     logger.info(f'Loading container image took [{1000 * (time.time() - start)} ms]')
@@ -144,11 +257,8 @@ def run_model(client, logger, identifier, version):
 
     percentage = -1
     while percentage < 100:
-        try:
-            res = client.http.get(f"/models/{identifier}/versions/{version}/run-process")
-            new_percentage = res.get('percentage')
-        except NetworkError:
-            continue
+        res = client.http.get(f"/models/{identifier}/versions/{version}/run-process", retry=_PROGRESS_RETRY)
+        new_percentage = res.get('percentage')
 
         if new_percentage != percentage:
             logger.info(f'Running model at {new_percentage}%')
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""Modzy asyncio API Client."""
+
+from .client import AsyncApiClient  # noqa
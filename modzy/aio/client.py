@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""The asyncio API client implementation."""
+
+import asyncio
+import logging
+
+from .http import AsyncHttpClient
+from .jobs import AsyncJobs
+from .models import AsyncModels
+from .results import AsyncResults
+from .tags import AsyncTags
+from ..error import ApiError, NetworkError, ServerError
+from ..polling import EtaSchedule
+
+
+class AsyncApiClient:
+    """The asyncio API client object.
+
+    This class is used to interact with the Modzy API from `asyncio` code. It mirrors
+    :py:class:`modzy.ApiClient`, but every method that talks to the API is a coroutine, so
+    thousands of jobs can be submitted and tracked concurrently on a single event loop::
+
+        async with AsyncApiClient(base_url='https://path/to/api', api_key='my-api-key') as client:
+            job = await client.jobs.submit_text('my-model', '1.0.0', {'input.txt': 'some text'})
+            job = await client.jobs.block_until_complete(job)
+            result = await client.results.get(job)
+
+    The returned `Job`, `Result`, `Model` and `Tag` objects are the same types returned by the
+    blocking client. Their helper methods that call back into the API (``job.sync()``,
+    ``result.block_until_complete()``...) are only supported by the blocking client; use the
+    coroutines on this client instead.
+
+    Failed requests are retried according to a `RetryPolicy`, as by the blocking client.
+
+    Attributes:
+        base_url (str): The base url for the API.
+        api_key (str): The API key used for authentication.
+        http (AsyncHttpClient): `AsyncHttpClient` object used for making direct HTTP calls.
+        models (AsyncModels): `AsyncModels` object used to interact with models.
+        jobs (AsyncJobs): `AsyncJobs` object used to interact with jobs.
+        results (AsyncResults): `AsyncResults` object used to interact with results.
+        tags (AsyncTags): `AsyncTags` object used to interact with tags.
+        poll_schedule (PollSchedule): The schedule of the polls made while waiting on jobs and results.
+    """
+
+    def __init__(self, base_url, api_key, cert=None, max_connections=100, poll_schedule=None, retry_policy=None):
+        """Creates an `AsyncApiClient` instance.
+
+        No network request is made here; the base url is checked on the first request.
+
+        Args:
+            base_url (str): The base url for the API.
+            api_key (str): The API key to use for authentication.
+            cert (str): A path to a CA bundle used to verify the server certificate.
+            max_connections (int): Maximum number of concurrent connections. Defaults to 100.
+            poll_schedule (Optional[PollSchedule]): When to poll while waiting on jobs and results without an
+                explicit poll interval. If None is specified an `EtaSchedule` is used. Defaults to None.
+            retry_policy (Optional[RetryPolicy]): The policy used to retry failed requests. If None is
+                specified the default `RetryPolicy` is used, as by the blocking client. Defaults to None.
+        """
+        self.logger = logging.getLogger(__name__)
+        if base_url is None or base_url == "":
+            raise ValueError("Cannot initialize the modzy client: "
+                             "the base_url param should be a valid not empty string")
+        if api_key is None or api_key == "":
+            raise ValueError("Cannot initialize the modzy client: "
+                             "the api_key param should be a valid not empty string")
+        self.base_url = base_url
+        self.api_key = api_key
+        self.cert = cert
+        self.poll_schedule = poll_schedule if poll_schedule is not None else EtaSchedule()
+        self._checked = False
+        self._check_lock = None
+
+        self.http = AsyncHttpClient(self, max_connections=max_connections, retry_policy=retry_policy)
+
+        self.models = AsyncModels(self)
+        self.jobs = AsyncJobs(self)
+        self.results = AsyncResults(self)
+        self.tags = AsyncTags(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """Closes the client's HTTP connections."""
+        await self.http.aclose()
+
+    async def check_client(self):
+        """Checks that the base url points to a valid API endpoint.
+
+        If the base url answers but not as the API, a second attempt is made with an ``api/`` suffix as
+        the blocking client does. When the check fails the base url is left unchanged.
+
+        Raises:
+            ValueError: The base url or api key are not valid.
+            NetworkError: The API can't be reached.
+            ServerError: The API failed to answer.
+        """
+        self.logger.debug("Checking base_url %s", self.base_url)
+        base_url = self.base_url
+        try:
+            await self.http._request('GET', '/models', params={'per-page': 1})
+        except (NetworkError, ServerError):
+            raise
+        except ApiError as ex:
+            if self.base_url.endswith('api') or self.base_url.endswith('api/'):
+                raise ValueError("Cannot initialize the modzy client: the base_url param should point to a valid API "
+                                 "endpoint and the api_key should be a valid key for the env") from ex
+            self.base_url = self.base_url + ("" if self.base_url.endswith("/") else "/") + "api/"
+            try:
+                await self.http._request('GET', '/models', params={'per-page': 1})
+            except ApiError as retry_ex:
+                self.base_url = base_url
+                if isinstance(retry_ex, (NetworkError, ServerError)):
+                    raise
+                raise ValueError("Cannot initialize the modzy client: the base_url param should point to a valid "
+                                 "API endpoint and the api_key should be a valid key for the env") from retry_ex
+        self._checked = True
+
+    async def _ensure_checked(self):
+        if self._checked:
+            return
+        if self._check_lock is None:
+            self._check_lock = asyncio.Lock()
+        async with self._check_lock:
+            if not self._checked:
+                await self.check_client()
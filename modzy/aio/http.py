@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""The asyncio HTTP client implementation."""
+
+import asyncio
+import logging
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+from .._api_object import wrap_json
+from ..codec import get_codec
+from ..error import NetworkError, _create_response_error
+from ..http import _NO_RETRIES, _file_positions, _rewind_files, _urlappend
+from ..retry import RetryPolicy
+
+
+class AsyncHttpClient:
+    """The asyncio HTTP Client object.
+
+    This object is the `asyncio` counterpart of :py:class:`modzy.http.HttpClient`. It is
+    responsible for making the actual HTTP requests to the API using a shared `httpx.AsyncClient`,
+    so any number of requests can be in flight on a single event loop.
+
+    This class should not be instantiated directly but rather accessed through the `http`
+    attribute of an `AsyncApiClient` instance.
+
+    Attributes:
+        session (httpx.AsyncClient): The httpx `AsyncClient` used to make HTTP requests.
+        retry_policy (RetryPolicy): The policy used to retry failed requests.
+    """
+
+    def __init__(self, api_client, session=None, max_connections=100, max_keepalive_connections=20, codec=None,
+                 retry_policy=None):
+        """Creates an `AsyncHttpClient` instance.
+
+        Args:
+            api_client (AsyncApiClient): An `AsyncApiClient` instance.
+            session (Optional[httpx.AsyncClient]): An httpx `AsyncClient` used to make HTTP requests.
+                If None is specified one will be created. Defaults to None.
+            max_connections (int): Maximum number of concurrent connections when creating
+                the session. Defaults to 100.
+            max_keepalive_connections (int): Maximum number of idle connections kept alive when
+                creating the session. Defaults to 20.
+            codec (Optional[Union[str, JsonCodec]]): The JSON codec, or codec name, used to encode request
+                bodies and decode responses. If None is specified the fastest installed codec is used.
+            retry_policy (Optional[RetryPolicy]): The policy used to retry failed requests. If None is
+                specified the default `RetryPolicy` is used. Defaults to None.
+        """
+        if session is None:
+            if httpx is None:
+                raise ImportError("the asyncio client requires the 'httpx' package; "
+                                  "install it with `pip install modzy-sdk[async]`")
+            limits = httpx.Limits(max_connections=max_connections,
+                                  max_keepalive_connections=max_keepalive_connections)
+            verify = api_client.cert if api_client.cert is not None else True
+            session = httpx.AsyncClient(limits=limits, verify=verify, timeout=None)
+        self._api_client = api_client
+        self.session = session
+        self.codec = get_codec(codec)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.logger = logging.getLogger(__name__)
+
+    async def aclose(self):
+        """Closes the underlying session and releases its connections."""
+        await self.session.aclose()
+
+    async def request(self, method, url, json_data=None, file_data=None, params=None, retry=None):
+        """Sends an HTTP request.
+
+        The client's API key will automatically be used for authentication. Failed requests are
+        retried according to the client's `retry_policy`, as by the blocking client.
+
+        Args:
+            method (str): The HTTP method for the request.
+            url (str): URL to request.
+            json_data (Optional[Any]): JSON serializeable object to include in the request body.
+            file_data (Optional[Any]): Dictionary to be submitted as files part of the request
+            params (Optional[dict]): Query string parameters.
+            retry (Optional[Union[RetryPolicy, bool]]): Retry policy for this call. None uses the
+                client's `retry_policy`, False disables retries. Defaults to None.
+
+        Returns:
+            dict: JSON object deserialized from the response body.
+
+        Raises:
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+        """
+        await self._api_client._ensure_checked()
+        return await self._request(method, url, json_data=json_data, file_data=file_data, params=params,
+                                   retry=retry)
+
+    async def _request(self, method, url, json_data=None, file_data=None, params=None, retry=None):
+        url = _urlappend(self._api_client.base_url, url)
+
+        if json_data:
+            data = self.codec.encode(json_data)
+        else:
+            data = None
+
+        headers = {'Accept': 'application/json'}
+        if self._api_client.api_key:
+            headers['Authorization'] = 'ApiKey {}'.format(self._api_client.api_key)
+        if json_data is not None:
+            headers['Content-Type'] = 'application/json'
+        self.logger.debug("%s: %s - [%s]", method, url, self._api_client.cert)
+
+        response = await self._send(method, url, self._get_retry_policy(retry), content=data, headers=headers,
+                                    files=file_data, params=params)
+
+        try:
+            json_data = wrap_json(self.codec.decode(response.content))
+        except ValueError:
+            if len(response.content) > 0:
+                json_data = None
+            else:
+                json_data = {}
+
+        if not (200 <= response.status_code < 300):
+            message = None
+            if hasattr(json_data, 'get'):
+                message = json_data.get('message')
+            if not message:
+                message = 'HTTP Error {}: {}'.format(response.status_code, response.reason_phrase)
+            raise _create_response_error(str(message), url, response)
+
+        if json_data is None:
+            raise _create_response_error('API did not return valid JSON.', url, response)
+
+        return json_data
+
+    def _get_retry_policy(self, retry):
+        if retry is None:
+            return self.retry_policy
+        if retry is False:
+            return _NO_RETRIES
+        if retry is True:
+            return RetryPolicy()
+        return retry
+
+    async def _send(self, method, url, policy, files=None, **kwargs):
+        rewind = _file_positions(files)
+        retries = 0
+        while True:
+            try:
+                response = await self.session.request(method, url, files=files, **kwargs)
+                self.logger.debug("response %s - length %s", response.status_code, len(response.content))
+            except httpx.HTTPError as ex:
+                if retries < policy.total and rewind is not None and _is_retryable_error(policy, method, ex):
+                    delay = policy.get_backoff(retries)
+                    self.logger.warning("%s %s failed (%s), retrying in %.2fs", method, url, ex, delay)
+                else:
+                    self.logger.exception('unable to make network request')
+                    raise NetworkError(str(ex), url, reason=ex)
+            else:
+                if (200 <= response.status_code < 300 or retries >= policy.total or rewind is None
+                        or not policy.is_retryable_status(method, response.status_code)):
+                    return response
+                delay = policy.get_backoff(retries, response)
+                self.logger.warning("%s %s returned %s, retrying in %.2fs", method, url, response.status_code, delay)
+            await asyncio.sleep(delay)
+            retries += 1
+            _rewind_files(rewind)
+
+    async def get(self, url, retry=None):
+        """Sends a GET request.
+
+        See:
+            :py:meth:`request`
+        """
+        return await self.request('GET', url, retry=retry)
+
+    async def post(self, url, json_data=None, file_data=None, params=None, retry=None):
+        """Sends a POST request.
+
+        See:
+            :py:meth:`request`
+        """
+        return await self.request('POST', url, json_data=json_data, file_data=file_data, params=params,
+                                  retry=retry)
+
+    async def patch(self, url, json_data=None, retry=None):
+        """Sends a PATCH request.
+
+        See:
+            :py:meth:`request`
+        """
+        return await self.request('PATCH', url, json_data=json_data, retry=retry)
+
+    async def put(self, url, json_data=None, retry=None):
+        """Sends a PUT request.
+
+        See:
+            :py:meth:`request`
+        """
+        return await self.request('PUT', url, json_data=json_data, retry=retry)
+
+    async def delete(self, url, json_data=None, retry=None):
+        """Sends a DELETE request.
+
+        See:
+            :py:meth:`request`
+        """
+        return await self.request('DELETE', url, json_data=json_data, retry=retry)
+
+
+def _is_retryable_error(policy, method, error):
+    # the httpx counterpart of RetryPolicy.is_retryable_error
+    if method.upper() in policy.allowed_methods:
+        return isinstance(error, httpx.TransportError)
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Coroutines for interacting with jobs."""
+
+import asyncio
+import logging
+
+from .._size import human_read_to_bytes
+from .._util import bytes_to_chunks, depth, encode_data_uri, file_to_chunks
+from ..jobs import Job, Jobs
+from ..models import Model
+from ..polling import get_schedule
+
+
+def _fix_single_source_job(sources):
+    """Compatibility function to check and fix the sources parameter if is a single source dict
+
+    Args:
+        sources (dict): a single of double source dict
+
+    Returns:
+        dict: a properly formatted sources dictionary
+
+    """
+    dict_levels = depth(sources)
+    if dict_levels == 1:
+        return {'job': sources}
+    else:
+        return sources
+
+
+class AsyncJobs:
+    """The `AsyncJobs` object.
+
+    This object is the `asyncio` counterpart of :py:class:`modzy.jobs.Jobs`.
+
+    Note:
+        This class should not be instantiated directly but rather accessed through the `jobs`
+        attribute of an `AsyncApiClient` instance.
+    """
+
+    _base_route = '/jobs'
+
+    status = Jobs.status
+    """Possible job statuses."""
+
+    def __init__(self, api_client):
+        """Creates an `AsyncJobs` instance.
+
+        Args:
+            api_client (AsyncApiClient): An `AsyncApiClient` instance.
+        """
+        self._api_client = api_client
+        self.logger = logging.getLogger(__name__)
+
+    async def get(self, job):
+        """Gets a `Job` instance.
+
+        See:
+            :py:meth:`modzy.jobs.Jobs.get`
+        """
+        self.logger.debug("getting job %s", job)
+        identifier = Job._coerce_identifier(job)
+        json_obj = await self._api_client.http.get('{}/{}'.format(self._base_route, identifier))
+        return Job(json_obj, self._api_client)
+
+    async def cancel(self, job):
+        """Attempts to cancel a `Job`.
+
+        See:
+            :py:meth:`modzy.jobs.Jobs.cancel`
+        """
+        identifier = Job._coerce_identifier(job)
+        self.logger.debug("canceling job %s", job)
+        json_obj = await self._api_client.http.delete('{}/{}'.format(self._base_route, identifier))
+        return Job(json_obj, self._api_client)
+
+    async def block_until_complete(self, job, timeout=60, poll_interval=None):
+        """Waits until the `Job` completes or a timeout is reached.
+
+        Unlike :py:meth:`modzy.jobs.Jobs.block_until_complete` this does not block the event loop
+        between polls, so any number of jobs can be awaited concurrently.
+
+        Args:
+            job (Union[str, Job, Result]): The job identifier or a `Job` or `Result` instance.
+            timeout (Optional[float]): Seconds to wait until timeout. `None` indicates wait forever.
+                Defaults to 60.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls, or a `PollSchedule`.
+                If None is specified the client's `poll_schedule` is used. Defaults to None.
+
+        Returns:
+            Job: The `Job` instance.
+
+        Raises:
+            Timeout: The `Job` did not complete before the timeout was reached.
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+        """
+        identifier = Job._coerce_identifier(job)
+        wait = get_schedule(poll_interval, self._api_client).wait(timeout)
+        progress = job if isinstance(job, dict) else None
+        while True:  # wait one poll at least once
+            await asyncio.sleep(wait.next_delay(progress))
+            job = progress = await self.get(identifier)
+            self.logger.debug("job %s", job)
+            if job.status not in (Jobs.status.SUBMITTED, Jobs.status.IN_PROGRESS):
+                wait.done(job)
+                return job
+
+    async def submit_text(self, model, version, sources, explain=False):
+        """Submits text data for a multiple source `Job`.
+
+        See:
+            :py:meth:`modzy.jobs.Jobs.submit_text`
+        """
+        identifier = Model._coerce_identifier(model)
+        version = str(version)
+        body = {
+            "model": {
+                "identifier": identifier,
+                "version": version
+            },
+            "explain": explain,
+            "input": {
+                "type": "text",
+                "sources": _fix_single_source_job(sources)
+            }
+        }
+        response = await self._api_client.http.post(self._base_route, body)
+        return Job(response, self._api_client)
+
+    async def submit_embedded(self, model, version, sources, explain=False):
+        """Submits embedded data for a multiple source `Job`.
+
+        See:
+            :py:meth:`modzy.jobs.Jobs.submit_embedded`
+        """
+        identifier = Model._coerce_identifier(model)
+        version = str(version)
+        sources = {
+            source: {
+                key: encode_data_uri(value)
+                for key, value in inputs.items()
+            }
+            for source, inputs in sources.items()
+        }
+        body = {
+            "model": {
+                "identifier": identifier,
+                "version": version
+            },
+            "explain": explain,
+            "input": {
+                "type": "embedded",
+                "sources": _fix_single_source_job(sources)
+            }
+        }
+        response = await self._api_client.http.post(self._base_route, body)
+        return Job(response, self._api_client)
+
+    async def submit_file(self, model, version, sources, explain=False):
+        """Submits filepath or file-like data for a multiple source `Job`.
+
+        Files are read in a worker thread so reading large inputs does not block the event loop.
+
+        See:
+            :py:meth:`modzy.jobs.Jobs.submit_file`
+        """
+        identifier = Model._coerce_identifier(model)
+        version = str(version)
+        body = {
+            "model": {
+                "identifier": identifier,
+                "version": version
+            },
+            "explain": explain
+        }
+        # Open the job with an empty call to the job api
+        open_job = Job(await self._api_client.http.post(self._base_route, body), self._api_client)
+        self.logger.debug("open job %s", open_job)
+        try:
+            job_features = await self.get_features()
+            chunk_size = human_read_to_bytes(job_features["input_chunk_maximum_size"])
+        except Exception:
+            self.logger.warning("Error getting features, assuming defaults")
+            chunk_size = 1024 * 1024
+
+        try:
+            for source, inputs in _fix_single_source_job(sources).items():
+                for key, value in inputs.items():
+                    await self._append_input(open_job, source, key, value, chunk_size)
+
+            open_job = await self._api_client.http.post(
+                '{}/{}/close'.format(self._base_route, open_job.job_identifier))
+            self.logger.debug("close job %s", open_job)
+        except BaseException:
+            try:
+                # Try to cancel the job as something unexpected happened, ignore any error if something bad happen
+                # with this call in order to pass the real cause to the caller
+                self.logger.debug("canceling job %s", open_job)
+                await self.cancel(open_job)
+            except Exception:
+                pass
+            raise
+        return Job(open_job, self._api_client)
+
+    async def _append_input(self, job, input_item_name, data_item_name, input_value, chunk_size):
+        if isinstance(input_value, (bytes, bytearray, memoryview)):
+            iterable = bytes_to_chunks(input_value, chunk_size)
+        else:
+            iterable = file_to_chunks(input_value, chunk_size)
+
+        loop = asyncio.get_running_loop()
+        i = 0
+        while True:
+            chunk = await loop.run_in_executor(None, next, iterable, None)
+            if chunk is None:
+                break
+            self.logger.debug("_append_input(%s, %s, %s, %s, %s) chunk %i", job.job_identifier, input_item_name,
+                              data_item_name, type(input_value), chunk_size, i)
+            await self._api_client.http.post(
+                '{}/{}/{}/{}'.format(self._base_route, job.job_identifier, input_item_name, data_item_name),
+                None,
+                {"input": bytes(chunk)}  # httpx needs bytes or a file object, not a memoryview
+            )
+            i += 1
+
+    async def get_features(self):
+        """Gets the `Job` features.
+
+        See:
+            :py:meth:`modzy.jobs.Jobs.get_features`
+        """
+        self.logger.debug("getting features ")
+        return await self._api_client.http.get('{}/features'.format(self._base_route))
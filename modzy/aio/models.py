@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Coroutines for interacting with models."""
+
+import logging
+
+from ..error import NotFoundError
+from ..models import Model, ModelVersion
+
+
+class AsyncModels:
+    """The `AsyncModels` object.
+
+    This object is the `asyncio` counterpart of the read-only lookups of
+    :py:class:`modzy.models.Models`.
+
+    Note:
+        This class should not be instantiated directly but rather accessed through the `models`
+        attribute of an `AsyncApiClient` instance.
+    """
+
+    _base_route = '/models'
+
+    def __init__(self, api_client):
+        """Creates an `AsyncModels` instance.
+
+        Args:
+            api_client (AsyncApiClient): An `AsyncApiClient` instance.
+        """
+        self._api_client = api_client
+        self.logger = logging.getLogger(__name__)
+
+    async def get(self, model):
+        """Gets a `Model` instance.
+
+        See:
+            :py:meth:`modzy.models.Models.get`
+        """
+        modelId = Model._coerce_identifier(model)
+        self.logger.debug("getting model %s", model)
+        json_obj = await self._api_client.http.get('{}/{}'.format(self._base_route, modelId))
+        return Model(json_obj, self._api_client)
+
+    async def get_by_name(self, name):
+        """Gets a `Model` instance by name.
+
+        See:
+            :py:meth:`modzy.models.Models.get_by_name`
+        """
+        json_list = await self._api_client.http.request('GET', self._base_route, params={'name': name})
+        if json_list is not None and len(json_list) > 0:
+            return await self.get(Model(json_list[0], self._api_client))
+        else:
+            raise NotFoundError("Model {} not found".format(name), self._base_route, None)
+
+    async def get_versions(self, model):
+        """Gets a list of all the versions associated with the model provided.
+
+        See:
+            :py:meth:`modzy.models.Models.get_versions`
+        """
+        self.logger.debug("getting versions related to model %s", model)
+        identifier = Model._coerce_identifier(model)
+        json_list = await self._api_client.http.get('{}/{}/versions'.format(self._base_route, identifier))
+        return list(ModelVersion(json_obj, self._api_client) for json_obj in json_list)
+
+    async def get_version(self, model, version):
+        """Gets a versions associated with the model provided.
+
+        See:
+            :py:meth:`modzy.models.Models.get_version`
+        """
+        self.logger.debug("getting version model %s version %s", model, version)
+        modelId = Model._coerce_identifier(model)
+        versionId = ModelVersion._coerce_identifier(version)
+        json_obj = await self._api_client.http.get('{}/{}/versions/{}'.format(self._base_route, modelId, versionId))
+        return ModelVersion(json_obj, self._api_client)
+
+    async def get_all(self):
+        """Gets a list of all `Model` instances.
+
+        See:
+            :py:meth:`modzy.models.Models.get_all`
+        """
+        self.logger.debug("getting all models")
+        json_list = await self._api_client.http.request('GET', self._base_route, params={'per-page': 1000})
+        return list(Model(json_obj, self._api_client) for json_obj in json_list)
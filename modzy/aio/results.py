@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Coroutines for interacting with results."""
+
+import asyncio
+import logging
+
+from ..error import NotFoundError
+from ..polling import get_schedule
+from ..results import Result
+
+
+class AsyncResults:
+    """The `AsyncResults` object.
+
+    This object is the `asyncio` counterpart of :py:class:`modzy.results.Results`.
+
+    Note:
+        This class should not be instantiated directly but rather accessed through the `results`
+        attribute of an `AsyncApiClient` instance.
+    """
+
+    _base_route = '/results'
+
+    def __init__(self, api_client):
+        """Creates an `AsyncResults` instance.
+
+        Args:
+            api_client (AsyncApiClient): An `AsyncApiClient` instance.
+        """
+        self._api_client = api_client
+        self.logger = logging.getLogger(__name__)
+
+    async def get(self, result):
+        """Gets a `Result` instance.
+
+        See:
+            :py:meth:`modzy.results.Results.get`
+        """
+        identifier = Result._coerce_identifier(result)
+        self.logger.debug("getting results %s", result)
+        json_obj = await self._api_client.http.get('{}/{}'.format(self._base_route, identifier))
+        return Result(json_obj, self._api_client)
+
+    async def block_until_complete(self, result, timeout=60, poll_interval=None):
+        """Waits until the `Result` completes or a timeout is reached.
+
+        See:
+            :py:meth:`modzy.results.Results.block_until_complete`
+        """
+        identifier = Result._coerce_identifier(result)
+        wait = get_schedule(poll_interval, self._api_client).wait(timeout)
+        progress = result if isinstance(result, dict) else None
+        ignore404 = False
+        while True:  # poll at least once
+            try:
+                result = progress = await self.get(identifier)
+                self.logger.debug("result %s", result)
+            except NotFoundError:
+                # work around 404 for recently accepted jobs
+                if not ignore404:
+                    progress = await self._api_client.jobs.get(identifier)  # this didn't error so job must exist
+                    ignore404 = True
+            else:
+                if result.finished:  # this covers CANCELED/COMPLETED
+                    wait.done(result)
+                    return result
+            await asyncio.sleep(wait.next_delay(progress))
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Coroutines for interacting with tags."""
+
+import logging
+
+from ..tags import Tag
+
+
+class AsyncTags:
+    """The `AsyncTags` object.
+
+    This object is the `asyncio` counterpart of :py:class:`modzy.tags.Tags`.
+
+    Note:
+        This class should not be instantiated directly but rather accessed through the `tags`
+        attribute of an `AsyncApiClient` instance.
+    """
+
+    _base_route = '/models/tags'
+
+    def __init__(self, api_client):
+        """Creates an `AsyncTags` instance.
+
+        Args:
+            api_client (AsyncApiClient): An `AsyncApiClient` instance.
+        """
+        self._api_client = api_client
+        self.logger = logging.getLogger(__name__)
+
+    async def get_all(self):
+        """Gets a list of all `Tag` instances.
+
+        See:
+            :py:meth:`modzy.tags.Tags.get_all`
+        """
+        json_list = await self._api_client.http.get(self._base_route)
+        return list(Tag(json_obj, self._api_client) for json_obj in json_list)
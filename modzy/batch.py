@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""Pipelined and micro-batched inference."""
+
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from ._util import data_size
+
+logger = logging.getLogger(__name__)
+
+
+class MapItem(namedtuple('MapItem', ['index', 'job_identifier', 'outputs', 'error'])):
+    """The outcome of one input of `ApiClient.map`.
+
+    Attributes:
+        index (int): The position of the input in the `inputs` iterable.
+        job_identifier (Optional[str]): The identifier of the job that processed the input, None if it
+            could not be submitted or its outputs were served from the client's `result_cache`.
+        outputs (Optional[dict]): A `dict` mapping the output's filenames to JSON parsed data, None if
+            the input failed.
+        error (Optional[Exception]): The error that made the input fail, e.g. a `ResultsError` for a
+            model failure, an `ApiError` or a `Timeout`. None if the input succeeded.
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """bool: True if the input succeeded."""
+        return self.error is None
+
+
+def map_inputs(api_client, model, version, inputs, concurrency=8, ordered=True, submit=None, timeout=None,
+               poll_interval=None, explain=False):
+    """Runs a model on many inputs, one job per input, with submission, polling and result retrieval
+    of different inputs overlapping.
+
+    See :py:meth:`modzy.client.ApiClient.map`.
+    """
+    if concurrency < 1:
+        raise ValueError("the concurrency param should be a positive number")
+    if submit is None:
+        submit = api_client.jobs.submit
+    return _pipeline(api_client, model, version, inputs, concurrency, ordered, submit, timeout, poll_interval,
+                     explain)
+
+
+def _pipeline(api_client, model, version, inputs, concurrency, ordered, submit, timeout, poll_interval, explain):
+    cache = getattr(api_client, 'result_cache', None)
+
+    def run(index, sources):
+        job = None
+        try:
+            key = cache.key(model, version, sources, explain=explain) if cache is not None else None
+            if key is not None:
+                outputs = cache.get(key)
+                if outputs is not None:
+                    return MapItem(index, None, outputs, None)
+            job = submit(model, version, sources, explain)
+            result = api_client.results.block_until_complete(job, timeout=timeout, poll_interval=poll_interval)
+            outputs = result.get_first_outputs()
+            if key is not None:
+                cache.put(key, outputs)
+            return MapItem(index, job.job_identifier, outputs, None)
+        except Exception as ex:
+            logger.debug("input %d failed: %s", index, ex)
+            return MapItem(index, getattr(job, 'job_identifier', None), None, ex)
+
+    inputs = enumerate(inputs)
+    executor = ThreadPoolExecutor(concurrency, thread_name_prefix='modzy-map')
+    pending = deque()
+    try:
+        # at most `concurrency` inputs are read and in flight, whatever the size of `inputs`
+        for index, sources in inputs:
+            pending.append(executor.submit(run, index, sources))
+            if len(pending) >= concurrency:
+                yield from _completed(pending, ordered)
+        while pending:
+            yield from _completed(pending, ordered)
+    finally:
+        # when the caller stops early, inputs not started yet are dropped, jobs already submitted keep running
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _completed(pending, ordered):
+    if ordered:
+        return [pending.popleft().result()]
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+    return sorted((future.result() for future in done), key=lambda item: item.index)
+
+
+class MicroBatcher:
+    """Packs single inputs into multi-source jobs.
+
+    Every job costs a creation request, polling and a result request, which dominates for small inputs
+    such as short texts. A `MicroBatcher` accumulates the inputs it is given and submits them together,
+    each as a source of one job, once `max_sources` inputs or `max_bytes` of data are pending or the
+    oldest pending input waited `max_delay_ms`. Each input gets its own future, resolved with the outputs
+    of its source::
+
+        with MicroBatcher(client, 'ed542963de', '1.0.1', max_sources=64) as batcher:
+            futures = [batcher.submit({'input.txt': text}) for text in texts]
+            outputs = [future.result() for future in futures]
+
+    Inputs whose outputs are in the client's `result_cache` are resolved at once, without a job. A
+    `MicroBatcher` can be shared between threads.
+
+    Attributes:
+        max_sources (int): The maximum number of inputs per job.
+        max_bytes (Optional[int]): The maximum size of the data of a job.
+        max_delay_ms (float): The maximum time an input waits for others before its job is submitted.
+    """
+
+    def __init__(self, api_client, model, version, max_sources=100, max_bytes=4 * 1024 * 1024, max_delay_ms=50,
+                 submit=None, max_jobs=4, timeout=None, poll_interval=None, explain=False):
+        """Creates a `MicroBatcher` instance.
+
+        Args:
+            api_client (ApiClient): An `ApiClient` instance.
+            model (Union[str, Model]): The model identifier or a `Model` instance.
+            version (str): The model version string.
+            max_sources (int): The maximum number of inputs per job. Defaults to 100.
+            max_bytes (Optional[int]): The maximum size of the data of a job, counting `str` (UTF-8 encoded)
+                and bytes-like values. If None is specified jobs are not limited in size. Defaults to 4 MiB.
+            max_delay_ms (float): The maximum time, in milliseconds, an input waits for others before its
+                job is submitted. Defaults to 50.
+            submit (Optional[Callable[[str, str, dict, bool], Job]]): The function submitting a multi-source job,
+                e.g. ``client.jobs.submit_file`` for file inputs. Defaults to `Jobs.submit`, which picks the
+                transport from the size of the inputs.
+            max_jobs (int): The maximum number of jobs submitted and awaited at the same time. Defaults to 4.
+            timeout (Optional[float]): Seconds to wait for each job to complete. `None` indicates wait
+                forever. Defaults to None.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls of a job's result,
+                or a `PollSchedule`. If None is specified the client's `poll_schedule` is used. Defaults to None.
+            explain (bool): indicates if you desire an explainable result for your model. Defaults to False.
+        """
+        if max_sources < 1:
+            raise ValueError("the max_sources param should be a positive number")
+        self._api_client = api_client
+        self.model = model
+        self.version = version
+        self.explain = explain
+        self.max_sources = max_sources
+        self.max_bytes = max_bytes
+        self.max_delay_ms = max_delay_ms
+        self._submit = submit if submit is not None else api_client.jobs.submit
+        self._timeout = timeout
+        self._poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_jobs, thread_name_prefix='modzy-batcher')
+        self._condition = threading.Condition()
+        self._batch = []
+        self._batch_bytes = 0
+        self._batch_deadline = None
+        self._counter = 0
+        self._closed = False
+        self._timer = threading.Thread(target=self._flush_expired, name='modzy-batcher-timer', daemon=True)
+        self._timer.start()
+
+    def submit(self, inputs):
+        """Adds an input to the next job.
+
+        Args:
+            inputs (dict): A mapping of model input filename to data, for a single source.
+
+        Returns:
+            concurrent.futures.Future: A future resolved with a `dict` mapping the output's filenames to
+            JSON parsed data. It raises a `ResultsError` if the model failed on this input, or the error
+            that made the job fail.
+
+        Raises:
+            RuntimeError: The batcher is closed.
+        """
+        future = Future()
+        cache = getattr(self._api_client, 'result_cache', None)
+        key = cache.key(self.model, self.version, inputs, explain=self.explain) if cache is not None else None
+        if key is not None:
+            outputs = cache.get(key)
+            if outputs is not None:
+                future.set_result(outputs)
+                return future
+        size = sum(data_size(value) for value in inputs.values())
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("the batcher is closed")
+            if self._batch and self.max_bytes is not None and self._batch_bytes + size > self.max_bytes:
+                self._flush_locked()
+            self._counter += 1
+            self._batch.append(('input-{}'.format(self._counter), inputs, future, key))
+            self._batch_bytes += size
+            if len(self._batch) >= self.max_sources or (self.max_bytes is not None
+                                                        and self._batch_bytes >= self.max_bytes):
+                self._flush_locked()
+            elif self._batch_deadline is None:
+                self._batch_deadline = time.monotonic() + self.max_delay_ms / 1000
+                self._condition.notify()
+        return future
+
+    def flush(self):
+        """Submits the pending inputs now."""
+        with self._condition:
+            self._flush_locked()
+
+    def close(self, wait=True):
+        """Submits the pending inputs and stops accepting new ones.
+
+        Args:
+            wait (bool): Wait until every job completed and every future is resolved. Defaults to True.
+        """
+        with self._condition:
+            if not self._closed:
+                self._flush_locked()
+                self._closed = True
+                self._condition.notify()
+        self._executor.shutdown(wait=wait)
+
+    def _flush_locked(self):
+        if self._batch:
+            self._executor.submit(self._run, self._batch)
+        self._batch = []
+        self._batch_bytes = 0
+        self._batch_deadline = None
+
+    def _flush_expired(self):
+        with self._condition:
+            while not self._closed:
+                if self._batch_deadline is None:
+                    self._condition.wait()
+                    continue
+                delay = self._batch_deadline - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                else:
+                    self._flush_locked()
+
+    def _run(self, batch):
+        batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            job = self._submit(self.model, self.version, {source_name: inputs for source_name, inputs, _, _ in batch},
+                               self.explain)
+            result = self._api_client.results.block_until_complete(job, timeout=self._timeout,
+                                                                   poll_interval=self._poll_interval)
+        except Exception as ex:
+            logger.debug("job of %d inputs failed: %s", len(batch), ex)
+            for _, _, future, _ in batch:
+                future.set_exception(ex)
+            return
+        cache = self._api_client.result_cache if any(key for _, _, _, key in batch) else None
+        for source_name, _, future, key in batch:
+            try:
+                outputs = result.get_source_outputs(source_name)
+            except Exception as ex:
+                future.set_exception(ex)
+                continue
+            if key is not None:
+                cache.put(key, outputs)
+            future.set_result(outputs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
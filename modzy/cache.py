@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""Caches for API responses."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from ._api_object import wrap_json
+from ._util import file_to_chunks
+from .models import Model
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """A cached response body.
+
+    Attributes:
+        body (bytes): The raw response body.
+        etag (Optional[str]): The ``ETag`` of the response, used to revalidate the entry once expired.
+        expires (float): The `time.monotonic` value after which the entry must be revalidated.
+    """
+
+    __slots__ = ('body', 'etag', 'expires')
+
+    def __init__(self, body, etag, expires):
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+
+class MetadataCache:
+    """A bounded, thread-safe LRU cache of response bodies with a time to live.
+
+    The `HttpClient` uses it for read-only metadata lookups (models, versions and tags) when the
+    `ApiClient` is created with a `metadata_cache`::
+
+        client = ApiClient(base_url=BASE_URL, api_key=API_KEY, metadata_cache=MetadataCache(ttl=60))
+        client.models.get('ed542963de')  # network
+        client.models.get('ed542963de')  # served from the cache for 60 seconds
+
+    Fresh entries are served without contacting the API. Expired entries are revalidated with an
+    ``If-None-Match`` request when the server sent an ``ETag``, so an unchanged resource costs a
+    ``304 Not Modified`` round trip instead of a full download. Entries are dropped when the SDK changes
+    the resources they describe (`Models.deploy`, `Models.edit_model_metadata` and
+    `Models.update_processing_engines`); use `clear` after changes made by other means.
+
+    The raw response bodies are cached, so each caller gets its own decoded copy and modifying a
+    returned object never alters the cache.
+
+    Attributes:
+        maxsize (int): The maximum number of entries.
+        ttl (float): Seconds during which an entry is served without revalidation.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        """Creates a `MetadataCache` instance.
+
+        Args:
+            maxsize (int): The maximum number of entries, the least recently used ones are evicted first.
+                Defaults to 1024.
+            ttl (float): Seconds during which an entry is served without revalidation. Defaults to 300.
+        """
+        if maxsize < 1:
+            raise ValueError("the maxsize param should be a positive number")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0}
+
+    def get(self, key):
+        """Gets an entry, fresh or expired.
+
+        Args:
+            key (Hashable): The entry key.
+
+        Returns:
+            Optional[CacheEntry]: The entry, or None if not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.expires > time.monotonic():
+                self._stats['hits'] += 1
+            return entry
+
+    def put(self, key, body, etag=None, ttl=None):
+        """Adds or replaces an entry.
+
+        Args:
+            key (Hashable): The entry key.
+            body (bytes): The response body.
+            etag (Optional[str]): The response ``ETag``. Defaults to None.
+            ttl (Optional[float]): Time to live of this entry, in seconds. If None is specified the
+                cache's `ttl` is used. Defaults to None.
+
+        Returns:
+            CacheEntry: The new entry.
+        """
+        entry = CacheEntry(body, etag, time.monotonic() + (self.ttl if ttl is None else ttl))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return entry
+
+    def refresh(self, key, entry, ttl=None):
+        """Marks an expired entry as fresh again after a successful revalidation.
+
+        Args:
+            key (Hashable): The entry key.
+            entry (CacheEntry): The entry.
+            ttl (Optional[float]): Time to live of the entry, in seconds. If None is specified the cache's
+                `ttl` is used. Defaults to None.
+        """
+        with self._lock:
+            entry.expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._stats['revalidated'] += 1
+
+    def invalidate(self, predicate):
+        """Drops the entries whose key matches a predicate.
+
+        Args:
+            predicate (Callable[[Hashable], bool]): Called with each key, entries for which it returns
+                True are dropped.
+
+        Returns:
+            int: The number of entries dropped.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        """Drops all the entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Gets the cache statistics.
+
+        Returns:
+            dict: A `dict` with the number of `hits` (fresh entries served), `misses`, `revalidated`
+            entries, `evictions` and the current `size`.
+        """
+        with self._lock:
+            return dict(self._stats, size=len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '{}(maxsize={}, ttl={})'.format(self.__class__.__name__, self.maxsize, self.ttl)
+
+
+class DiscoveryCache:
+    """An on-disk cache of facts discovered about an API deployment, shared between processes.
+
+    Every process using the SDK discovers the same facts: the base url the API answers on, the job
+    features (e.g. the input chunk size) and the account's hardware requirements. With a discovery
+    cache the first process stores them on disk and the others reuse them, so many processes starting
+    at once don't all query the API and a warm start needs no round trip::
+
+        client = ApiClient(base_url=BASE_URL, api_key=API_KEY, discovery_cache=True)
+
+    Entries are keyed by base url and a fingerprint (SHA-256) of the API key; the key itself is never
+    written. Each entry is a small JSON file replaced atomically, so concurrent readers and writers never
+    see partial data, and expires after a time to live.
+
+    Attributes:
+        path (str): The cache directory.
+        ttl (float): The default time to live of the entries, in seconds.
+        ttls (Dict[str, float]): Time to live of specific entries, by name.
+    """
+
+    DEFAULT_TTLS = {'base_url': 24 * 3600}
+
+    def __init__(self, path=None, ttl=3600, ttls=None):
+        """Creates a `DiscoveryCache` instance.
+
+        Args:
+            path (Optional[str]): The cache directory. If None is specified the ``MODZY_CACHE_DIR``
+                environment variable is used, falling back to ``~/.cache/modzy/discovery``. Defaults to None.
+            ttl (float): The default time to live of the entries, in seconds. Defaults to 3600.
+            ttls (Optional[Dict[str, float]]): Time to live of specific entries (``'base_url'``,
+                ``'job_features'`` or ``'hardware_requirements'``), in seconds. The base url is kept a day
+                by default.
+        """
+        if path is None:
+            path = os.environ.get('MODZY_CACHE_DIR') or os.path.join(
+                os.path.expanduser('~'), '.cache', 'modzy', 'discovery')
+        self.path = path
+        self.ttl = ttl
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+
+    def get(self, base_url, api_key, name):
+        """Gets an entry.
+
+        Args:
+            base_url (str): The base url given to the client.
+            api_key (str): The API key given to the client.
+            name (str): The entry name.
+
+        Returns:
+            Optional[Any]: The cached JSON value, or None if missing, expired or unreadable.
+        """
+        try:
+            with open(self._entry_path(base_url, api_key, name), 'rb') as file:
+                entry = json.loads(file.read())
+            if entry['expires'] > time.time():
+                return entry['value']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def set(self, base_url, api_key, name, value, ttl=None):
+        """Stores an entry.
+
+        Failures to write are logged and ignored: the cache is only an optimization.
+
+        Args:
+            base_url (str): The base url given to the client.
+            api_key (str): The API key given to the client.
+            name (str): The entry name.
+            value (Any): A JSON serializable value.
+            ttl (Optional[float]): Time to live of the entry, in seconds. If None is specified the entry's
+                time to live from `ttls` or the default `ttl` is used. Defaults to None.
+        """
+        ttl = self.ttls.get(name, self.ttl) if ttl is None else ttl
+        data = json.dumps({'expires': time.time() + ttl, 'value': value}).encode('utf-8')
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    file.write(data)
+                os.replace(temp_path, self._entry_path(base_url, api_key, name))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError:
+            logger.warning("unable to write the discovery cache in %s", self.path, exc_info=True)
+
+    def clear(self, base_url=None, api_key=None):
+        """Drops entries.
+
+        Args:
+            base_url (Optional[str]): Only drop the entries of this base url and `api_key`. If None is
+                specified every entry is dropped.
+            api_key (Optional[str]): The API key given to the client along with `base_url`.
+        """
+        prefix = _fingerprint(base_url, api_key) if base_url is not None else ''
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.json') and name.startswith(prefix):
+                try:
+                    os.unlink(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def _entry_path(self, base_url, api_key, name):
+        return os.path.join(self.path, '{}-{}.json'.format(_fingerprint(base_url, api_key), name))
+
+    def __repr__(self):
+        return "{}(path='{}', ttl={})".format(self.__class__.__name__, self.path, self.ttl)
+
+
+def _fingerprint(base_url, api_key):
+    key_hash = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()
+    return hashlib.sha256('{}\n{}'.format(base_url, key_hash).encode('utf-8')).hexdigest()[:32]
+
+
+class ResultCache:
+    """A content-addressed cache of model outputs, in memory and optionally on disk.
+
+    Exact duplicate inputs (retries, re-ingested documents, popular images) don't need to go through the
+    Jobs API again: outputs are cached by model, version, explain flag and a SHA-256 digest of the input
+    data. `ApiClient.map` and `MicroBatcher` use the cache of an `ApiClient` created with a
+    `result_cache`, serving hits without submitting a job::
+
+        client = ApiClient(base_url=BASE_URL, api_key=API_KEY, result_cache=ResultCache(path='results.db'))
+
+    Hits are served from a memory LRU, then from an SQLite database when a `path` is given, which is
+    shared between processes and survives restarts. Only successful outputs are cached.
+
+    Inputs are hashed by content: `str` values as text, bytes-like values, `os.PathLike` paths and seekable
+    binary file objects by their data, read in chunks. Inputs referencing remote data (e.g. S3 objects)
+    are never cached. Pass file paths as `pathlib.Path` objects, a `str` is taken as text.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept in memory.
+        path (Optional[str]): The SQLite database path.
+        ttl (Optional[float]): Seconds during which an entry is served.
+    """
+
+    _CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, maxsize=1024, path=None, ttl=None):
+        """Creates a `ResultCache` instance.
+
+        Args:
+            maxsize (int): The maximum number of entries kept in memory, the least recently used ones are
+                evicted first. Defaults to 1024.
+            path (Optional[Union[str, os.PathLike]]): An SQLite database where entries are also stored. If
+                None is specified entries are only kept in memory. Defaults to None.
+            ttl (Optional[float]): Seconds during which an entry is served. If None is specified entries
+                don't expire. Defaults to None.
+        """
+        if maxsize < 1:
+            raise ValueError("the maxsize param should be a positive number")
+        self.maxsize = maxsize
+        self.path = os.fspath(path) if path is not None else None
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._db = None
+        if self.path is not None:
+            import sqlite3  # only needed for the on-disk cache
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, outputs BLOB, created REAL)')
+
+    def key(self, model, version, inputs, explain=False):
+        """Computes the cache key of a single source.
+
+        Args:
+            model (Union[str, Model]): The model identifier or a `Model` instance.
+            version (str): The model version string.
+            inputs (dict): A mapping of model input filename to data.
+            explain (bool): Whether an explainable result is requested. Defaults to False.
+
+        Returns:
+            Optional[str]: The key, or None if an input can't be cached.
+        """
+        model = Model._coerce_identifier(model)
+        hasher = hashlib.sha256(json.dumps([model, str(version), bool(explain), sorted(inputs)]).encode('utf-8'))
+        for name in sorted(inputs):
+            if not self._update(hasher, inputs[name]):
+                return None
+        return hasher.hexdigest()
+
+    def _update(self, hasher, value):
+        # each value is prefixed with its type and ended with its length, so inputs can't be confused
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+            hasher.update(b'text:')
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            hasher.update(b'data:')
+        elif isinstance(value, os.PathLike) or (hasattr(value, 'read') and getattr(value, 'seekable', None)
+                                                and value.seekable()):
+            hasher.update(b'data:')
+            size = 0
+            for chunk in file_to_chunks(value, self._CHUNK_SIZE):
+                hasher.update(chunk)
+                size += len(chunk)
+            hasher.update(b':%d;' % size)
+            return True
+        else:
+            return False
+        hasher.update(value)
+        hasher.update(b':%d;' % len(value))
+        return True
+
+    def get(self, key):
+        """Gets cached outputs.
+
+        Args:
+            key (str): The key from `key`.
+
+        Returns:
+            Optional[dict]: A new copy of the outputs, or None if not cached.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return wrap_json(json.loads(entry[0]))
+            row = None
+            if self._db is not None:
+                row = self._db.execute('SELECT outputs, created FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._remember(key, (row[0], row[1]))
+        return wrap_json(json.loads(row[0]))
+
+    def put(self, key, outputs):
+        """Caches outputs.
+
+        Args:
+            key (str): The key from `key`.
+            outputs (dict): The outputs of the source.
+        """
+        entry = (json.dumps(outputs).encode('utf-8'), time.time())
+        with self._lock:
+            self._remember(key, entry)
+            self._stats['stores'] += 1
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO results (key, outputs, created) VALUES (?, ?, ?)',
+                                 (key, entry[0], entry[1]))
+
+    def clear(self):
+        """Drops all the entries, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM results')
+
+    def stats(self):
+        """Gets the cache statistics.
+
+        Returns:
+            dict: A `dict` with the number of `hits` served from memory, `disk_hits`, `misses`, `stores`,
+            memory `evictions` and the current memory `size`.
+        """
+        with self._lock:
+            return dict(self._stats, size=len(self._entries))
+
+    def close(self):
+        """Closes the database."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _expired(self, created, now):
+        return self.ttl is not None and created + self.ttl < now
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "{}(maxsize={}, path={!r}, ttl={})".format(self.__class__.__name__, self.maxsize, self.path, self.ttl)
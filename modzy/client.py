@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
 """The API client implementation."""
-from .error import NetworkError
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE
+
+from .batch import map_inputs
+from .cache import DiscoveryCache, MetadataCache, ResultCache
+from .error import ApiError, NetworkError, ServerError
 from .http import HttpClient
 from .jobs import Jobs
 from .models import Models
+from .polling import EtaSchedule
 from .results import Results
 from .tags import Tags
 import logging
+import threading
 
 
 class ApiClient:
@@ -29,47 +35,216 @@ class ApiClient:
         models (Models): `Models` object used to interact with models.
         jobs (Jobs): `Jobs` object used to interact with jobs.
         results (Results): `Results` object used to interact with results.
+        result_cache (Optional[ResultCache]): The cache of model outputs used by `map` and `MicroBatcher`.
+        poll_schedule (PollSchedule): The schedule of the polls made while blocking on jobs and results.
     """
 
-    def __init__(self, base_url, api_key, cert=None):
+    def __init__(self, base_url, api_key, cert=None, pool_connections=DEFAULT_POOLSIZE,
+                 pool_maxsize=DEFAULT_POOLSIZE, pool_block=DEFAULT_POOLBLOCK, retry_policy=None,
+                 json_codec=None, metadata_cache=None, coalesce_requests=False, discovery_cache=None,
+                 result_cache=None, poll_schedule=None):
         """Creates an `ApiClient` instance.
 
+        No network request is made here: the base url and api key are checked before the first request
+        (see `verify` to check them eagerly).
+
+        A single `ApiClient` can be shared between threads. When doing so, set `pool_maxsize` to at
+        least the number of threads making concurrent requests so connections are kept and reused.
+
         Args:
             base_url (str): The base url for the API.
             api_key (str): The API key to use for authentication.
             certs (str): A tuple to use custom cert and key, i.e.: (cert_file_path, key_file_path)
+            pool_connections (int): The number of per-host connection pools to cache. Defaults to 10.
+            pool_maxsize (int): The maximum number of connections kept open per host. Defaults to 10.
+            pool_block (bool): Whether to wait for a free connection once `pool_maxsize` connections are
+                in use instead of opening extra connections that are discarded afterwards. Defaults to False.
+            retry_policy (Optional[RetryPolicy]): The policy used to retry failed requests. If None is
+                specified the default `RetryPolicy` is used: idempotent requests are retried up to 3 times
+                on connection errors and transient 5xx statuses, with jittered exponential backoff.
+            json_codec (Optional[Union[str, JsonCodec]]): The JSON codec, or codec name (``'orjson'``,
+                ``'simdjson'``, ``'ujson'`` or ``'json'``), used for request and response bodies. If None is
+                specified the fastest installed codec is used.
+            metadata_cache (Optional[Union[bool, MetadataCache]]): Cache model, version and tag lookups.
+                True uses a `MetadataCache` with the default size and time to live. If None is specified
+                every lookup goes to the API. Defaults to None.
+            coalesce_requests (bool): Let threads making identical ``GET`` requests at the same time share a
+                single request, e.g. several consumers blocking on the same job. Defaults to False.
+            discovery_cache (Optional[Union[bool, DiscoveryCache]]): Share the resolved base url, job
+                features and hardware requirements with other processes through an on-disk cache. True uses
+                a `DiscoveryCache` in the default directory. If None is specified they are fetched by every
+                client. Defaults to None.
+            result_cache (Optional[Union[bool, ResultCache]]): Serve the outputs of inputs already processed
+                by the same model version from a cache in `map` and `MicroBatcher`. True uses an in-memory
+                `ResultCache`. If None is specified every input is submitted. Defaults to None.
+            poll_schedule (Optional[PollSchedule]): When to poll while blocking on jobs, results and processing
+                engines without an explicit poll interval. If None is specified an `EtaSchedule` is used: it
+                polls around the expected completion time of a job, estimated from its progress, with
+                exponentially growing, jittered delays otherwise. Defaults to None.
+
+        Raises:
+            ValueError: The base url or api key are empty.
         """
         self.logger = logging.getLogger(__name__)
         self.base_url = base_url
         self.api_key = api_key
         self.cert = cert
+        self._check_params()
+        self._checked = False
+        self._check_lock = threading.Lock()
+        if discovery_cache is True:
+            discovery_cache = DiscoveryCache()
+        elif discovery_cache is False:
+            discovery_cache = None
+        self._discovery_cache = discovery_cache
+        self._discovery_key = (base_url, api_key)
 
-        self.http = HttpClient(self)
-        self.check_client()
+        if result_cache is True:
+            result_cache = ResultCache()
+        elif result_cache is False:
+            result_cache = None
+        self.result_cache = result_cache
+        self.poll_schedule = poll_schedule if poll_schedule is not None else EtaSchedule()
+
+        if metadata_cache is True:
+            metadata_cache = MetadataCache()
+        elif metadata_cache is False:
+            metadata_cache = None
+        self.http = HttpClient(self, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                               pool_block=pool_block, retry_policy=retry_policy,
+                               codec=json_codec, cache=metadata_cache, coalesce=coalesce_requests)
 
         self.models = Models(self)
         self.jobs = Jobs(self)
         self.results = Results(self)
         self.tags = Tags(self)
 
+    def map(self, model, version, inputs, concurrency=8, ordered=True, submit=None, timeout=None,
+            poll_interval=None, explain=False):
+        """Runs a model on many inputs, one job per input.
+
+        Submitting the jobs, waiting for them to complete and fetching their results are pipelined:
+        up to `concurrency` inputs are in flight at once, each at its own stage. Inputs are read lazily
+        and outcomes are yielded as they are ready, so memory stays bounded however many inputs there
+        are. A failed input is reported in its `MapItem` and doesn't stop the others::
+
+            texts = ({'input.txt': line} for line in open('reviews.txt'))
+            for item in client.map('ed542963de', '1.0.1', texts, concurrency=16):
+                if item.ok:
+                    print(item.index, item.outputs['results.json'])
+                else:
+                    print(item.index, 'failed:', item.error)
+
+        When using a high `concurrency`, create the client with a matching `pool_maxsize`.
+
+        Args:
+            model (Union[str, Model]): The model identifier or a `Model` instance.
+            version (str): The model version string.
+            inputs (Iterable[dict]): The inputs, each a mapping of model input filename to data, submitted
+                as a single source job.
+            concurrency (int): The maximum number of inputs in flight. Defaults to 8.
+            ordered (bool): Yield the outcomes in the order of `inputs`. If False they are yielded as soon
+                as they are ready. Defaults to True.
+            submit (Optional[Callable[[str, str, dict, bool], Job]]): The function submitting a job, e.g.
+                ``client.jobs.submit_file`` for file inputs. Defaults to `Jobs.submit`, which picks the
+                transport from the size of the inputs.
+            timeout (Optional[float]): Seconds to wait for each job to complete. `None` indicates wait
+                forever. Defaults to None.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls of a job's result,
+                or a `PollSchedule`. If None is specified the client's `poll_schedule` is used. Defaults to None.
+            explain (bool): indicates if you desire an explainable result for your model. Defaults to False.
+
+        Returns:
+            Iterator[MapItem]: The outcome of each input.
+
+        Raises:
+            ValueError: The concurrency is not a positive number.
+        """
+        return map_inputs(self, model, version, inputs, concurrency=concurrency, ordered=ordered, submit=submit,
+                          timeout=timeout, poll_interval=poll_interval, explain=explain)
+
     def check_client(self):
+        """Checks that the base url points to a valid API endpoint.
+
+        If the base url answers but not as the API, a second attempt is made with an ``api/`` suffix
+        appended to it. This is done automatically before the first request; use `verify` to do it eagerly.
+        When the check fails the base url is left unchanged and the check runs again on the next request.
+
+        Raises:
+            ValueError: The base url or api key are not valid.
+            NetworkError: The API can't be reached.
+            ServerError: The API failed to answer.
+        """
         self.logger.debug("Checking base_url %s", self.base_url)
-        if self.base_url is None or self.base_url == "":
-            raise ValueError("Cannot initialize the modzy client: the base_url param should be a valid not empty string")
-        if self.api_key is None or self.api_key == "":
-            raise ValueError("Cannot initialize the modzy client: the api_key param should be a valid not empty string")
-        req_check = False
+        self._check_params()
+        base_url = self.base_url
         try:
-            self.http.get('/models')
-            req_check = True
-        except Exception as e:
-            if not self.base_url.endswith('api') and not self.base_url.endswith('api/'):
-                self.base_url = self.base_url + ("" if self.base_url.endswith("/") else "/") + "api/"
-                # Try again with the new URL
+            self.http._request('GET', '/models', params={'per-page': 1})
+        except (NetworkError, ServerError):
+            raise
+        except ApiError as ex:
+            if self.base_url.endswith('api') or self.base_url.endswith('api/'):
+                raise ValueError("Cannot initialize the modzy client: the base_url param should point to a valid API "
+                                 "endpoint and the api_key should be a valid key for the env") from ex
+            self.base_url = self.base_url + ("" if self.base_url.endswith("/") else "/") + "api/"
+            # Try again with the new URL
+            try:
+                self.http._request('GET', '/models', params={'per-page': 1})
+            except ApiError as retry_ex:
+                self.base_url = base_url
+                if isinstance(retry_ex, (NetworkError, ServerError)):
+                    raise
+                raise ValueError("Cannot initialize the modzy client: the base_url param should point to a valid "
+                                 "API endpoint and the api_key should be a valid key for the env") from retry_ex
+        self._checked = True
+        if self._discovery_cache is not None:
+            self._discovery_cache.set(*self._discovery_key, 'base_url', self.base_url)
+
+    def verify(self):
+        """Checks the base url and api key now instead of on the first request.
+
+        Returns:
+            ApiClient: The `ApiClient` instance (self), so it can be chained with the constructor.
+
+        Raises:
+            ValueError: The base url or api key are not valid.
+            NetworkError: The API can't be reached.
+            ServerError: The API failed to answer.
+        """
+        with self._check_lock:
+            self.check_client()
+        return self
+
+    def _ensure_checked(self):
+        if self._checked:
+            return
+        with self._check_lock:
+            if self._checked:
+                return
+            base_url = self._discover_cached('base_url')
+            if base_url is not None:
+                self.logger.debug("Using base_url %s from the discovery cache", base_url)
+                self.base_url = base_url
+                self._checked = True
+            else:
                 self.check_client()
-                req_check = True
 
-        if not req_check:
-            raise ValueError("Cannot initialize the modzy client: the base_url param should point to a valid API "
-                             "endpoint and the api_key should be a valid key for the env")
+    def _discover_cached(self, name):
+        if self._discovery_cache is None:
+            return None
+        return self._discovery_cache.get(*self._discovery_key, name)
 
+    def _discover(self, name, fetch):
+        # returns a fact about the API deployment from the discovery cache, or fetches and caches it
+        value = self._discover_cached(name)
+        if value is None:
+            value = fetch()
+            if self._discovery_cache is not None:
+                self._discovery_cache.set(*self._discovery_key, name, value)
+        return value
+
+    def _check_params(self):
+        if self.base_url is None or self.base_url == "":
+            raise ValueError("Cannot initialize the modzy client: the base_url param should be a valid not empty string")
+        if self.api_key is None or self.api_key == "":
+            raise ValueError("Cannot initialize the modzy client: the api_key param should be a valid not empty string")
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""JSON codecs used to encode request bodies and decode response bodies."""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JsonCodec:
+    """Base class for JSON codecs.
+
+    A codec turns request bodies into `bytes` and response bodies (`bytes`) into plain Python
+    objects. The `HttpClient` wraps decoded objects into `ApiObject` instances lazily, so codecs should
+    return plain `dict` and `list` instances.
+
+    Attributes:
+        name (str): The codec name.
+    """
+
+    name = None
+
+    def encode(self, obj):
+        """Serializes `obj` into UTF-8 encoded JSON.
+
+        Args:
+            obj (Any): A JSON serializable object.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        raise NotImplementedError
+
+    def decode(self, data):
+        """Parses a JSON document.
+
+        Args:
+            data (bytes): The UTF-8 encoded JSON document.
+
+        Returns:
+            Any: The parsed document.
+
+        Raises:
+            ValueError: The data is not valid JSON.
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+
+class StdlibJsonCodec(JsonCodec):
+    """Codec based on the standard library `json` module, always available."""
+
+    name = 'json'
+
+    def encode(self, obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """Codec based on `orjson`, usually the fastest available option."""
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def encode(self, obj):
+        return self._orjson.dumps(obj)
+
+    def decode(self, data):
+        return self._orjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    """Codec based on `ujson`."""
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def encode(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+    def decode(self, data):
+        return self._ujson.loads(data)
+
+
+class SimdjsonCodec(JsonCodec):
+    """Codec decoding with `pysimdjson`; encoding falls back to the standard library."""
+
+    name = 'simdjson'
+
+    def __init__(self):
+        import simdjson
+        self._simdjson = simdjson
+
+    def encode(self, obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data):
+        return self._simdjson.loads(data)
+
+
+_CODECS = {codec.name: codec for codec in (OrjsonCodec, SimdjsonCodec, UjsonCodec, StdlibJsonCodec)}
+_PREFERENCE = ('orjson', 'simdjson', 'ujson', 'json')
+
+
+def get_codec(codec=None):
+    """Gets a JSON codec.
+
+    Args:
+        codec (Optional[Union[str, JsonCodec]]): A codec instance, or the name of a codec (``'orjson'``,
+            ``'simdjson'``, ``'ujson'`` or ``'json'``). If None is specified the fastest installed codec is
+            used. Defaults to None.
+
+    Returns:
+        JsonCodec: The codec.
+
+    Raises:
+        ValueError: The codec name is unknown.
+        ImportError: The package backing the requested codec is not installed.
+    """
+    if isinstance(codec, JsonCodec):
+        return codec
+    if codec is not None:
+        try:
+            codec_class = _CODECS[codec]
+        except KeyError:
+            raise ValueError("unknown JSON codec '{}', choose one of {}".format(codec, ', '.join(_PREFERENCE)))
+        return codec_class()
+    for name in _PREFERENCE:
+        try:
+            return _CODECS[name]()
+        except ImportError:
+            continue
+    return StdlibJsonCodec()  # pragma: no cover
@@ -178,3 +178,23 @@ class ResultsError(Error):  # name?
 
 class Timeout(Error):
     """A blocking function timed out."""
+
+
+class InputValidationError(Error):
+    """Job inputs don't match the input specification of the model version.
+
+    Attributes:
+        message (str): Human readable error description.
+        problems (List[Tuple[str, str, str]]): The source name, input name and description of each problem.
+    """
+
+    def __init__(self, message, problems):
+        """Creates an `InputValidationError` instance.
+
+        Args:
+            message (str): Human readable error description.
+            problems (List[Tuple[str, str, str]]): The source name, input name and description of each
+                problem.
+        """
+        super().__init__(message)
+        self.problems = problems
@@ -1,14 +1,23 @@
 # -*- coding: utf-8 -*-
 """The HTTP client implementation."""
 
-import json
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
 import requests
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
 
-from ._api_object import ApiObject
+from ._api_object import wrap_json
+from ._util import JsonStream
+from .codec import get_codec
 from .error import NetworkError, _create_response_error
+from .metrics import RequestInfo, route_template
+from .retry import RetryPolicy
+
+_NO_RETRIES = RetryPolicy.no_retries()
 
 
 def _url_is_absolute(url):
@@ -23,6 +32,72 @@ def _urlappend(base, url):
     return base + url.lstrip('/')
 
 
+def _file_positions(files):
+    # remember where file-like parts start so a retry can send them again,
+    # None means the body can't be replayed
+    positions = {}
+    for key, value in (files or {}).items():
+        file = value[1] if isinstance(value, tuple) else value
+        if hasattr(file, 'read'):
+            try:
+                positions[key] = (file, file.tell())
+            except (AttributeError, OSError):
+                return None
+    return positions
+
+
+def _rewind_files(positions):
+    for file, position in positions.values():
+        file.seek(position)
+
+
+class _Call:
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class _SingleFlight:
+    # runs a single call at a time per key, concurrent callers with the same key wait for its outcome
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns the outcome of ``fn()`` and whether it was shared with an earlier caller."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.response, True
+        try:
+            call.response = fn()
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.response, False
+
+
+def _content_length(headers):
+    try:
+        return int(headers['Content-Length'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
 class HttpClient:
     """The HTTP Client object.
 
@@ -32,32 +107,191 @@ class HttpClient:
     This class should not be instantiated directly but rather accessed through the `http`
     attribute of an `ApiClient` instance.
 
+    A single instance may be shared between threads: `request` keeps no per-call state on the
+    instance, and the connection pool hands each in-flight request its own connection. When sharing
+    a client across many threads, size `pool_maxsize` to at least the number of threads so that
+    connections are reused instead of being discarded and re-established after every request.
+
+    Callbacks can be registered to instrument every request, see `add_hook` and
+    :py:class:`modzy.metrics.MetricsRegistry`.
+
     Attributes:
         session (requests.Session): The requests `Session` used to make HTTP requests.
+        retry_policy (RetryPolicy): The policy used to retry failed requests.
+        codec (JsonCodec): The codec used to encode request bodies and decode responses.
+        cache (Optional[MetadataCache]): The cache used by requests made with ``cached=True``, None
+            disables caching.
+        coalesce (bool): Whether concurrent identical ``GET`` requests share a single request.
     """
 
-    def __init__(self, api_client, session=None):
+    HOOK_EVENTS = ('before_request', 'after_request')
+
+    def __init__(self, api_client, session=None, pool_connections=DEFAULT_POOLSIZE, pool_maxsize=DEFAULT_POOLSIZE,
+                 pool_block=DEFAULT_POOLBLOCK, retry_policy=None, codec=None, cache=None, coalesce=False):
         """Creates an `HttpClient` instance.
 
         Args:
             api_client (ApiClient): An `ApiClient` instance.
             session (Optional[requests.Session]): A requests `Session` used to make HTTP requests.
                 If None is specified one will be created. Defaults to None.
+            pool_connections (int): The number of per-host connection pools to cache. Only used when
+                `session` is None. Defaults to 10.
+            pool_maxsize (int): The maximum number of connections kept open per host. Only used when
+                `session` is None. Defaults to 10.
+            pool_block (bool): Whether requests should wait for a free connection once `pool_maxsize`
+                connections are in use instead of opening extra, non-pooled connections. Only used when
+                `session` is None. Defaults to False.
+            retry_policy (Optional[RetryPolicy]): The policy used to retry failed requests. If None is
+                specified the default `RetryPolicy` is used. Defaults to None.
+            codec (Optional[Union[str, JsonCodec]]): The JSON codec, or codec name, used to encode request
+                bodies and decode responses. If None is specified the fastest installed codec is used
+                (see :py:func:`modzy.codec.get_codec`). Defaults to None.
+            cache (Optional[MetadataCache]): The cache used by requests made with ``cached=True``. If None
+                is specified responses are never cached. Defaults to None.
+            coalesce (bool): Share one in-flight request between threads making identical ``GET``
+                requests at the same time, e.g. many consumers polling the same job. Each caller still
+                gets its own decoded copy of the response. A caller joining a request started before a
+                change it made itself may not see that change, so this is off by default. Defaults to False.
         """
         self._api_client = api_client
-        self.session = session if session is not None else requests.Session()
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                  pool_block=pool_block)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.codec = get_codec(codec)
+        self.cache = cache
+        self.coalesce = coalesce
+        self._in_flight = _SingleFlight()
         self.logger = logging.getLogger(__name__)
+        self._hooks = {event: () for event in self.HOOK_EVENTS}
+
+    def add_hook(self, event, callback):
+        """Registers a callback called for every request.
+
+        Callbacks receive a :py:class:`modzy.metrics.RequestInfo` instance. ``before_request`` callbacks
+        are called before the request is sent and ``after_request`` callbacks once the response has been
+        decoded or the request failed. Callbacks run on the thread making the request and exceptions they
+        raise are logged and ignored.
+
+        Args:
+            event (str): ``'before_request'`` or ``'after_request'``.
+            callback (Callable[[RequestInfo], None]): The callback.
+
+        Raises:
+            ValueError: The event is unknown.
+        """
+        if event not in self._hooks:
+            raise ValueError("unknown hook event '{}', choose one of {}".format(event, ', '.join(self.HOOK_EVENTS)))
+        # hooks are replaced rather than mutated so requests in flight on other threads are not affected
+        self._hooks[event] = self._hooks[event] + (callback,)
 
-    def request(self, method, url, json_data=None, file_data=None, params=None):
+    def remove_hook(self, event, callback):
+        """Unregisters a callback registered with `add_hook`.
+
+        Args:
+            event (str): ``'before_request'`` or ``'after_request'``.
+            callback (Callable[[RequestInfo], None]): The callback.
+
+        Raises:
+            ValueError: The callback is not registered for this event.
+        """
+        hooks = list(self._hooks.get(event, ()))
+        try:
+            hooks.remove(callback)
+        except ValueError:
+            raise ValueError("the callback is not registered for '{}'".format(event))
+        self._hooks[event] = tuple(hooks)
+
+    def _run_hooks(self, event, info):
+        for callback in self._hooks[event]:
+            try:
+                callback(info)
+            except Exception:
+                self.logger.exception('%s hook %r failed', event, callback)
+
+    def _start_request(self, method, url):
+        if not (self._hooks['before_request'] or self._hooks['after_request']):
+            return None
+        info = RequestInfo(method, url, route_template(url, self._api_client.base_url), time.perf_counter())
+        self._run_hooks('before_request', info)
+        return info
+
+    def _end_request(self, info, response=None, error=None):
+        if info is None:
+            return
+        info.elapsed = time.perf_counter() - info.start
+        info.error = error
+        if response is None:
+            response = getattr(error, 'response', None)
+        if response is not None:
+            info.status_code = response.status_code
+            info.request_bytes = _content_length(response.request.headers) if response.request is not None else None
+            if response.raw is not None and not response._content_consumed:
+                info.response_bytes = _content_length(response.headers)
+            else:
+                info.response_bytes = len(response.content or b'')
+        self._run_hooks('after_request', info)
+
+    def pool_stats(self):
+        """Gets connection pool statistics for each host contacted by this client.
+
+        Useful to check connection reuse under load: `requests` minus `connections` is the number of
+        requests served by an already open connection.
+
+        Returns:
+            dict: A `dict` mapping each ``scheme://host:port`` origin to a `dict` with the number of
+            `connections` opened, `requests` sent, `reused` connections, `idle` connections currently
+            waiting in the pool and the `reuse_rate` (0 to 1).
+        """
+        stats = {}
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        for adapter in adapters.values():
+            pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+            if pools is None:
+                continue
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                origin = '{}://{}:{}'.format(pool.scheme, pool.host, pool.port)
+                connections = pool.num_connections
+                sent = pool.num_requests
+                reused = max(sent - connections, 0)
+                stats[origin] = {
+                    'connections': connections,
+                    'requests': sent,
+                    'reused': reused,
+                    'idle': pool.pool.qsize() if pool.pool is not None else 0,
+                    'reuse_rate': reused / sent if sent else 0.0,
+                }
+        return stats
+
+    def request(self, method, url, json_data=None, file_data=None, params=None, retry=None, raw=False,
+                cached=False, coalesce=None):
         """Sends an HTTP request.
 
-        The client's API key will automatically be used for authentication.
+        The client's API key will automatically be used for authentication. Failed requests are
+        retried according to the client's `retry_policy` (see :py:class:`modzy.retry.RetryPolicy`).
 
         Args:
             method (str): The HTTP method for the request.
             url (str): URL to request.
-            json_data (Optional[Any]): JSON serializeable object to include in the request body.
+            json_data (Optional[Any]): JSON serializeable object to include in the request body, or a
+                `JsonStream` to encode while the request is sent.
             file_data (Optional[Any]): Dictionary to be submitted as files part of the request
+            params (Optional[dict]): Query string parameters.
+            retry (Optional[Union[RetryPolicy, bool]]): Retry policy for this call. None uses the
+                client's `retry_policy`, False disables retries. Defaults to None.
+            raw (bool): Return the decoded JSON as plain `dict` and `list` objects instead of wrapping
+                it for attribute access. Defaults to False.
+            cached (bool): Serve ``GET`` requests from the client's `cache`, if any, and cache their
+                responses. Only meant for read-only metadata. Defaults to False.
+            coalesce (Optional[bool]): Share the response of an identical ``GET`` request already in flight
+                on another thread. None uses the client's `coalesce` setting. Defaults to None.
 
         Returns:
             dict: JSON object deserialized from the response body.
@@ -66,30 +300,183 @@ class HttpClient:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
-
+        self._ensure_checked()
+        return self._request(method, url, json_data=json_data, file_data=file_data, params=params, retry=retry,
+                             raw=raw, cached=cached, coalesce=coalesce)
+
+    def _ensure_checked(self):
+        # the ApiClient checks its base url lazily, before the first request
+        ensure_checked = getattr(self._api_client, '_ensure_checked', None)
+        if ensure_checked is not None:
+            ensure_checked()
+
+    def _request(self, method, url, json_data=None, file_data=None, params=None, retry=None, raw=False,
+                 cached=False, coalesce=None):
         url = _urlappend(self._api_client.base_url, url)
 
-        if json_data:
-            data = json.dumps(json_data).encode('utf-8')
+        if isinstance(json_data, JsonStream):
+            data = json_data  # encoded while it is sent
+        elif json_data:
+            data = self.codec.encode(json_data)
         else:
             data = None
 
-        headers = {'Accept': 'application/json'}
-        if self._api_client.api_key:  # will there be any endpoints that don't need an api key?
-            headers['Authorization'] = 'ApiKey {}'.format(self._api_client.api_key)
+        headers = self._headers()
         if json_data is not None:
             headers['Content-Type'] = 'application/json'
         self.logger.debug("%s: %s - [%s]", method, url, self._api_client.cert)
 
+        cache_key = entry = None
+        if cached and self.cache is not None and method == 'GET':
+            cache_key = (self._api_client.api_key, url, tuple(sorted(params.items())) if params else None)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                if entry.expires > time.monotonic():
+                    self.logger.debug("%s: %s - served from cache", method, url)
+                    return self._decode_body(entry.body, raw)
+                if entry.etag:
+                    headers['If-None-Match'] = entry.etag
+
+        info = self._start_request(method, url)
+        response = None
         try:
-            response = self.session.request(method, url, data=data, headers=headers, files=file_data, verify=self._api_client.cert, params=params)
-            self.logger.debug("response %s - length %s", response.status_code, len(response.content))
-        except requests.exceptions.RequestException as ex:
-            self.logger.exception('unable to make network request')
-            raise NetworkError(str(ex), url, reason=ex)
+            if (method == 'GET' and data is None and not file_data
+                    and (self.coalesce if coalesce is None else coalesce)):
+                flight_key = (self._api_client.api_key, url, tuple(sorted(params.items())) if params else None,
+                              headers.get('If-None-Match'))
+                response, shared = self._in_flight.do(flight_key, lambda: self._send(
+                    method, url, self._get_retry_policy(retry), info=info, headers=headers, params=params))
+                if info is not None:
+                    info.coalesced = shared
+            else:
+                response = self._send(method, url, self._get_retry_policy(retry), info=info,
+                                      data=data, headers=headers, files=file_data, params=params)
+            if cache_key is None:
+                json_data = self._decode(response, url, raw)
+            elif response.status_code == 304 and entry is not None:
+                self.cache.refresh(cache_key, entry)
+                json_data = self._decode_body(entry.body, raw)
+            else:
+                json_data = self._decode(response, url, raw)
+                if 'no-store' not in response.headers.get('Cache-Control', ''):
+                    self.cache.put(cache_key, response.content, response.headers.get('ETag'))
+        except Exception as ex:
+            self._end_request(info, response, ex)
+            raise
+        self._end_request(info, response)
+        return json_data
+
+    @contextmanager
+    def stream(self, method, url, params=None, retry=None):
+        """Sends an HTTP request and gives access to the response body as it is received.
+
+        Useful to parse very large responses incrementally instead of loading them in memory::
+
+            with client.http.stream('GET', '/results/' + job_identifier) as body:
+                for chunk in iter(lambda: body.read(65536), b''):
+                    ...
+
+        Args:
+            method (str): The HTTP method for the request.
+            url (str): URL to request.
+            params (Optional[dict]): Query string parameters.
+            retry (Optional[Union[RetryPolicy, bool]]): Retry policy for this call. None uses the
+                client's `retry_policy`, False disables retries. Defaults to None.
+
+        Yields:
+            file: A binary file-like object reading the (decompressed) response body. The connection
+            is released when the context exits.
+
+        Raises:
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+        """
+        self._ensure_checked()
+        url = _urlappend(self._api_client.base_url, url)
+        self.logger.debug("%s: %s (streaming) - [%s]", method, url, self._api_client.cert)
+        info = self._start_request(method, url)
+        response = None
+        try:
+            response = self._send(method, url, self._get_retry_policy(retry), info=info,
+                                  headers=self._headers(), params=params, stream=True)
+            if not (200 <= response.status_code < 300):
+                self._decode(response, url)  # reads the error message and raises
+        except Exception as ex:
+            if response is not None:
+                response.close()
+            self._end_request(info, response, ex)
+            raise
+        try:
+            response.raw.decode_content = True
+            yield response.raw
+        finally:
+            response.close()
+            self._end_request(info, response)
+
+    def _headers(self):
+        headers = {'Accept': 'application/json'}
+        if self._api_client.api_key:  # will there be any endpoints that don't need an api key?
+            headers['Authorization'] = 'ApiKey {}'.format(self._api_client.api_key)
+        return headers
+
+    def _get_retry_policy(self, retry):
+        if retry is None:
+            return self.retry_policy
+        if retry is False:
+            return _NO_RETRIES
+        if retry is True:
+            return RetryPolicy()
+        return retry
+
+    def _send(self, method, url, policy, files=None, info=None, **kwargs):
+        rewind = _file_positions(files)
+        retries = 0
+        while True:
+            try:
+                response = self.session.request(method, url, files=files, verify=self._api_client.cert, **kwargs)
+                self.logger.debug("response %s - length %s", response.status_code,
+                                  response.headers.get('Content-Length'))
+            except requests.exceptions.RequestException as ex:
+                if retries < policy.total and rewind is not None and policy.is_retryable_error(method, ex):
+                    delay = policy.get_backoff(retries)
+                    self.logger.warning("%s %s failed (%s), retrying in %.2fs", method, url, ex, delay)
+                else:
+                    self.logger.exception('unable to make network request')
+                    raise NetworkError(str(ex), url, reason=ex)
+            else:
+                if (200 <= response.status_code < 300 or retries >= policy.total or rewind is None
+                        or not policy.is_retryable_status(method, response.status_code)):
+                    return response
+                delay = policy.get_backoff(retries, response)
+                self.logger.warning("%s %s returned %s, retrying in %.2fs", method, url, response.status_code, delay)
+                response.close()
+            time.sleep(delay)
+            retries += 1
+            if info is not None:
+                info.retries = retries
+            _rewind_files(rewind)
+
+    def invalidate_cache(self, route='/'):
+        """Drops the cached responses of a route and of the routes below it.
+
+        Args:
+            route (str): The route, e.g. ``'/models/ed542963de'``. Defaults to every route.
+
+        Returns:
+            int: The number of cache entries dropped.
+        """
+        if self.cache is None:
+            return 0
+        prefix = _urlappend(self._api_client.base_url, route)
+        return self.cache.invalidate(lambda key: key[1].startswith(prefix))
+
+    def _decode_body(self, content, raw):
+        json_data = self.codec.decode(content)
+        return json_data if raw else wrap_json(json_data)
 
+    def _decode(self, response, url, raw=False):
         try:
-            json_data = json.loads(response.content.decode('utf-8'), object_hook=ApiObject)
+            json_data = self._decode_body(response.content, raw)
         except ValueError:
             if len(response.content) > 0:
                 json_data = None
@@ -111,11 +498,15 @@ class HttpClient:
 
         return json_data
 
-    def get(self, url):
+    def get(self, url, retry=None, cached=False, coalesce=None):
         """Sends a GET request.
 
         Args:
             url (str): URL to request.
+            retry (Optional[Union[RetryPolicy, bool]]): Retry policy override for this call.
+            cached (bool): Use the client's `cache`, if any. Defaults to False.
+            coalesce (Optional[bool]): Share an identical request in flight, None uses the client's
+                `coalesce` setting. Defaults to None.
 
         Returns:
             dict: JSON object.
@@ -124,14 +515,15 @@ class HttpClient:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
-        return self.request('GET', url)
+        return self.request('GET', url, retry=retry, cached=cached, coalesce=coalesce)
 
-    def post(self, url, json_data=None, file_data=None, params=None):
+    def post(self, url, json_data=None, file_data=None, params=None, retry=None):
         """Sends a POST request.
 
         Args:
             url (str): URL to request.
             json_data (Optional[dict]): JSON to include in the request body.
+            retry (Optional[Union[RetryPolicy, bool]]): Retry policy override for this call.
 
         Returns:
             dict: JSON object.
@@ -140,14 +532,15 @@ class HttpClient:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
-        return self.request('POST', url, json_data=json_data, file_data=file_data, params=params)
+        return self.request('POST', url, json_data=json_data, file_data=file_data, params=params, retry=retry)
 
-    def patch(self, url, json_data=None):
+    def patch(self, url, json_data=None, retry=None):
         """Sends a PATCH request.
 
         Args:
             url (str): URL to request.
             json_data (Optional[dict]): JSON to include in the request body.
+            retry (Optional[Union[RetryPolicy, bool]]): Retry policy override for this call.
 
         Returns:
             dict: JSON object.
@@ -156,14 +549,15 @@ class HttpClient:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
-        return self.request('PATCH', url, json_data=json_data)
+        return self.request('PATCH', url, json_data=json_data, retry=retry)
 
-    def put(self, url, json_data=None):
+    def put(self, url, json_data=None, retry=None):
         """Sends a PUT request.
 
         Args:
             url (str): URL to request.
             json_data (Optional[dict]): JSON to include in the request body.
+            retry (Optional[Union[RetryPolicy, bool]]): Retry policy override for this call.
 
         Returns:
             dict: JSON object.
@@ -172,14 +566,15 @@ class HttpClient:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
-        return self.request('PUT', url, json_data=json_data)
+        return self.request('PUT', url, json_data=json_data, retry=retry)
 
-    def delete(self, url, json_data=None):
+    def delete(self, url, json_data=None, retry=None):
         """Sends a DELETE request.
 
         Args:
             url (str): URL to request.
             json_data (Optional[dict]): JSON to include in the request body.
+            retry (Optional[Union[RetryPolicy, bool]]): Retry policy override for this call.
 
         Returns:
             dict: JSON object.
@@ -188,4 +583,4 @@ class HttpClient:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
-        return self.request('DELETE', url, json_data=json_data)
+        return self.request('DELETE', url, json_data=json_data, retry=retry)
@@ -2,17 +2,21 @@
 """Classes for interacting with jobs."""
 
 import logging
-from multiprocessing.sharedctypes import Value
+import os
 import time
-import boto3
 from datetime import datetime
 from types import SimpleNamespace
 from urllib.parse import urlencode
 from ._api_object import ApiObject
 from ._size import human_read_to_bytes
-from ._util import encode_data_uri, depth, file_to_chunks, bytes_to_chunks
-from .error import Timeout
+from ._upload import DEFAULT_MAX_INFLIGHT_CHUNKS, InputUploader, ResumableUpload, UploadJournal, upload_key
+from ._util import DataUri, JsonStream, depth, file_to_bytes, file_to_chunks, bytes_to_chunks
+from .error import ApiError
 from .models import Model, Models
+from .polling import get_schedule
+from .records import JobSummary
+from .sharding import submit_sharded
+from .validation import InputValidator
 from deprecation import deprecated
 
 
@@ -27,6 +31,7 @@ class Jobs:
     """
 
     _base_route = '/jobs'
+    _features_ttl = 300
 
     # is this the best place to put these?
     status = SimpleNamespace(
@@ -35,6 +40,7 @@ class Jobs:
         COMPLETED='COMPLETED',
         CANCELED='CANCELED',
         TIMEDOUT='TIMEDOUT',
+        OPEN='OPEN',
     )
     """Possible job statuses."""
 
@@ -46,6 +52,24 @@ class Jobs:
         """
         self._api_client = api_client
         self.logger = logging.getLogger(__name__)
+        self._validator = None
+        self._tracker = None
+        self._chunk_size = (0, None)
+
+    @property
+    def validator(self):
+        """InputValidator: The validator used by the submit methods called with ``validate=True``."""
+        if self._validator is None:
+            self._validator = InputValidator(self._api_client)
+        return self._validator
+
+    @property
+    def tracker(self):
+        """JobTracker: A tracker waiting on many jobs from a single thread, see `modzy.tracker.JobTracker`."""
+        if self._tracker is None:
+            from .tracker import JobTracker  # imports this module
+            self._tracker = JobTracker(self._api_client)
+        return self._tracker
 
     def get(self, job):
         """Gets a `Job` instance.
@@ -66,7 +90,7 @@ class Jobs:
         return Job(json_obj, self._api_client)
 
     def get_history(self, user=None, access_key=None, start_date=None, end_date=None, model=None,
-                    status='all', sort_by=None, direction=None, page=None, per_page=None):
+                    status='all', sort_by=None, direction=None, page=None, per_page=None, compact=False):
         """Gets a list of `Job` instances within a set of parameters.
 
         Args:
@@ -80,9 +104,11 @@ class Jobs:
             direction (Optional[str]): Direction of the sorting algorithm (asc, desc)
             page (Optional[float]): The page number for which results are being returned
             per_page (Optional[float]): The number of job identifiers returned by page
+            compact (bool): Return memory efficient `JobSummary` records instead of `Job` instances.
+                Defaults to False.
 
         Returns:
-            List[Job]: A list of `Job` instances.
+            List[Job]: A list of `Job` instances, or `JobSummary` records if `compact` is True.
         Raises:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
@@ -133,7 +159,10 @@ class Jobs:
         }
         body = {k: v for (k, v) in body.items() if v is not None}
         self.logger.debug("body 2? %s", body)
-        json_list = self._api_client.http.get('{}/history?{}'.format(self._base_route, urlencode(body)))
+        url = '{}/history?{}'.format(self._base_route, urlencode(body))
+        if compact:
+            return list(map(JobSummary.from_json, self._api_client.http.request('GET', url, raw=True)))
+        json_list = self._api_client.http.get(url)
         return list(Job(json_obj, self._api_client) for json_obj in json_list)
 
     def cancel(self, job):
@@ -154,7 +183,7 @@ class Jobs:
         json_obj = self._api_client.http.delete('{}/{}'.format(self._base_route, identifier))
         return Job(json_obj, self._api_client)
 
-    def block_until_complete(self, job, timeout=60, poll_interval=5):
+    def block_until_complete(self, job, timeout=60, poll_interval=None):
         """Blocks until the `Job` completes or a timeout is reached.
 
         This is accomplished by polling the API until the `Job` status is set to `COMPLETED`
@@ -164,7 +193,8 @@ class Jobs:
             job (Union[str, Job, Result]): The job identifier or a `Job` or `Result` instance.
             timeout (Optional[float]): Seconds to wait until timeout. `None` indicates wait forever.
                 Defaults to 60.
-            poll_interval (Optional[float]): Seconds between polls. Defaults to 1.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls, or a `PollSchedule`.
+                If None is specified the client's `poll_schedule` is used. Defaults to None.
 
         Returns:
             Job: The `Job` instance.
@@ -175,17 +205,15 @@ class Jobs:
                 or the client is unable to connect.
         """
         identifier = Job._coerce_identifier(job)
-        endby = time.time() + timeout if (timeout is not None) else None
+        wait = get_schedule(poll_interval, self._api_client).wait(timeout)
+        progress = job if isinstance(job, dict) else None
         while True:  # wait one poll at least once
-            self.logger.debug("waiting... %g", poll_interval)
-            time.sleep(poll_interval)
-            job = self.get(identifier)
+            wait.sleep(progress)
+            job = progress = self.get(identifier)
             self.logger.debug("job %s", job)
             if job.status not in (Jobs.status.SUBMITTED, Jobs.status.IN_PROGRESS):
+                wait.done(job)
                 return job
-            if (endby is not None) and (time.time() > endby - poll_interval):
-                raise Timeout('timed out before completion')
-        # TODO: should probably ramp up poll_interval as wait time increases
 
     def __fix_single_source_job(self, sources):
         """Compatibility function to check and fix the sources parameter if is a single source dict
@@ -205,6 +233,8 @@ class Jobs:
 
     def check_storagegrid_endpoint(self, endpoint, bucket, access_key_id, secret_access_key):
 
+        import boto3  # only needed here, and slow to import
+
         # establish session with aws sdk
         session = boto3.session.Session()
         # try to connect to storagegrid endpoint
@@ -231,6 +261,94 @@ class Jobs:
         
         return new_endpoint
         
+    def submit(self, model, version, sources, explain=False, embedded_max_size=None, validate=False):
+        """Submits a `Job`, choosing the cheapest transport for its inputs.
+
+        Inputs are sent in a single request, as text (when they are all `str`) or embedded, as long as
+        that request stays under `embedded_max_size`. Larger jobs, and file objects of unknown size, are
+        uploaded in chunks with `submit_file`. Measured with ``benchmarks/bench_transport.py``, one
+        embedded request beats a chunked upload at every size despite the base64 overhead, the upload
+        paying two more round trips plus one per chunk, so the threshold is the request size the API
+        accepts for a chunk.
+
+        Args:
+            model (Union[str, Model]): The model identifier or a `Model` instance.
+            version (str): The model version string.
+            sources (dict): A mapping of source names to sources. Each source should be a mapping of
+                model input filename to text (`str`), bytes-like object, `os.PathLike` path or binary
+                file object.
+            explain (bool): indicates if you desire an explainable result for your model.`
+            embedded_max_size (Optional[int]): The maximum size, in bytes, of the inputs of a job sent in a
+                single request, base64 encoding included. Defaults to the API's `input_chunk_maximum_size`
+                feature.
+            validate (bool): Check the inputs against the model version's input specification before
+                sending them. Defaults to False.
+
+        Returns:
+            Job: The submitted `Job` instance.
+
+        Raises:
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+            InputValidationError: `validate` is True and an input is missing, unknown, too large or of a
+                media type the model doesn't accept.
+        """
+        sources = self.__fix_single_source_job(sources)
+        if validate:
+            self.validator.validate(model, version, sources)
+        chunk_size = None
+        if embedded_max_size is None:
+            embedded_max_size = chunk_size = self.__chunk_size()
+        values = [value for inputs in sources.values() for value in inputs.values()]
+        sizes = [self.__input_size(value) for value in values]
+        if all(isinstance(value, str) for value in values) and sum(sizes) <= embedded_max_size:
+            self.logger.debug("submitting %d inputs as text", len(values))
+            return self.submit_text(model, version, sources, explain)
+        # text mixed with binary data, or too large for a text request, is sent as UTF-8 files
+        sources = {
+            source: {key: value.encode('utf-8') if isinstance(value, str) else value for key, value in inputs.items()}
+            for source, inputs in sources.items()
+        }
+        if None not in sizes and sum((size + 2) // 3 * 4 for size in sizes) <= embedded_max_size:
+            self.logger.debug("submitting %d inputs embedded", len(values))
+            return self.submit_embedded(model, version, {
+                source: {key: value if isinstance(value, (bytes, bytearray, memoryview)) else file_to_bytes(value)
+                         for key, value in inputs.items()}
+                for source, inputs in sources.items()
+            }, explain)
+        self.logger.debug("submitting %d inputs as files", len(values))
+        return self.__submit_file(model, version, sources, explain, chunk_size=chunk_size)
+
+    def __chunk_size(self):
+        # the features are fetched once in a while, not for every submission
+        expires, chunk_size = self._chunk_size
+        if expires > time.monotonic():
+            return chunk_size
+        try:
+            chunk_size = human_read_to_bytes(self.get_features()["input_chunk_maximum_size"])
+        except Exception:
+            self.logger.warning("Error getting features, assuming defaults")
+            return 1024 * 1024
+        self._chunk_size = (time.monotonic() + self._features_ttl, chunk_size)
+        return chunk_size
+
+    @staticmethod
+    def __input_size(value):
+        # the size of an input in bytes, None for file objects that can't be measured without reading them
+        if isinstance(value, str):
+            return len(value.encode('utf-8'))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return memoryview(value).nbytes
+        if hasattr(value, 'read'):
+            if not (hasattr(value, 'seekable') and value.seekable()):
+                return None
+            position = value.tell()
+            try:
+                return value.seek(0, os.SEEK_END)
+            finally:
+                value.seek(position)
+        return os.stat(value).st_size
+
     def submit_text(self, model, version, sources, explain=False):
         """Submits text data for a multiple source `Job`.
 
@@ -279,11 +397,49 @@ class Jobs:
         response = self._api_client.http.post(self._base_route, body)
         return Job(response, self._api_client)
 
+    def submit_sharded(self, submit, model, version, sources, *args, max_sources=1000, max_bytes=None,
+                       concurrency=4, **kwargs):
+        """Submits a large multi-source job as several smaller jobs, processed in parallel.
+
+        The sources are split into shards of at most `max_sources` sources and `max_bytes` of data, each
+        submitted as a job by `submit`, concurrently. Smaller request bodies are sent and the shards can
+        run on several processing engines. The returned `ShardedJob` waits for and gathers the results of
+        all the shards::
+
+            sharded = client.jobs.submit_sharded(client.jobs.submit_text, 'ed542963de', '1.0.1', sources,
+                                                 max_sources=500)
+            result = sharded.block_until_complete(timeout=None)
+            outputs = result.get_source_outputs('source-name-1')
+
+        Args:
+            submit (Callable[..., Job]): The submit method to use, e.g. `submit_text` or `submit_aws_s3`.
+            model (Union[str, Model]): The model identifier or a `Model` instance.
+            version (str): The model version string.
+            sources (dict): A mapping of source names to sources.
+            *args: Additional positional arguments for `submit`, e.g. the credentials of `submit_aws_s3`.
+            max_sources (Optional[int]): The maximum number of sources per job. Defaults to 1000.
+            max_bytes (Optional[int]): The maximum size of the `str` and bytes-like data of a job. If None is
+                specified jobs are only limited by `max_sources`. Defaults to None.
+            concurrency (int): The maximum number of jobs submitted at the same time. Defaults to 4.
+            **kwargs: Additional keyword arguments for `submit`, e.g. `explain`.
+
+        Returns:
+            ShardedJob: The submitted jobs.
+
+        Raises:
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect. The jobs already submitted are canceled.
+        """
+        if depth(sources) == 1:  # a single source
+            sources = {'job': sources}
+        return submit_sharded(self._api_client, submit, model, version, sources, args, kwargs, max_sources,
+                              max_bytes, concurrency)
+
     @deprecated(deprecated_in="0.5.6", removed_in="1.0", details="Use jobs.submit_text function instead")
     def submit_text_bulk(self, model, version, sources, explain=False):
         return self.submit_text(model, version, sources, explain)
 
-    def submit_embedded(self, model, version, sources, explain=False):
+    def submit_embedded(self, model, version, sources, explain=False, validate=False):
         """Submits embedded data for a multiple source `Job`.
 
         Args:
@@ -292,6 +448,8 @@ class Jobs:
             sources (dict): A mapping of source names to text sources. Each source should be a
                 mapping of model input filename to bytes-like object.
             explain (bool): indicates if you desire an explainable result for your model.`
+            validate (bool): Check the inputs against the model version's input specification before
+                sending them. Defaults to False.
 
         Returns:
             Job: The submitted `Job` instance.
@@ -299,6 +457,8 @@ class Jobs:
         Raises:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
+            InputValidationError: `validate` is True and an input is missing, unknown, too large or of a
+                media type the model doesn't accept.
 
             Example:
                 .. code-block::
@@ -317,9 +477,11 @@ class Jobs:
         """
         identifier = Model._coerce_identifier(model)
         version = str(version)
+        if validate:
+            self.validator.validate(identifier, version, self.__fix_single_source_job(sources))
         sources = {
             source: {
-                key: encode_data_uri(value)
+                key: DataUri(value)
                 for key, value in inputs.items()
             }
             for source, inputs in sources.items()
@@ -337,7 +499,8 @@ class Jobs:
             }
         }
 
-        response = self._api_client.http.post(self._base_route, body)
+        # the inputs are base64 encoded block by block while the request is sent
+        response = self._api_client.http.post(self._base_route, JsonStream(body))
         return Job(response, self._api_client)
 
     @deprecated(deprecated_in="0.5.6", removed_in="1.0", details="Use jobs.submit_embedded function instead")
@@ -348,7 +511,8 @@ class Jobs:
     def submit_bytes_bulk(self, model, version, sources, explain=False):
         return self.submit_embedded(model, version, sources, explain)
 
-    def submit_file(self, model, version, sources, explain=False):
+    def submit_file(self, model, version, sources, explain=False, max_inflight_chunks=DEFAULT_MAX_INFLIGHT_CHUNKS,
+                    max_inflight_bytes=None, journal=None, validate=False):
         """Submits filepath or file-like data data for a multiple source `Job`.
 
                 Args:
@@ -357,13 +521,32 @@ class Jobs:
                     sources (dict): A mapping of source names to text sources. Each source should be a
                         mapping of model input filename to filepath or file-like object.
                     explain (bool): indicates if you desire an explainable result for your model.`
+                    max_inflight_chunks (int): The maximum number of chunks uploaded at the same time. The
+                        chunks of an input are always sent in order, different inputs are uploaded
+                        concurrently. Use 1 to upload the inputs one after the other. Defaults to 4.
+                    max_inflight_bytes (Optional[int]): The maximum number of bytes read from the inputs and
+                        not uploaded yet. Defaults to None, only `max_inflight_chunks` limits it.
+                    journal (Optional[Union[str, os.PathLike]]): A directory where the progress of the upload
+                        is recorded. If the upload is interrupted the job is left open, and calling
+                        `submit_file` again with the same arguments, e.g. from a restarted process, resumes it
+                        from the last chunk acknowledged by the API. If the inputs changed in the meantime the
+                        open job is canceled and a new upload starts. File-like objects without a file name
+                        can't be recognized again, their uploads are not recorded. Defaults to None, the job
+                        is canceled on failure.
+                    validate (bool): Check the inputs against the model version's input specification
+                        before opening the job. Defaults to False.
 
                 Returns:
                     Job: The submitted `Job` instance.
 
                 Raises:
                     ApiError: A subclass of ApiError will be raised if the API returns an error status,
-                        or the client is unable to connect.
+                        or the client is unable to connect. The job is canceled on the first failure,
+                        unless a `journal` is used.
+                    ValueError: If a `journal` is used and an input changed while it was uploaded; the job
+                        is canceled.
+                    InputValidationError: `validate` is True and an input is missing, unknown, too large or
+                        of a media type the model doesn't accept.
 
                     Example:
                         .. code-block::
@@ -380,6 +563,12 @@ class Jobs:
                                 }
                             })
                 """
+        return self.__submit_file(model, version, sources, explain, max_inflight_chunks, max_inflight_bytes, journal,
+                                  validate)
+
+    def __submit_file(self, model, version, sources, explain=False, max_inflight_chunks=DEFAULT_MAX_INFLIGHT_CHUNKS,
+                      max_inflight_bytes=None, journal=None, validate=False, chunk_size=None):
+        # chunk_size is given when the caller already looked it up
         identifier = Model._coerce_identifier(model)
         version = str(version)
         body = {
@@ -389,35 +578,68 @@ class Jobs:
             },
             "explain": explain
         }
-        # Open the job with an empty call to the job api
-        open_job = Job(self._api_client.http.post(self._base_route, body), self._api_client)
-        self.logger.debug("open job %s", open_job)
-        chunk_size = None
-        try:
-            job_features = self.get_features()
-            chunk_size = human_read_to_bytes(job_features["input_chunk_maximum_size"])
-        except:
-            self.logger.warning("Error getting features, assuming defaults")
-            chunk_size = 1024 * 1024
+        sources = self.__fix_single_source_job(sources)
+        if validate:
+            self.validator.validate(identifier, version, sources, paths=True)
+        upload = None
+        if journal is not None:
+            journal_key = upload_key(identifier, version, explain, sources)
+            if journal_key is None:
+                self.logger.info("an input has no file name, the upload won't be recorded in the journal")
+                journal = None
+            else:
+                journal = UploadJournal(journal)
+                upload = self.__resume_upload(journal, journal_key, sources)
+
+        if upload is not None:
+            open_job = Job({'jobIdentifier': upload.state['job_identifier']}, self._api_client)
+            chunk_size = upload.state['chunk_size']
+            self.logger.debug("resume job %s", open_job)
+        else:
+            # Open the job with an empty call to the job api
+            open_job = Job(self._api_client.http.post(self._base_route, body), self._api_client)
+            self.logger.debug("open job %s", open_job)
+            if chunk_size is None:
+                chunk_size = self.__chunk_size()
 
         try:
+            if journal is not None and upload is None:
+                upload = ResumableUpload.start(journal, journal_key, open_job.job_identifier, chunk_size)
+
+            def post_chunk(source, key, chunk):
+                self.__append_chunk(open_job, source, key, chunk)
+                if upload is not None:
+                    upload.ack(source, key, chunk)
+
+            def input_chunks(source, key, value):
+                chunks = self.__input_chunks(value, chunk_size)
+                return upload.chunks(source, key, chunks) if upload is not None else chunks
+
             # Iterate on the sources, submitting each input as a multipart post request
             # jobIdentifier/input-item-name/model-input-name
-            for source, inputs in self.__fix_single_source_job(sources).items():
-                for key, value in inputs.items():
-                    self.__append_input(open_job, source, key, value, chunk_size)
+            uploader = InputUploader(post_chunk, chunk_size, max_inflight_chunks, max_inflight_bytes)
+            uploader.upload((source, key, input_chunks(source, key, value))
+                            for source, inputs in sources.items()
+                            for key, value in inputs.items())
 
             open_job = self._api_client.http.post('{}/{}/close'.format(self._base_route, open_job.job_identifier))
             self.logger.debug("close job %s", open_job)
         except:
+            if upload is not None and not upload.broken:
+                # keep the job open, calling submit_file again with the same journal resumes the upload
+                self.logger.warning("upload of job %s interrupted, it can be resumed", open_job.job_identifier)
+                raise
             try:
                 # Try to cancel the job as something unexpected happened, ignore any error if something bad happen
                 # with this call in order to pass the real cause to the caller
                 self.logger.debug("canceling job %s", open_job)
                 open_job.cancel()
             finally:
-                pass
+                if upload is not None:
+                    upload.discard()
             raise
+        if upload is not None:
+            upload.discard()
         return Job(open_job, self._api_client)
 
     @deprecated(deprecated_in="0.5.6", removed_in="1.0", details="Use jobs.submit_file function instead")
@@ -429,21 +651,43 @@ class Jobs:
     def submit_files_bulk(self, model, version, sources, explain=False):
         return self.submit_file(model, version, sources, explain)
 
-    def __append_input(self, job, input_item_name, data_item_name, input_value, chunk_size):
-        iterable = None
-        if isinstance(input_value, (bytes, bytearray)):
-            iterable = bytes_to_chunks(input_value, chunk_size)
-        else:
-            iterable = file_to_chunks(input_value, chunk_size)
-
-        for i, chunk in enumerate(iterable):
-            self.logger.debug("__append_input(%s, %s, %s, %s, %s) chunk %i", job.job_identifier, input_item_name,
-                              data_item_name, type(input_value), chunk_size, i)
-            self._api_client.http.post(
-                '{}/{}/{}/{}'.format(self._base_route, job.job_identifier, input_item_name, data_item_name),
-                None,
-                {"input": chunk}
-            )
+    def __resume_upload(self, journal, key, sources):
+        state = journal.load(key)
+        if state is None:
+            return None
+        try:
+            job = self.get(state['job_identifier'])
+        except (ApiError, KeyError, TypeError):
+            job = None
+        if job is None or job.status != self.status.OPEN:
+            self.logger.info("the journal's job can't be resumed, starting a new upload")
+            journal.discard(key)
+            return None
+        upload = ResumableUpload(journal, key, state)
+        if not upload.matches(sources):
+            self.logger.info("the inputs changed since job %s was opened, starting a new upload", job.job_identifier)
+            try:
+                job.cancel()
+            except ApiError:
+                pass
+            journal.discard(key)
+            return None
+        return upload
+
+    @staticmethod
+    def __input_chunks(input_value, chunk_size):
+        if isinstance(input_value, (bytes, bytearray, memoryview)):
+            return bytes_to_chunks(input_value, chunk_size)
+        return file_to_chunks(input_value, chunk_size)
+
+    def __append_chunk(self, job, input_item_name, data_item_name, chunk):
+        self.logger.debug("__append_chunk(%s, %s, %s) %i bytes", job.job_identifier, input_item_name,
+                          data_item_name, len(chunk))
+        self._api_client.http.post(
+            '{}/{}/{}/{}'.format(self._base_route, job.job_identifier, input_item_name, data_item_name),
+            None,
+            {"input": chunk}
+        )
 
     def submit_aws_s3(self, model, version, sources, access_key_id, secret_access_key, region, explain=False):
         """Submits data stored in AWS S3 bucket for a multiple source `Job`.
@@ -754,7 +998,8 @@ class Jobs:
         """
         self.logger.debug("getting features ")
 
-        json_obj = self._api_client.http.get('{}/features'.format(self._base_route))
+        json_obj = self._api_client._discover('job_features', lambda: self._api_client.http.request(
+            'GET', '{}/features'.format(self._base_route), raw=True))
         return ApiObject(json_obj, self._api_client)
 
 
@@ -829,7 +1074,7 @@ class Job(ApiObject):
         """
         return self._api_client.results.get(self.job_identifier)
 
-    def block_until_complete(self, timeout=60, poll_interval=5):
+    def block_until_complete(self, timeout=60, poll_interval=None):
         """Blocks until the `Job` completes or a timeout is reached.
 
         This is accomplished by polling the API until the `Job` status is set to `COMPLETED`
@@ -838,7 +1083,8 @@ class Job(ApiObject):
         Args:
             timeout (Optional[float]): Seconds to wait until timeout. `None` indicates wait forever.
                 Defaults to 60.
-            poll_interval (Optional[float]): Seconds between polls. Defaults to 1.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls, or a `PollSchedule`.
+                If None is specified the client's `poll_schedule` is used. Defaults to None.
 
         Returns:
             Job: The `Job` instance (self).
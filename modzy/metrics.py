@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""In-process HTTP metrics: latency histograms, byte counts, statuses, retries and errors per route."""
+
+import bisect
+import re
+import threading
+from urllib.parse import urlparse
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# path segments that follow a collection but are not identifiers, e.g. /jobs/history or /models/tags
+_STATIC_SEGMENTS = frozenset(['history', 'features', 'tags', 'requirements', 'close', 'processing'])
+_COLLECTIONS = {'jobs': '{job}', 'results': '{job}', 'models': '{model}', 'versions': '{version}',
+                'tags': '{tag}'}
+_ID = re.compile(r'^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$')
+
+
+class RequestInfo:
+    """Information about an HTTP request passed to the `HttpClient` hooks.
+
+    The same instance is passed to the ``before_request`` and ``after_request`` hooks of a request. The
+    response related attributes are only set for ``after_request``. A request retried by the client's
+    retry policy is reported once, with its total duration and the number of retries.
+
+    Attributes:
+        method (str): The HTTP method.
+        url (str): The absolute URL, without query string.
+        route (str): The normalized route template, e.g. ``/jobs/{job}``.
+        start (float): The `time.perf_counter` value when the request started.
+        elapsed (Optional[float]): Duration of the request in seconds, including retries and decoding.
+        status_code (Optional[int]): The HTTP status of the last response, None if no response was received.
+        request_bytes (Optional[int]): Size of the request body, if known.
+        response_bytes (Optional[int]): Size of the response body, if known.
+        retries (int): Number of retries made.
+        error (Optional[Exception]): The exception raised to the caller, if any.
+        coalesced (bool): Whether the response was shared with an identical request already in flight,
+            in which case no request was sent for this call.
+    """
+
+    __slots__ = ('method', 'url', 'route', 'start', 'elapsed', 'status_code', 'request_bytes', 'response_bytes',
+                 'retries', 'error', 'coalesced')
+
+    def __init__(self, method, url, route, start):
+        self.method = method
+        self.url = url
+        self.route = route
+        self.start = start
+        self.elapsed = None
+        self.status_code = None
+        self.request_bytes = None
+        self.response_bytes = None
+        self.retries = 0
+        self.error = None
+        self.coalesced = False
+
+    def __repr__(self):
+        return "RequestInfo(method='{}',route='{}',status_code={},elapsed={})".format(
+            self.method, self.route, self.status_code, self.elapsed)
+
+
+def route_template(url, base_url=None):
+    """Normalizes a request URL into a route template.
+
+    Identifiers are replaced by placeholders so that requests for different jobs, models or versions
+    are aggregated together, e.g. ``https://host/api/jobs/0a1b...`` becomes ``/jobs/{job}``.
+
+    Args:
+        url (str): The request URL.
+        base_url (Optional[str]): The API base url, its path is removed from the route.
+
+    Returns:
+        str: The route template.
+    """
+    path = urlparse(url).path
+    base_path = urlparse(base_url).path.rstrip('/') if base_url else ''
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    segments = [segment for segment in path.split('/') if segment]
+    if len(segments) == 4 and segments[0] == 'jobs':
+        # input chunk uploads: /jobs/{job}/{source}/{input}
+        return '/jobs/{job}/{source}/{input}'
+    template = []
+    previous = None
+    for segment in segments:
+        if previous in _COLLECTIONS and segment not in _STATIC_SEGMENTS:
+            template.append(_COLLECTIONS[previous])
+        elif _ID.match(segment):
+            template.append('{id}')
+        else:
+            template.append(segment)
+        previous = segment
+    return '/' + '/'.join(template)
+
+
+class Histogram:
+    """A histogram with fixed buckets.
+
+    Attributes:
+        buckets (Tuple[float]): The upper bounds of the buckets.
+        counts (List[int]): The number of observations in each bucket, the last one counting the
+            observations above the last bound.
+        count (int): The number of observations.
+        sum (float): The sum of the observations.
+        min (Optional[float]): The smallest observation.
+        max (Optional[float]): The largest observation.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Creates a `Histogram` instance.
+
+        Args:
+            buckets (Iterable[float]): The upper bounds of the buckets. Defaults to `DEFAULT_BUCKETS`.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """Adds an observation.
+
+        Args:
+            value (float): The observed value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimates a quantile by linear interpolation within the bucket holding it.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            Optional[float]: The estimate, None if there are no observations.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max  # pragma: no cover
+
+    def snapshot(self):
+        """Gets the histogram state.
+
+        Returns:
+            dict: A `dict` with the `count`, `sum`, `min`, `max`, `mean`, `p50`, `p90` and `p99` values
+            and the cumulative `buckets` counts keyed by upper bound.
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += bucket_count
+            buckets[bound] = cumulative
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+class _RouteMetrics:
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.statuses = {}
+        self.errors = {}
+        self.retries = 0
+        self.coalesced = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def observe(self, info):
+        self.latency.observe(info.elapsed)
+        if info.status_code is not None:
+            self.statuses[info.status_code] = self.statuses.get(info.status_code, 0) + 1
+        if info.error is not None:
+            name = type(info.error).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+        self.retries += info.retries
+        self.coalesced += info.coalesced
+        self.request_bytes += info.request_bytes or 0
+        self.response_bytes += info.response_bytes or 0
+
+
+class MetricsRegistry:
+    """Collects HTTP metrics per method and route template.
+
+    For each route, the registry keeps a latency histogram, the number of responses per status, the
+    number of errors per exception class, the number of retries and the request and response bytes.
+    A registry can instrument several clients and be read at any time from any thread::
+
+        metrics = MetricsRegistry()
+        metrics.instrument(client.http)
+        ...
+        print(metrics.snapshot()['GET /results/{job}']['latency']['p99'])
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='modzy_http'):
+        """Creates a `MetricsRegistry` instance.
+
+        Args:
+            buckets (Iterable[float]): Upper bounds, in seconds, of the latency histogram buckets.
+                Defaults to `DEFAULT_BUCKETS`.
+            prefix (str): Prefix of the Prometheus metric names. Defaults to ``'modzy_http'``.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def instrument(self, http_client):
+        """Starts recording the requests made by an `HttpClient`.
+
+        Args:
+            http_client (HttpClient): The client, usually ``api_client.http``.
+
+        Returns:
+            MetricsRegistry: The registry (self).
+        """
+        http_client.add_hook('after_request', self.observe)
+        return self
+
+    def uninstrument(self, http_client):
+        """Stops recording the requests made by an `HttpClient`.
+
+        Args:
+            http_client (HttpClient): The client.
+        """
+        http_client.remove_hook('after_request', self.observe)
+
+    def observe(self, info):
+        """Records a completed request.
+
+        Args:
+            info (RequestInfo): The request information.
+        """
+        key = (info.method, info.route)
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = _RouteMetrics(self.buckets)
+            metrics.observe(info)
+
+    def reset(self):
+        """Discards all the recorded metrics."""
+        with self._lock:
+            self._routes.clear()
+
+    def snapshot(self):
+        """Gets the recorded metrics.
+
+        Returns:
+            dict: A `dict` keyed by ``'METHOD /route'`` with, for each route, the `latency` histogram
+            snapshot (see :py:meth:`Histogram.snapshot`), the `statuses` and `errors` counts, the number of
+            `retries` and of `coalesced` calls and the `request_bytes` and `response_bytes` totals.
+        """
+        with self._lock:
+            return {
+                '{} {}'.format(method, route): {
+                    'latency': metrics.latency.snapshot(),
+                    'statuses': dict(metrics.statuses),
+                    'errors': dict(metrics.errors),
+                    'retries': metrics.retries,
+                    'coalesced': metrics.coalesced,
+                    'request_bytes': metrics.request_bytes,
+                    'response_bytes': metrics.response_bytes,
+                }
+                for (method, route), metrics in sorted(self._routes.items())
+            }
+
+    def to_prometheus(self):
+        """Exports the recorded metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics.
+        """
+        prefix = self.prefix
+        duration, requests, errors, retries, coalesced, sent, received = [], [], [], [], [], [], []
+        with self._lock:
+            for (method, route), metrics in sorted(self._routes.items()):
+                labels = 'method="{}",route="{}"'.format(method, _escape(route))
+                snapshot = metrics.latency.snapshot()
+                for bound, cumulative in snapshot['buckets'].items():
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    duration.append('{}_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                        prefix, labels, le, cumulative))
+                duration.append('{}_request_duration_seconds_sum{{{}}} {!r}'.format(prefix, labels, snapshot['sum']))
+                duration.append('{}_request_duration_seconds_count{{{}}} {}'.format(prefix, labels, snapshot['count']))
+                for status, count in sorted(metrics.statuses.items()):
+                    requests.append('{}_responses_total{{{},status="{}"}} {}'.format(prefix, labels, status, count))
+                for name, count in sorted(metrics.errors.items()):
+                    errors.append('{}_errors_total{{{},error="{}"}} {}'.format(prefix, labels, name, count))
+                retries.append('{}_retries_total{{{}}} {}'.format(prefix, labels, metrics.retries))
+                coalesced.append('{}_coalesced_total{{{}}} {}'.format(prefix, labels, metrics.coalesced))
+                sent.append('{}_request_bytes_total{{{}}} {}'.format(prefix, labels, metrics.request_bytes))
+                received.append('{}_response_bytes_total{{{}}} {}'.format(prefix, labels, metrics.response_bytes))
+
+        lines = []
+        for name, kind, help_text, samples in (
+                ('request_duration_seconds', 'histogram', 'HTTP request duration, including retries.', duration),
+                ('responses_total', 'counter', 'HTTP responses by status.', requests),
+                ('errors_total', 'counter', 'Failed HTTP requests by exception class.', errors),
+                ('retries_total', 'counter', 'HTTP request retries.', retries),
+                ('coalesced_total', 'counter', 'HTTP requests served by an identical request in flight.', coalesced),
+                ('request_bytes_total', 'counter', 'HTTP request body bytes.', sent),
+                ('response_bytes_total', 'counter', 'HTTP response body bytes.', received)):
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
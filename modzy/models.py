@@ -5,20 +5,34 @@ import re
 import json
 import logging
 from datetime import datetime
+from functools import wraps
 from operator import getitem
 from collections import OrderedDict
 from typing import Union
 from ._api_object import ApiObject
 from urllib.parse import urlencode
-from .error import NotFoundError, ResponseError, BadRequestError
-from time import time as t
-from time import sleep
+from .error import NotFoundError, ResponseError, BadRequestError, Timeout
+from .polling import get_schedule
 from ._util import load_model, upload_input_example, run_model, deploy_model
+from .records import ModelSummary, VersionSummary
 
 # define constants used for model deployment method
 MODEL_HARDWARE_GPU_ID = -6
 MODEL_HARDWARE_ARM_ID = -99
 MODEL_HARDWARE_OTHER_ID = 1
+
+
+def _invalidates_metadata_cache(method):
+    # drop cached model metadata once a method changing models returns, even if it failed midway
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._api_client.http.invalidate_cache(self._base_route)
+    return wrapper
+
+
 class Models:
     """The `Models` object.
 
@@ -57,18 +71,37 @@ class Models:
             }    
         ]
 
+        self._hardware_config_options = None
+        self._hardware_config_options_lookup = None
+
+    @property
+    def hardware_config_options(self):
+        """List[dict]: The active hardware configurations of the account, fetched on first access."""
+        if self._hardware_config_options is None:
+            self._load_hardware_config_options()
+        return self._hardware_config_options
+
+    @property
+    def hardware_config_options_lookup(self):
+        """dict: The cpu count and memory (GB) of each active hardware configuration, by requirement id."""
+        if self._hardware_config_options_lookup is None:
+            self._load_hardware_config_options()
+        return self._hardware_config_options_lookup
+
+    def _load_hardware_config_options(self):
         # extract available hardware resource
         account_resources_endpoint = f"{self._base_route}/requirements/account"
-        resources_list = self._api_client.http.get(account_resources_endpoint)
-        self.hardware_config_options = [item for item in resources_list if item['status'] == "ACTIVE"]
-        self.hardware_config_options_lookup = {}
-        for item in self.hardware_config_options:
-            self.hardware_config_options_lookup[item['requirementId']] = {
+        resources_list = self._api_client._discover('hardware_requirements', lambda: self._api_client.http.request(
+            'GET', account_resources_endpoint, raw=True))
+        hardware_config_options = [item for item in resources_list if item['status'] == "ACTIVE"]
+        hardware_config_options_lookup = {}
+        for item in hardware_config_options:
+            hardware_config_options_lookup[item['requirementId']] = {
                 "cpu": float(float(item['cpuAmount'].split('m')[0])/1000),    # converting Modzy value into unit expected by SDK
                 "memory": float(item['memoryAmount'].split('G')[0])           # converting Modzy value into float value to compare with SDK value
             }
-         
-                
+        self._hardware_config_options = hardware_config_options
+        self._hardware_config_options_lookup = hardware_config_options_lookup
 
     def get_model_processing_details(self, model, version):
         """
@@ -104,8 +137,9 @@ class Models:
         self.logger.info(f"The sum of minimum processing engines is: {minimum_engines_sum}")
         return minimum_engines_sum
 
+    @_invalidates_metadata_cache
     def update_processing_engines(
-        self, model, version: str, min_engines: int, max_engines: int, timeout: int = 0, poll_rate: int = 5
+        self, model, version: str, min_engines: int, max_engines: int, timeout: int = 0, poll_rate=None
     ):
         """
         Updates the minimum and maximum processing engines for a specific model identifier and version.
@@ -118,7 +152,7 @@ class Models:
             timeout: time in seconds to wait until processing engine is spun up. 0 means return immediately, None means
             block and wait forever
             poll_rate: If timeout is nonzero, this value will determine the rate at which the state of the cluster
-            is checked
+            is checked: seconds between checks or a `PollSchedule`. None uses the client's `poll_schedule`
 
         Raises:
             ForbiddenError: Occurs if the current API client does not have the appropriate entitlements in order
@@ -159,21 +193,21 @@ class Models:
         else:
             assert timeout is None or timeout > 0, \
                 "Timeout must either be an integer >= 0 or None if you wish to indicate no timeout"
-            start_time = t()
+            wait = get_schedule(poll_rate, self._api_client).wait(timeout)
             while True:
-                current_time = t() - start_time
-                if timeout is not None and current_time > timeout:
-                    self.logger.warning(
-                        f"Timeout of {timeout} seconds reached while waiting for processing engines to initialize."
-                    )
-                    return
                 model_details = self.get_model_processing_details(model_id, version)
                 if model_details is not None:  # This means the model with the id and version is now visible
                     engines_ready = model_details['ready']
                     if engines_ready >= min_engines:
                         self.logger.info(f"{engines_ready} engines are ready.")
                         return
-                sleep(poll_rate)
+                try:
+                    wait.sleep()
+                except Timeout:
+                    self.logger.warning(
+                        f"Timeout of {timeout} seconds reached while waiting for processing engines to initialize."
+                    )
+                    return
 
     def get(self, model):
         """Gets a `Model` instance.
@@ -190,7 +224,7 @@ class Models:
         """
         modelId = Model._coerce_identifier(model)
         self.logger.debug("getting model %s", model)
-        json_obj = self._api_client.http.get('{}/{}'.format(self._base_route, modelId))
+        json_obj = self._api_client.http.get('{}/{}'.format(self._base_route, modelId), cached=True)
         return Model(json_obj, self._api_client)
 
     def get_by_name(self, name):
@@ -206,10 +240,10 @@ class Models:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
-        params = {'name': name}
-        models = self.get_models(**params)
-        if models is not None and len(models) > 0:
-            return self.get(models[0])
+        json_list = self._api_client.http.request('GET', self._base_route, params={'name': name, 'per-page': 1000},
+                                                  cached=True)
+        if json_list is not None and len(json_list) > 0:
+            return self.get(Model(json_list[0], self._api_client))
         else:
             raise NotFoundError("Model {} not found".format(name), self._base_route, None)
 
@@ -228,11 +262,16 @@ class Models:
         json_list = self._api_client.http.get('{}/{}/related-models'.format(self._base_route, identifier))
         return list(Model(json_obj, self._api_client) for json_obj in json_list)
 
-    def get_versions(self, model):
+    def get_versions(self, model, compact=False):
         """Gets a list of all the versions associated with the model provided.
 
+        Args:
+            model (Union[str, Model]): The model identifier or a `Model` instance.
+            compact (bool): Return memory efficient `VersionSummary` records instead of `ModelVersion`
+                instances. Defaults to False.
+
         Returns:
-            List[ModelVersion]: A list of `Version` instances.
+            List[ModelVersion]: A list of `Version` instances, or `VersionSummary` records if `compact` is True.
 
         Raises:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
@@ -240,7 +279,11 @@ class Models:
         """
         self.logger.debug("getting versions related to model %s", model)
         identifier = Model._coerce_identifier(model)
-        json_list = self._api_client.http.get('{}/{}/versions'.format(self._base_route, identifier))
+        url = '{}/{}/versions'.format(self._base_route, identifier)
+        if compact:
+            json_list = self._api_client.http.request('GET', url, raw=True, cached=True)
+            return list(map(VersionSummary.from_json, json_list))
+        json_list = self._api_client.http.get(url, cached=True)
         return list(ModelVersion(json_obj, self._api_client) for json_obj in json_list)
 
     def get_version(self, model, version):
@@ -256,7 +299,8 @@ class Models:
         self.logger.debug("getting version model %s version %s", model, version)
         modelId = Model._coerce_identifier(model)
         versionId = ModelVersion._coerce_identifier(version)
-        json_obj = self._api_client.http.get('{}/{}/versions/{}'.format(self._base_route, modelId, versionId))
+        json_obj = self._api_client.http.get('{}/{}/versions/{}'.format(self._base_route, modelId, versionId),
+                                             cached=True)
         return ModelVersion(json_obj, self._api_client)
 
     def get_version_input_sample(self, model, version):
@@ -306,7 +350,7 @@ class Models:
 
     def get_models(self, model_id=None, author=None, created_by_email=None, name=None, description=None,
                    is_active=None, is_expired=None, is_recommended=None, last_active_date_time=None,
-                   expiration_date_time=None, sort_by=None, direction=None, page=None, per_page=1000):
+                   expiration_date_time=None, sort_by=None, direction=None, page=None, per_page=1000, compact=False):
         """Gets a list of `Model` instances within a set of parameters.
 
         Args:
@@ -324,9 +368,11 @@ class Models:
             direction (Optional[str]): Direction of the sorting algorithm (asc, desc)
             page (Optional[float]): The page number for which results are being returned
             per_page (Optional[float]): The number of models returned by page
+            compact (bool): Return memory efficient `ModelSummary` records instead of `Model` instances.
+                Defaults to False.
 
         Returns:
-            List[Model]: A list of `Model` instances.
+            List[Model]: A list of `Model` instances, or `ModelSummary` records if `compact` is True.
         Raises:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
@@ -398,9 +444,13 @@ class Models:
         }
         body = {k: v for (k, v) in body.items() if v is not None}
         self.logger.debug("body 2? %s", body)
-        json_list = self._api_client.http.get('{}?{}'.format(self._base_route, urlencode(body)))
+        url = '{}?{}'.format(self._base_route, urlencode(body))
+        if compact:
+            return list(map(ModelSummary.from_json, self._api_client.http.request('GET', url, raw=True)))
+        json_list = self._api_client.http.get(url)
         return list(Model(json_obj, self._api_client) for json_obj in json_list)
 
+    @_invalidates_metadata_cache
     def edit_model_metadata(self, model_id, model_version, long_description=None, technical_details=None, 
                             performance_summary=None, performance_metrics=None, input_details=None, output_details=None):
 
@@ -451,6 +501,7 @@ class Models:
         }
         return container_data                 
     
+    @_invalidates_metadata_cache
     def deploy(
         self, container_image, model_name, model_version, sample_input_file=None, architecture="amd64", credentials=None, 
         model_id=None, run_timeout=None, status_timeout=None, short_description=None, tags=[], cpu_count:Union[float, int]=None, memory:Union[float, int]=None,
@@ -687,6 +738,7 @@ class Model(ApiObject):
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
+        self._api_client.http.invalidate_cache('{}/{}'.format(Models._base_route, self.modelId))
         updated = self._api_client.models.get(self.modelId)
         self.update(updated)  # is updating in place a bad idea?
         return self
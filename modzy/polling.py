@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""Schedules for polling the API while waiting on jobs, results and processing engines."""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from .error import Timeout
+
+logger = logging.getLogger(__name__)
+
+
+class PollSchedule:
+    """Decides how long to wait before each poll.
+
+    The blocking methods (`Jobs.block_until_complete`, `Results.block_until_complete`, their `Job` and
+    `Result` counterparts and `Models.update_processing_engines`) accept a schedule wherever they accept
+    a poll interval. If none is given they use the client's `poll_schedule`::
+
+        client = ApiClient(base_url=BASE_URL, api_key=API_KEY, poll_schedule=ExponentialSchedule(max_interval=5))
+        client.results.block_until_complete(job, poll_interval=DecorrelatedJitterSchedule())
+        client.results.block_until_complete(job, poll_interval=2)  # a fixed interval
+
+    Schedules hold no per-wait state and can be shared between threads.
+    """
+
+    def next_delay(self, attempt, previous, elapsed, progress=None):
+        """Gets the time to sleep before the next poll.
+
+        Args:
+            attempt (int): The number of polls already made.
+            previous (Optional[float]): The previous delay, None before the first poll.
+            elapsed (float): Seconds since the wait started.
+            progress (Optional[dict]): The last `Job` or `Result` polled, if any.
+
+        Returns:
+            float: Seconds to sleep.
+        """
+        raise NotImplementedError
+
+    def observe(self, progress, elapsed):
+        """Records a completed wait. Does nothing by default.
+
+        Args:
+            progress (dict): The completed `Job` or `Result`.
+            elapsed (float): Seconds the wait took.
+        """
+
+    def wait(self, timeout):
+        """Starts a wait.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait. `None` indicates wait forever.
+
+        Returns:
+            PollWait: The wait, whose `sleep` is called before each poll.
+        """
+        return PollWait(self, timeout)
+
+
+class FixedSchedule(PollSchedule):
+    """Polls at a fixed interval.
+
+    Attributes:
+        interval (float): Seconds between polls.
+    """
+
+    def __init__(self, interval=5):
+        self.interval = interval
+
+    def next_delay(self, attempt, previous, elapsed, progress=None):
+        return self.interval
+
+
+class ExponentialSchedule(PollSchedule):
+    """Polls quickly at first, then less and less often: the delay starts at `initial` and is multiplied
+    by `factor` after each poll, up to `max_interval`.
+
+    Attributes:
+        initial (float): Seconds before the first poll.
+        factor (float): The growth of the delay between two polls.
+        max_interval (float): The maximum number of seconds between two polls.
+    """
+
+    def __init__(self, initial=0.2, factor=2, max_interval=10):
+        if initial <= 0 or factor < 1 or max_interval < initial:
+            raise ValueError("the delays should be positive and growing")
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+
+    def next_delay(self, attempt, previous, elapsed, progress=None):
+        return min(self.max_interval, self.initial * self.factor ** attempt)
+
+
+class DecorrelatedJitterSchedule(PollSchedule):
+    """Polls with "decorrelated jitter": each delay is random, between `initial` and three times the
+    previous delay, up to `max_interval`. Clients waiting on jobs submitted together spread their polls
+    instead of hitting the API in lockstep.
+
+    Attributes:
+        initial (float): The minimum number of seconds between two polls.
+        max_interval (float): The maximum number of seconds between two polls.
+    """
+
+    def __init__(self, initial=0.2, max_interval=10):
+        if initial <= 0 or max_interval < initial:
+            raise ValueError("the delays should be positive and growing")
+        self.initial = initial
+        self.max_interval = max_interval
+
+    def next_delay(self, attempt, previous, elapsed, progress=None):
+        return min(self.max_interval, random.uniform(self.initial, (previous or self.initial) * 3))
+
+
+class EtaSchedule(PollSchedule):
+    """Polls around the time a job is expected to complete.
+
+    The completion time is estimated from the progress of the job, the rate at which its ``completed``
+    and ``failed`` inputs grow towards its ``total`` since it was submitted, or, before any input
+    finished, from the time per input observed on earlier waits for the same model version. Until an
+    estimate is available, and once the expected completion time has passed, the `fallback` schedule is
+    used.
+
+    Attributes:
+        fallback (PollSchedule): The schedule used without an estimate.
+        min_interval (float): The minimum number of seconds between two polls.
+        max_interval (float): The maximum number of seconds between two polls.
+    """
+
+    def __init__(self, fallback=None, min_interval=0.2, max_interval=30):
+        self.fallback = fallback if fallback is not None else DecorrelatedJitterSchedule(min_interval)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._seconds_per_input = {}
+        self._lock = threading.Lock()
+
+    def next_delay(self, attempt, previous, elapsed, progress=None):
+        remaining = self.estimate_remaining(progress, elapsed)
+        if remaining is None or remaining <= 0:
+            return self.fallback.next_delay(attempt, previous, elapsed, progress)
+        return min(self.max_interval, max(self.min_interval, remaining))
+
+    def estimate_remaining(self, progress, elapsed):
+        """Estimates the time left before a job completes.
+
+        Args:
+            progress (Optional[dict]): The last `Job` or `Result` polled.
+            elapsed (float): Seconds since the wait started, used when the job has no ``submittedAt``.
+
+        Returns:
+            Optional[float]: Seconds, None without an estimate.
+        """
+        total, completed = _counts(progress)
+        if not total:
+            return None
+        elapsed = _age(progress, elapsed)
+        if completed:
+            return elapsed / completed * (total - completed)
+        with self._lock:
+            seconds_per_input = self._seconds_per_input.get(_model_key(progress))
+        if seconds_per_input is None:
+            return None
+        return seconds_per_input * total - elapsed
+
+    def observe(self, progress, elapsed):
+        total, _ = _counts(progress)
+        key = _model_key(progress)
+        if not total or key is None:
+            return
+        sample = _age(progress, elapsed) / total
+        with self._lock:
+            previous = self._seconds_per_input.get(key)
+            # a moving average, so a few unusual jobs don't throw off the next estimates
+            self._seconds_per_input[key] = sample if previous is None else 0.7 * previous + 0.3 * sample
+
+
+def _counts(progress):
+    if not progress:
+        return None, None
+    total, completed, failed = progress.get('total'), progress.get('completed'), progress.get('failed')
+    if not isinstance(total, int) or not isinstance(completed, int):
+        return None, None
+    return total, completed + (failed if isinstance(failed, int) else 0)
+
+
+def _age(progress, elapsed):
+    # seconds since the job was submitted, it may have been running long before the wait started
+    submitted_at = progress.get('submittedAt')
+    if not isinstance(submitted_at, str):
+        return elapsed
+    for date_format in ('%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z'):
+        try:
+            submitted_at = datetime.strptime(submitted_at, date_format)
+            break
+        except ValueError:
+            pass
+    else:
+        return elapsed
+    return max(elapsed, (datetime.now(timezone.utc) - submitted_at).total_seconds())
+
+
+def _model_key(progress):
+    model = progress.get('model') if progress else None
+    if not isinstance(model, dict) or not model.get('identifier'):
+        return None
+    return model['identifier'], model.get('version')
+
+
+class PollWait:
+    """A wait on a single job, result or model, following a `PollSchedule`.
+
+    Attributes:
+        schedule (PollSchedule): The schedule.
+        timeout (Optional[float]): Seconds to wait. `None` indicates wait forever.
+    """
+
+    def __init__(self, schedule, timeout):
+        self.schedule = schedule
+        self.timeout = timeout
+        self.attempt = 0
+        self.previous = None
+        self._start = time.monotonic()
+
+    @property
+    def elapsed(self):
+        """float: Seconds since the wait started."""
+        return time.monotonic() - self._start
+
+    def next_delay(self, progress=None):
+        """Gets the time to wait before the next poll. The last poll happens when the timeout is reached.
+
+        Args:
+            progress (Optional[dict]): The last `Job` or `Result` polled, if any.
+
+        Returns:
+            float: Seconds to wait.
+
+        Raises:
+            Timeout: The timeout was reached, after one poll at least.
+        """
+        elapsed = self.elapsed
+        if self.timeout is not None and elapsed >= self.timeout and self.attempt > 0:
+            raise Timeout('timed out before completion')
+        delay = self.schedule.next_delay(self.attempt, self.previous, elapsed, progress)
+        if self.timeout is not None:
+            delay = min(delay, max(self.timeout - elapsed, 0))
+        logger.debug("waiting... %g", delay)
+        self.attempt += 1
+        self.previous = delay
+        return delay
+
+    def sleep(self, progress=None):
+        """Sleeps until the next poll, see `next_delay`."""
+        time.sleep(self.next_delay(progress))
+
+    def done(self, progress):
+        """Records the completion of the wait with the schedule.
+
+        Args:
+            progress (dict): The completed `Job` or `Result`.
+        """
+        self.schedule.observe(progress, self.elapsed)
+
+
+DEFAULT_SCHEDULE = EtaSchedule()
+
+
+def get_schedule(poll_interval, api_client):
+    """Resolves the `poll_interval` argument of a blocking method.
+
+    Args:
+        poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls or a schedule.
+        api_client (ApiClient): The client, whose `poll_schedule` is used if `poll_interval` is None.
+
+    Returns:
+        PollSchedule: The schedule.
+    """
+    if isinstance(poll_interval, PollSchedule):
+        return poll_interval
+    if poll_interval is not None:
+        return FixedSchedule(poll_interval)
+    return getattr(api_client, 'poll_schedule', None) or DEFAULT_SCHEDULE
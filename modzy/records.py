@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Compact, read-only records for large listings.
+
+The listing endpoints (job history, models, versions and tags) can return hundreds of thousands of
+objects. Wrapping each of them in an `ApiObject` keeps a full `dict` per object and per nested object.
+The records in this module are tuple-backed (they are `namedtuple` subclasses) and keep only the well
+known fields of each shape, which takes a fraction of the memory and is faster to build. They are
+returned when the listing methods are called with ``compact=True``::
+
+    jobs = client.jobs.get_history(status='pending', compact=True)
+    identifiers = [job.job_identifier for job in jobs]
+    job_dict = jobs[0].to_dict()  # back to the API's camelCase JSON shape
+
+Fields missing from a response are set to None.
+"""
+
+from collections import namedtuple
+
+
+def _child(value):
+    return value if type(value) is dict else {}
+
+
+class Record(tuple):
+    """Base class for compact records.
+
+    Subclasses also derive from a `namedtuple` and list, in `_json_paths`, the tuple of keys leading to
+    each field's value in the API response.
+    """
+
+    __slots__ = ()
+    _json_paths = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls._json_paths:
+            cls._from_json = _compile_from_json(cls.__name__, cls._json_paths)
+
+    @classmethod
+    def from_json(cls, json_obj):
+        """Creates a record from a decoded JSON object.
+
+        Args:
+            json_obj (dict): An object from an API response.
+
+        Returns:
+            Record: The record.
+        """
+        return cls._from_json(cls, json_obj)
+
+    def to_dict(self):
+        """Converts the record back into the API's JSON shape.
+
+        Returns:
+            dict: A `dict` with the record's fields under their original camelCase keys. Fields that
+            were missing from the response are omitted.
+        """
+        json_obj = {}
+        for value, path in zip(self, self._json_paths):
+            if value is None:
+                continue
+            target = json_obj
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = list(value) if isinstance(value, list) else value
+        return json_obj
+
+
+def _compile_from_json(name, json_paths):
+    # like `namedtuple`, generate the constructor source: a flat sequence of dict lookups is several
+    # times faster than walking the paths in a loop, which matters for pages of 100k+ objects
+    lines = ['def from_json(cls, json_obj):', '    get = json_obj.get']
+    parents = {}
+    values = []
+    for path in json_paths:
+        accessor = 'get'
+        for depth in range(1, len(path)):
+            parent = path[:depth]
+            if parent not in parents:
+                parents[parent] = '_p{}'.format(len(parents))
+                lines.append('    {} = _child({}({!r})).get'.format(parents[parent], accessor, parent[-1]))
+            accessor = parents[parent]
+        values.append('{}({!r})'.format(accessor, path[-1]))
+    lines.append('    return _tuple_new(cls, ({},))'.format(', '.join(values)))
+    namespace = {'_child': _child, '_tuple_new': tuple.__new__}
+    exec('\n'.join(lines), namespace)
+    from_json = namespace['from_json']
+    from_json.__qualname__ = '{}.from_json'.format(name)
+    return from_json
+
+
+_JOB_FIELDS = (
+    ('job_identifier', ('jobIdentifier',)),
+    ('status', ('status',)),
+    ('submitted_by', ('submittedBy',)),
+    ('model_identifier', ('model', 'identifier')),
+    ('model_version', ('model', 'version')),
+    ('model_name', ('model', 'name')),
+    ('total', ('total',)),
+    ('completed', ('completed',)),
+    ('failed', ('failed',)),
+    ('explain', ('explain',)),
+    ('submitted_at', ('submittedAt',)),
+    ('created_at', ('createdAt',)),
+    ('updated_at', ('updatedAt',)),
+)
+
+_MODEL_FIELDS = (
+    ('identifier', ('identifier',)),
+    ('name', ('name',)),
+    ('latest_version', ('latestVersion',)),
+    ('latest_active_version', ('latestActiveVersion',)),
+    ('versions', ('versions',)),
+)
+
+_VERSION_FIELDS = (
+    ('version', ('version',)),
+    ('status', ('status',)),
+    ('is_active', ('isActive',)),
+    ('is_available', ('isAvailable',)),
+    ('created_at', ('createdAt',)),
+    ('updated_at', ('updatedAt',)),
+)
+
+_TAG_FIELDS = (
+    ('identifier', ('identifier',)),
+    ('name', ('name',)),
+    ('data_type', ('dataType',)),
+    ('is_categorical', ('isCategorical',)),
+)
+
+
+def _names(fields):
+    return [name for name, _ in fields]
+
+
+def _paths(fields):
+    return tuple(path for _, path in fields)
+
+
+class JobSummary(Record, namedtuple('JobSummary', _names(_JOB_FIELDS))):
+    """A compact job history entry.
+
+    Can be used anywhere a `Job` identifier is accepted, e.g. ``client.jobs.get(summary)``.
+    """
+
+    __slots__ = ()
+    _json_paths = _paths(_JOB_FIELDS)
+
+
+class ModelSummary(Record, namedtuple('ModelSummary', _names(_MODEL_FIELDS))):
+    """A compact model listing entry.
+
+    Can be used anywhere a `Model` identifier is accepted, e.g. ``client.models.get(summary)``.
+    """
+
+    __slots__ = ()
+    _json_paths = _paths(_MODEL_FIELDS)
+
+    @classmethod
+    def from_json(cls, json_obj):
+        if 'identifier' not in json_obj and 'modelId' in json_obj:
+            json_obj = dict(json_obj, identifier=json_obj['modelId'])
+        return cls._from_json(cls, json_obj)
+
+    @property
+    def modelId(self):
+        # lets `Model._coerce_identifier` accept summaries
+        return self.identifier
+
+
+class VersionSummary(Record, namedtuple('VersionSummary', _names(_VERSION_FIELDS))):
+    """A compact model version listing entry.
+
+    Can be used anywhere a `ModelVersion` identifier is accepted.
+    """
+
+    __slots__ = ()
+    _json_paths = _paths(_VERSION_FIELDS)
+
+
+class TagSummary(Record, namedtuple('TagSummary', _names(_TAG_FIELDS))):
+    """A compact tag listing entry."""
+
+    __slots__ = ()
+    _json_paths = _paths(_TAG_FIELDS)
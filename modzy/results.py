@@ -2,10 +2,11 @@
 """Classes for interacting with results."""
 
 import logging
-import time
 
-from ._api_object import ApiObject
-from .error import NotFoundError, ResultsError, Timeout
+from ._api_object import ApiObject, wrap_json
+from ._stream import iter_members
+from .error import NotFoundError, ResultsError
+from .polling import get_schedule
 
 
 class Results:
@@ -47,7 +48,49 @@ class Results:
         json_obj = self._api_client.http.get('{}/{}'.format(self._base_route, identifier))
         return Result(json_obj, self._api_client)
 
-    def block_until_complete(self, result, timeout=60, poll_interval=5):
+    def iter_source_outputs(self, result, raise_failures=False):
+        """Iterates over the model outputs of every source of a result.
+
+        Unlike `get`, the response is parsed incrementally while it is downloaded, so only one
+        source's outputs are held in memory at a time. This keeps memory flat for jobs with tens of
+        thousands of sources::
+
+            for source_name, outputs in client.results.iter_source_outputs(job):
+                if isinstance(outputs, ResultsError):
+                    print(source_name, 'failed:', outputs)
+                else:
+                    save(source_name, outputs['results.json'])
+
+        Incremental parsing requires the `ijson` package (``pip install modzy-sdk[stream]``); without
+        it the whole response is decoded at once and the sources are iterated afterwards.
+
+        Args:
+            result (Union[str, Job, Result]): The job identifier or a `Job` or `Result` instance.
+            raise_failures (bool): Raise a `ResultsError` when a failed source is reached instead of
+                yielding it. Defaults to False.
+
+        Yields:
+            Tuple[str, Union[dict, ResultsError]]: The source name and, as in `Result.get_source_outputs`,
+            a `dict` mapping the output's filenames to JSON parsed data, or the `ResultsError` describing
+            the model failure for that source.
+
+        Raises:
+            ResultsError: A source failed and `raise_failures` is True.
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+
+        Note:
+            The HTTP connection stays open until the iteration completes or the generator is closed.
+        """
+        identifier = Result._coerce_identifier(result)
+        self.logger.debug("streaming results %s", result)
+        http = self._api_client.http
+        with http.stream('GET', '{}/{}'.format(self._base_route, identifier)) as body:
+            for section, source_name, source in iter_members(body, ('results', 'failures'), http.codec):
+                yield source_name, _get_source_outputs(source_name, wrap_json(source), section == 'failures',
+                                                       raise_failures)
+
+    def block_until_complete(self, result, timeout=60, poll_interval=None):
         """Blocks until the `Result` completes or a timeout is reached.
 
         This is accomplished by polling the API until the `Result` is marked finished. This may mean
@@ -57,7 +100,8 @@ class Results:
             job (Union[str, Job, Result]): The job identifier or a `Job` or a `Job` or `Result` instance.
             timeout (Optional[float]): Seconds to wait until timeout. `None` indicates wait forever.
                 Defaults to 60.
-            poll_interval (Optional[float]): Seconds between polls. Defaults to 1.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls, or a `PollSchedule`.
+                If None is specified the client's `poll_schedule` is used. Defaults to None.
 
         Returns:
             Result: The `Result` instance.
@@ -68,26 +112,24 @@ class Results:
                 or the client is unable to connect.
         """
         identifier = Result._coerce_identifier(result)
-        endby = time.time() + timeout if (timeout is not None) else None
+        wait = get_schedule(poll_interval, self._api_client).wait(timeout)
+        progress = result if isinstance(result, dict) else None
         ignore404 = False
         while True:  # poll at least once
             try:
-                result = self.get(identifier)
+                result = progress = self.get(identifier)
                 self.logger.debug("result %s", result)
             except NotFoundError:
                 # work around 404 for recently accepted jobs
                 if not ignore404:
-                    self._api_client.jobs.get(identifier)  # this didn't error so job must exist
+                    progress = self._api_client.jobs.get(identifier)  # this didn't error so job must exist
                     # TODO: short-circuit on job cancelation
                     ignore404 = True
             else:
                 if result.finished:  # this covers CANCELED/COMPLETED
+                    wait.done(result)
                     return result
-            if (endby is not None) and (time.time() > endby - poll_interval):
-                raise Timeout('timed out before completion')
-            self.logger.debug("waiting... %d", poll_interval)
-            time.sleep(poll_interval)
-        # TODO: should probably ramp up poll_interval as wait time increases
+            wait.sleep(progress)
 
 
 class Result(ApiObject):
@@ -130,7 +172,7 @@ class Result(ApiObject):
         self.update(updated)  # is updating in place a bad idea?
         return self
 
-    def block_until_complete(self, timeout=60, poll_interval=5):
+    def block_until_complete(self, timeout=60, poll_interval=None):
         """Block until the `Result` completes or a timeout is reached.
 
         This is accomplished by polling the API until the `Result` is marked finished. This may mean
@@ -139,7 +181,8 @@ class Result(ApiObject):
         Args:
             timeout (Optional[float]): Seconds to wait until timeout. `None` indicates wait forever.
                 Defaults to 60.
-            poll_interval (Optional[float]): Seconds between polls. Defaults to 1.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls, or a `PollSchedule`.
+                If None is specified the client's `poll_schedule` is used. Defaults to None.
 
         Returns:
             Result: The `Result` instance (self).
@@ -173,24 +216,39 @@ class Result(ApiObject):
             KeyError: The source name was not found.
         """
         try:
-            source = self.results[source_name]
-            if source_name in source:  # deal with legacy double nesting of source source_name
-                source = source[source_name]
-            return source
+            return _get_source_outputs(source_name, self.results[source_name], False, True)
         except (KeyError, AttributeError):
             pass
 
         try:
-            source = self.failures[source_name]
-            if source_name in source:  # deal with legacy double nesting of source source_name
-                source = source[source_name]
-            raise ResultsError(source.error)
+            _get_source_outputs(source_name, self.failures[source_name], True, True)
         except (KeyError, AttributeError):
             pass
 
         # TODO: can we give a better error message if job canceled?
         raise KeyError(source_name)
 
+    def iter_source_outputs(self, raise_failures=False):
+        """Iterates over the model outputs of every source in this result.
+
+        To avoid loading very large results in memory, see
+        :py:meth:`modzy.results.Results.iter_source_outputs`.
+
+        Args:
+            raise_failures (bool): Raise a `ResultsError` when a failed source is reached instead of
+                yielding it. Defaults to False.
+
+        Yields:
+            Tuple[str, Union[dict, ResultsError]]: The source name and a `dict` mapping the output's
+            filenames to JSON parsed data, or the `ResultsError` describing the model failure.
+
+        Raises:
+            ResultsError: A source failed and `raise_failures` is True.
+        """
+        for section, failed in (('results', False), ('failures', True)):
+            for source_name, source in (self.get(section) or {}).items():
+                yield source_name, _get_source_outputs(source_name, source, failed, raise_failures)
+
     def get_first_outputs(self):
         """Gets the first or only outputs found in this result.
 
@@ -231,3 +289,14 @@ class Result(ApiObject):
 
     def __str__(self):
         return "Result(job_identifier='{}',finished='{}')".format(self.job_identifier, self.finished)
+
+
+def _get_source_outputs(source_name, source, failed, raise_failures):
+    if source_name in source:  # deal with legacy double nesting of source source_name
+        source = source[source_name]
+    if not failed:
+        return source
+    error = ResultsError(source.error)
+    if raise_failures:
+        raise error
+    return error
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Retry and backoff policy for HTTP requests."""
+
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+try:
+    from urllib3.exceptions import NewConnectionError
+except ImportError:  # pragma: no cover
+    from requests.packages.urllib3.exceptions import NewConnectionError
+
+
+class RetryPolicy:
+    """Decides whether and when a failed HTTP request is retried.
+
+    Requests are retried with exponential backoff and "full jitter": before retry number ``n`` the client
+    sleeps a random time between 0 and ``min(backoff_max, backoff_factor * 2 ** n)`` seconds, or the
+    delay asked by the server through a ``Retry-After`` header.
+
+    Retries are idempotency-aware. Failures of methods listed in `allowed_methods` are retried on
+    connection errors and on any status in `status_forcelist`. Other methods (``POST``, ``PATCH``) are
+    only retried when the request is known not to have been processed: the connection could not be
+    established or the server answered ``429 Too Many Requests``.
+
+    A policy can be set for every request through the `retry_policy` argument of `ApiClient` and
+    overridden per call with the `retry` argument of the `HttpClient` methods::
+
+        client = ApiClient(base_url=BASE_URL, api_key=API_KEY, retry_policy=RetryPolicy(total=5))
+        client.http.get('/models', retry=RetryPolicy(total=10, backoff_max=5))
+        client.http.get('/models', retry=False)  # no retries for this call
+
+    Attributes:
+        total (int): Maximum number of retries. 0 disables retries.
+        backoff_factor (float): Base of the exponential backoff, in seconds.
+        backoff_max (float): Maximum time to sleep between two attempts, in seconds. Also caps
+            ``Retry-After`` delays.
+        status_forcelist (FrozenSet[int]): HTTP statuses that are retried.
+        allowed_methods (FrozenSet[str]): HTTP methods retried on connection errors and statuses in
+            `status_forcelist`.
+        respect_retry_after (bool): Whether the ``Retry-After`` header of a response is honoured.
+    """
+
+    DEFAULT_STATUS_FORCELIST = frozenset([429, 500, 502, 503, 504])
+    DEFAULT_ALLOWED_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'])
+
+    def __init__(self, total=3, backoff_factor=0.5, backoff_max=30, status_forcelist=DEFAULT_STATUS_FORCELIST,
+                 allowed_methods=DEFAULT_ALLOWED_METHODS, respect_retry_after=True):
+        """Creates a `RetryPolicy` instance.
+
+        Args:
+            total (int): Maximum number of retries. Defaults to 3.
+            backoff_factor (float): Base of the exponential backoff, in seconds. Defaults to 0.5.
+            backoff_max (float): Maximum time to sleep between two attempts, in seconds. Defaults to 30.
+            status_forcelist (Iterable[int]): HTTP statuses that are retried. Defaults to 429, 500, 502, 503
+                and 504.
+            allowed_methods (Iterable[str]): HTTP methods that can be safely repeated. Defaults to the
+                idempotent methods.
+            respect_retry_after (bool): Whether to honour the ``Retry-After`` response header. Defaults to True.
+        """
+        if total < 0:
+            raise ValueError("the total param should be a positive number")
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.status_forcelist = frozenset(status_forcelist)
+        self.allowed_methods = frozenset(method.upper() for method in allowed_methods)
+        self.respect_retry_after = respect_retry_after
+
+    @classmethod
+    def no_retries(cls):
+        """Creates a policy that never retries."""
+        return cls(total=0)
+
+    def is_retryable_error(self, method, error):
+        """Whether a request that failed with a network error can be retried.
+
+        Args:
+            method (str): The HTTP method of the request.
+            error (requests.RequestException): The error raised by `requests`.
+
+        Returns:
+            bool: True if the request can be repeated.
+        """
+        if method.upper() in self.allowed_methods:
+            return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        return _is_connect_error(error)
+
+    def is_retryable_status(self, method, status_code):
+        """Whether a request answered with `status_code` can be retried.
+
+        Args:
+            method (str): The HTTP method of the request.
+            status_code (int): The HTTP status of the response.
+
+        Returns:
+            bool: True if the request can be repeated.
+        """
+        if status_code not in self.status_forcelist:
+            return False
+        return method.upper() in self.allowed_methods or status_code == 429
+
+    def get_backoff(self, retry_number, response=None):
+        """Gets the time to sleep before a retry.
+
+        Args:
+            retry_number (int): Number of retries already made (0 before the first retry).
+            response (Optional[requests.Response]): The failed response, if any.
+
+        Returns:
+            float: Seconds to sleep.
+        """
+        if response is not None and self.respect_retry_after:
+            retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        ceiling = min(self.backoff_max, self.backoff_factor * (2 ** retry_number))
+        return random.uniform(0, ceiling)
+
+    def __repr__(self):
+        return '{}(total={}, backoff_factor={}, backoff_max={})'.format(
+            self.__class__.__name__, self.total, self.backoff_factor, self.backoff_max)
+
+
+def _is_connect_error(error):
+    # the request never reached the server, so even non idempotent requests can be sent again
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = error.args[0] if error.args else None
+        reason = getattr(reason, 'reason', reason)
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def _parse_retry_after(value):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Splitting of large multi-source jobs into parallel jobs."""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from ._util import data_size
+
+logger = logging.getLogger(__name__)
+
+
+def shard_sources(sources, max_sources=None, max_bytes=None):
+    """Splits a multi-source mapping into smaller ones.
+
+    Args:
+        sources (dict): A mapping of source names to sources.
+        max_sources (Optional[int]): The maximum number of sources per shard.
+        max_bytes (Optional[int]): The maximum size of a shard, counting the `str` (UTF-8 encoded) and
+            bytes-like values of its sources. A source larger than `max_bytes` gets a shard of its own.
+
+    Returns:
+        List[dict]: The shards, in the order of `sources`.
+    """
+    shards = []
+    shard, shard_bytes = {}, 0
+    for source_name, source in sources.items():
+        size = _size(source) if max_bytes is not None else 0
+        if shard and ((max_sources is not None and len(shard) >= max_sources)
+                      or (max_bytes is not None and shard_bytes + size > max_bytes)):
+            shards.append(shard)
+            shard, shard_bytes = {}, 0
+        shard[source_name] = source
+        shard_bytes += size
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def _size(value):
+    if isinstance(value, dict):
+        return sum(_size(item) for item in value.values())
+    return data_size(value)
+
+
+class ShardedJob:
+    """A job split into several jobs, processed in parallel.
+
+    Returned by :py:meth:`modzy.jobs.Jobs.submit_sharded`.
+
+    Attributes:
+        jobs (List[Job]): The `Job` of each shard.
+    """
+
+    def __init__(self, jobs, shards, api_client):
+        self.jobs = jobs
+        self._api_client = api_client
+        self._shard_of = {source_name: index for index, shard in enumerate(shards) for source_name in shard}
+
+    @property
+    def job_identifiers(self):
+        """List[str]: The identifier of each shard's job."""
+        return [job.job_identifier for job in self.jobs]
+
+    def get_result(self):
+        """Gets the results of every shard.
+
+        Returns:
+            ShardedResult: The results.
+
+        Raises:
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+        """
+        return ShardedResult([self._api_client.results.get(job) for job in self.jobs], self._shard_of)
+
+    def block_until_complete(self, timeout=60, poll_interval=None):
+        """Blocks until every shard completes or a timeout is reached.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for all the shards. `None` indicates wait forever.
+                Defaults to 60.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between polls, or a `PollSchedule`.
+                If None is specified the client's `poll_schedule` is used. Defaults to None.
+
+        Returns:
+            ShardedResult: The results of every shard.
+
+        Raises:
+            Timeout: A shard did not complete before the timeout was reached.
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+        """
+        endby = time.time() + timeout if timeout is not None else None
+        results = []
+        for job in self.jobs:
+            # the shards run in parallel, so waiting for them in turn takes as long as the slowest one
+            remaining = max(endby - time.time(), 0) if endby is not None else None
+            results.append(self._api_client.results.block_until_complete(job, timeout=remaining,
+                                                                         poll_interval=poll_interval))
+        return ShardedResult(results, self._shard_of)
+
+    def cancel(self):
+        """Attempts to cancel every shard.
+
+        Returns:
+            ShardedJob: The `ShardedJob` instance (self).
+
+        Raises:
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+        """
+        self.jobs = [job.cancel() for job in self.jobs]
+        return self
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __str__(self):
+        return "ShardedJob(job_identifiers={})".format(self.job_identifiers)
+
+
+class ShardedResult:
+    """The results of a `ShardedJob`.
+
+    Attributes:
+        results (List[Result]): The `Result` of each shard.
+    """
+
+    def __init__(self, results, shard_of):
+        self.results = results
+        self._shard_of = shard_of
+
+    @property
+    def finished(self):
+        """bool: True when every shard finished."""
+        return all(result.finished for result in self.results)
+
+    def get_source_outputs(self, source_name):
+        """Gets the model outputs for a given source.
+
+        See :py:meth:`modzy.results.Result.get_source_outputs`.
+        """
+        try:
+            result = self.results[self._shard_of[source_name]]
+        except KeyError:
+            raise KeyError(source_name) from None
+        return result.get_source_outputs(source_name)
+
+    def iter_source_outputs(self, raise_failures=False):
+        """Iterates over the model outputs of every source, shard by shard.
+
+        See :py:meth:`modzy.results.Result.iter_source_outputs`.
+        """
+        return chain.from_iterable(result.iter_source_outputs(raise_failures) for result in self.results)
+
+    def __str__(self):
+        return "ShardedResult(job_identifiers={},finished='{}')".format(
+            [result.job_identifier for result in self.results], self.finished)
+
+
+def submit_sharded(api_client, submit, model, version, sources, args, kwargs, max_sources, max_bytes, concurrency):
+    """Submits the shards of a job concurrently.
+
+    See :py:meth:`modzy.jobs.Jobs.submit_sharded`.
+    """
+    shards = shard_sources(sources, max_sources, max_bytes)
+    logger.debug("submitting %d sources as %d jobs", len(sources), len(shards))
+    with ThreadPoolExecutor(max(min(concurrency, len(shards)), 1), thread_name_prefix='modzy-shards') as executor:
+        futures = [executor.submit(submit, model, version, shard, *args, **kwargs) for shard in shards]
+    jobs, errors = [], []
+    for future in futures:
+        try:
+            jobs.append(future.result())
+        except Exception as ex:
+            errors.append(ex)
+    if errors:
+        # don't leave part of the input running
+        for job in jobs:
+            try:
+                job.cancel()
+            except Exception:
+                logger.warning("unable to cancel job %s", job.job_identifier, exc_info=True)
+        raise errors[0]
+    return ShardedJob(jobs, shards, api_client)
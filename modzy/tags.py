@@ -5,6 +5,7 @@ import logging
 
 from ._api_object import ApiObject
 from .models import Model
+from .records import TagSummary
 
 
 class Tags:
@@ -28,15 +29,21 @@ class Tags:
         self._api_client = api_client
         self.logger = logging.getLogger(__name__)
 
-    def get_all(self):
+    def get_all(self, compact=False):
         """Gets a list of all `Tag` instances.
+        Args:
+            compact (bool): Return memory efficient `TagSummary` records instead of `Tag` instances.
+                Defaults to False.
         Returns:
-            List[Tag]: A list of `Tag` instances.
+            List[Tag]: A list of `Tag` instances, or `TagSummary` records if `compact` is True.
         Raises:
             ApiError: A subclass of ApiError will be raised if the API returns an error status,
                 or the client is unable to connect.
         """
-        json_list = self._api_client.http.get(self._base_route)
+        if compact:
+            return list(map(TagSummary.from_json,
+                            self._api_client.http.request('GET', self._base_route, raw=True, cached=True)))
+        json_list = self._api_client.http.get(self._base_route, cached=True)
         return list(Tag(json_obj, self._api_client) for json_obj in json_list)
 
     def get_tags_and_models(self, tag_identifiers):
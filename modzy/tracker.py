@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Waiting on many jobs with a single poll loop."""
+
+import concurrent.futures
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+
+from .error import ApiError, ForbiddenError, NotFoundError, Timeout, UnauthorizedError
+from .jobs import Job, Jobs
+from .polling import get_schedule
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('identifier', 'priority', 'seq', 'future')
+
+    def __init__(self, identifier, priority, seq):
+        self.identifier = identifier
+        self.priority = priority
+        self.seq = seq
+        self.future = Future()
+
+
+class JobTracker:
+    """Waits for the completion of many jobs from a single background thread.
+
+    `Jobs.block_until_complete` polls one job from the caller's thread; waiting on thousands of jobs that
+    way takes thousands of threads or a serial loop. A `JobTracker` polls every job it tracks from one
+    scheduler thread, started when the first job is tracked and stopped when none is left, and resolves a
+    `Future` per job::
+
+        jobs = [client.jobs.submit_text('ed542963de', '1.0.1', {'input.txt': text}) for text in texts]
+        for job in client.jobs.tracker.as_completed(jobs, timeout=600):
+            print(job.job_identifier, job.get_result().get_source_outputs('job'))
+
+    Each round, when at least `history_threshold` jobs are tracked, the pending jobs are listed with
+    ``get_history(status='pending')`` pages: the jobs found there are still running and need no request
+    of their own. Every other job is fetched individually, highest `priority` first, and its future is
+    resolved once its status is neither `SUBMITTED` nor `IN_PROGRESS`.
+
+    Attributes:
+        poll_schedule (PollSchedule): The schedule of the rounds of polls, without the progress of any job.
+        history_threshold (int): The number of tracked jobs from which the pending job history is listed.
+        page_size (int): The number of jobs per history page.
+        max_pages (int): The maximum number of history pages listed per round.
+    """
+
+    def __init__(self, api_client, poll_interval=None, history_threshold=10, page_size=1000, max_pages=10):
+        """Creates a `JobTracker` instance.
+
+        Args:
+            api_client (ApiClient): An `ApiClient` instance.
+            poll_interval (Optional[Union[float, PollSchedule]]): Seconds between rounds of polls or a
+                `PollSchedule`. If None is specified the client's `poll_schedule` is used. Defaults to None.
+            history_threshold (int): The number of tracked jobs from which the pending job history is
+                listed instead of fetching each job. Defaults to 10.
+            page_size (int): The number of jobs per history page. Defaults to 1000.
+            max_pages (int): The maximum number of history pages listed per round. Defaults to 10.
+        """
+        self._api_client = api_client
+        self.poll_schedule = get_schedule(poll_interval, api_client)
+        self.history_threshold = history_threshold
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._entries = {}
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def track(self, job, priority=0):
+        """Starts tracking a job.
+
+        Args:
+            job (Union[str, Job, Result]): The job identifier or a `Job` or `Result` instance.
+            priority (int): Jobs of higher priority are polled first. Tracking a job again keeps the
+                highest priority. Defaults to 0.
+
+        Returns:
+            concurrent.futures.Future: A future resolved with the completed `Job`, or with the error
+            returned by the API for it, e.g. a `NotFoundError`. The same future is returned for a job
+            already tracked.
+
+        Raises:
+            RuntimeError: The tracker is closed.
+        """
+        identifier = Job._coerce_identifier(job)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("the tracker is closed")
+            entry = self._entries.get(identifier)
+            if entry is None:
+                entry = self._entries[identifier] = _Entry(identifier, priority, next(self._seq))
+            else:
+                entry.priority = max(entry.priority, priority)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='modzy-tracker', daemon=True)
+                self._thread.start()
+        return entry.future
+
+    def wait_all(self, jobs, timeout=None, priority=0):
+        """Blocks until every job completes or a timeout is reached.
+
+        Args:
+            jobs (Iterable[Union[str, Job, Result]]): The job identifiers or `Job` or `Result` instances.
+            timeout (Optional[float]): Seconds to wait for all the jobs. `None` indicates wait forever.
+                Defaults to None.
+            priority (int): The priority of the jobs. Defaults to 0.
+
+        Returns:
+            List[Job]: The completed `Job` instances, in the order of `jobs`.
+
+        Raises:
+            Timeout: A job did not complete before the timeout was reached. The jobs remain tracked.
+            ApiError: A subclass of ApiError will be raised if the API returns an error status for a job.
+        """
+        futures = [self.track(job, priority) for job in jobs]
+        _, not_done = concurrent.futures.wait(futures, timeout)
+        if not_done:
+            raise Timeout('timed out before completion')
+        return [future.result() for future in futures]
+
+    def as_completed(self, jobs, timeout=None, priority=0):
+        """Iterates over jobs as they complete.
+
+        The jobs are tracked when this method is called, not when the iteration starts.
+
+        Args:
+            jobs (Iterable[Union[str, Job, Result]]): The job identifiers or `Job` or `Result` instances.
+            timeout (Optional[float]): Seconds to wait for all the jobs. `None` indicates wait forever.
+                Defaults to None.
+            priority (int): The priority of the jobs. Defaults to 0.
+
+        Returns:
+            Iterator[Job]: The completed `Job` instances, in completion order.
+
+        Raises:
+            Timeout: A job did not complete before the timeout was reached, raised by the iterator.
+            ApiError: A subclass of ApiError will be raised by the iterator if the API returns an error
+                status for a job.
+        """
+        futures = [self.track(job, priority) for job in jobs]
+        return self._as_completed(futures, timeout)
+
+    @staticmethod
+    def _as_completed(futures, timeout):
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout):
+                yield future.result()
+        except concurrent.futures.TimeoutError:
+            raise Timeout('timed out before completion') from None
+
+    def close(self):
+        """Stops tracking jobs; the futures not resolved yet are canceled."""
+        with self._condition:
+            self._closed = True
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._condition.notify_all()
+            thread = self._thread
+        for entry in entries:
+            entry.future.cancel()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._entries)
+
+    def _run(self):
+        wait = self.poll_schedule.wait(None)
+        while True:
+            with self._condition:
+                # like `block_until_complete`, wait one poll interval before the first poll
+                self._condition.wait_for(lambda: self._closed or not self._entries, wait.next_delay())
+                for identifier in [identifier for identifier, entry in self._entries.items()
+                                   if entry.future.cancelled()]:
+                    del self._entries[identifier]
+                if self._closed or not self._entries:
+                    self._thread = None
+                    return
+                entries = sorted(self._entries.values(), key=lambda entry: (-entry.priority, entry.seq))
+            try:
+                self._poll(entries)
+            except Exception:
+                logger.exception("unexpected error while polling jobs")
+
+    def _poll(self, entries):
+        pending = set()
+        if len(entries) >= self.history_threshold:
+            pending = self._pending_identifiers({entry.identifier for entry in entries})
+        logger.debug("polling %d jobs, %d known pending", len(entries), len(pending))
+        for entry in entries:
+            if entry.identifier in pending:
+                continue
+            with self._condition:
+                if self._closed:
+                    return
+            try:
+                job = self._api_client.jobs.get(entry.identifier)
+            except (NotFoundError, UnauthorizedError, ForbiddenError) as ex:  # polling again wouldn't help
+                self._resolve(entry, exception=ex)
+                continue
+            except ApiError:
+                logger.warning("unable to poll job %s", entry.identifier, exc_info=True)
+                continue
+            if job.status not in (Jobs.status.SUBMITTED, Jobs.status.IN_PROGRESS):
+                self._resolve(entry, job)
+
+    def _pending_identifiers(self, tracked):
+        # jobs listed here are still running; a job missed, e.g. because the pages shifted while they were
+        # listed, is only fetched individually
+        pending = set()
+        try:
+            for page in range(1, self.max_pages + 1):
+                summaries = self._api_client.jobs.get_history(status='pending', page=page, per_page=self.page_size,
+                                                              compact=True)
+                pending.update(summary.job_identifier for summary in summaries)
+                if len(summaries) < self.page_size or tracked <= pending:
+                    break
+        except ApiError:
+            logger.warning("unable to list pending jobs", exc_info=True)
+        return pending
+
+    def _resolve(self, entry, job=None, exception=None):
+        with self._condition:
+            if self._entries.get(entry.identifier) is entry:
+                del self._entries[entry.identifier]
+        if not entry.future.set_running_or_notify_cancel():
+            return
+        if exception is not None:
+            entry.future.set_exception(exception)
+        else:
+            entry.future.set_result(job)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Pre-flight validation of job inputs against model version input specifications."""
+
+import codecs
+import logging
+import os
+import threading
+import time
+
+from ._size import human_read_to_bytes
+from .error import InputValidationError
+from .models import Model
+
+logger = logging.getLogger(__name__)
+
+# (offset, magic bytes, media type), checked in order
+_SIGNATURES = (
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'BM', 'image/bmp'),
+    (0, b'II*\x00', 'image/tiff'),
+    (0, b'MM\x00*', 'image/tiff'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+    (0, b'OggS', 'audio/ogg'),
+    (0, b'fLaC', 'audio/flac'),
+    (0, b'ID3', 'audio/mpeg'),
+    (4, b'ftyp', 'video/mp4'),
+)
+_RIFF_TYPES = {b'WAVE': 'audio/wav', b'WEBP': 'image/webp', b'AVI ': 'video/x-msvideo'}
+_ALIASES = {'image/jpg': 'image/jpeg', 'audio/x-wav': 'audio/wav', 'audio/wave': 'audio/wav',
+            'audio/mp3': 'audio/mpeg', 'application/x-zip-compressed': 'application/zip',
+            'application/x-gzip': 'application/gzip', 'text/json': 'application/json'}
+_SNIFF_SIZE = 512
+
+
+def sniff_media_type(head):
+    """Guesses the media type of data from its first bytes.
+
+    Args:
+        head (bytes): The first bytes of the data, 512 are enough.
+
+    Returns:
+        Optional[str]: The media type, ``'text/plain'`` for UTF-8 text, ``'application/json'`` for text
+        starting like a JSON document, or None if unknown.
+    """
+    head = bytes(head)
+    if not head:
+        return None
+    if head[:4] == b'RIFF' and head[8:12] in _RIFF_TYPES:
+        return _RIFF_TYPES[head[8:12]]
+    for offset, magic, media_type in _SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return media_type
+    try:
+        # a full head may end in the middle of a multi-byte character
+        text = codecs.getincrementaldecoder('utf-8')().decode(head, final=len(head) < _SNIFF_SIZE)
+    except UnicodeDecodeError:
+        return None
+    if text.lstrip()[:1] in ('{', '['):
+        return 'application/json'
+    return 'text/plain'
+
+
+def _accepts(accepted_media_types, media_type):
+    accepted = [_ALIASES.get(item, item) for item in
+                (item.split(';')[0].strip().lower() for item in accepted_media_types.split(',')) if item]
+    if not accepted or media_type is None:
+        return True  # nothing to check against or unknown data: let the API decide
+    if '*/*' in accepted or 'application/octet-stream' in accepted:
+        return True
+    if media_type == 'application/json' and any(item.startswith('text/') for item in accepted):
+        return True
+    if media_type == 'text/plain' and any(item == 'application/json' or item.startswith('text/')
+                                          for item in accepted):
+        return True  # may be JSON not starting with an object or array, or another text format
+    return media_type in accepted or '{}/*'.format(media_type.split('/')[0]) in accepted
+
+
+class InputValidator:
+    """Checks job inputs against the input specification of a model version before they are sent.
+
+    The specification (input names, ``maximumSize`` and ``acceptedMediaTypes``) of each model version is
+    fetched once and cached. Inputs are rejected, before any data is uploaded, when an input is missing
+    or unknown, larger than its maximum size, or when its first bytes identify a media type the input
+    doesn't accept. Data of an unknown type is not rejected.
+
+    Used by `Jobs.submit_file` and `Jobs.submit_embedded` when called with ``validate=True``.
+
+    Attributes:
+        ttl (float): Seconds during which a specification is cached.
+    """
+
+    def __init__(self, api_client, ttl=300):
+        """Creates an `InputValidator` instance.
+
+        Args:
+            api_client (ApiClient): An `ApiClient` instance.
+            ttl (float): Seconds during which a specification is cached. Defaults to 300.
+        """
+        self._api_client = api_client
+        self.ttl = ttl
+        self._specs = {}
+        self._lock = threading.Lock()
+
+    def get_input_specs(self, model, version):
+        """Gets the input specification of a model version.
+
+        Args:
+            model (Union[str, Model]): The model identifier or a `Model` instance.
+            version (str): The model version string.
+
+        Returns:
+            Dict[str, dict]: The specification of each input, by input name.
+
+        Raises:
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+        """
+        identifier = Model._coerce_identifier(model)
+        key = (identifier, str(version))
+        with self._lock:
+            expires, specs = self._specs.get(key, (0, None))
+        if expires > time.monotonic():
+            return specs
+        json_obj = self._api_client.http.request(
+            'GET', '/models/{}/versions/{}'.format(identifier, version), raw=True, cached=True)
+        specs = {spec['name']: spec for spec in json_obj.get('inputs') or () if spec.get('name')}
+        with self._lock:
+            self._specs[key] = (time.monotonic() + self.ttl, specs)
+        return specs
+
+    def validate(self, model, version, sources, paths=False):
+        """Validates the inputs of a job.
+
+        Args:
+            model (Union[str, Model]): The model identifier or a `Model` instance.
+            version (str): The model version string.
+            sources (dict): A mapping of source names to sources, each a mapping of model input filename to
+                data: text, bytes-like objects, paths or binary file objects.
+            paths (bool): Whether `str` values are file paths rather than text. Defaults to False.
+
+        Raises:
+            InputValidationError: An input is invalid; its `problems` lists every problem found.
+            ApiError: A subclass of ApiError will be raised if the API returns an error status,
+                or the client is unable to connect.
+        """
+        specs = self.get_input_specs(model, version)
+        if not specs:
+            logger.debug("no input specification for model %s version %s", model, version)
+            return
+        problems = []
+        for source_name, inputs in sources.items():
+            for name in specs:
+                if name not in inputs:
+                    problems.append((source_name, name, 'missing input'))
+            for name, value in inputs.items():
+                spec = specs.get(name)
+                if spec is None:
+                    problems.append((source_name, name, 'unknown input, expected one of {}'
+                                     .format(', '.join(sorted(specs)))))
+                    continue
+                try:
+                    size, head = _inspect(value, paths)
+                except OSError as ex:
+                    problems.append((source_name, name, 'unreadable: {}'.format(ex)))
+                    continue
+                maximum_size = spec.get('maximumSize')
+                if isinstance(maximum_size, str):
+                    maximum_size = _parse_size(maximum_size)
+                if size is not None and maximum_size and size > maximum_size:
+                    problems.append((source_name, name, 'size {} exceeds the maximum size {}'
+                                     .format(size, maximum_size)))
+                accepted = spec.get('acceptedMediaTypes') or ''
+                media_type = sniff_media_type(head) if head is not None else None
+                if not _accepts(accepted, media_type):
+                    problems.append((source_name, name, '{} data, accepted media types are {}'
+                                     .format(media_type, accepted)))
+        if problems:
+            raise InputValidationError('invalid inputs: ' + '; '.join(
+                '{}/{}: {}'.format(*problem) for problem in problems), problems)
+
+
+def _parse_size(size):
+    if size.isdigit():
+        return int(size)
+    try:
+        return human_read_to_bytes(size)
+    except (AttributeError, KeyError):
+        return None
+
+
+def _inspect(value, paths):
+    # returns the size and first bytes of an input, None when they can't be known without consuming it
+    if isinstance(value, str) and not paths:
+        data = value.encode('utf-8')
+        return len(data), data[:_SNIFF_SIZE]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        data = memoryview(value).cast('B')
+        return len(data), data[:_SNIFF_SIZE]
+    if hasattr(value, 'read'):
+        if not (hasattr(value, 'seekable') and value.seekable()):
+            return None, None
+        position = value.tell()
+        try:
+            size = value.seek(0, os.SEEK_END)
+            value.seek(0)
+            head = value.read(_SNIFF_SIZE)
+        finally:
+            value.seek(position)
+        return size, head if isinstance(head, bytes) else None
+    path = os.fspath(value)
+    with open(path, 'rb') as file:
+        return os.fstat(file.fileno()).st_size, file.read(_SNIFF_SIZE)
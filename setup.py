@@ -13,6 +13,12 @@ with open('HISTORY.rst') as history_file:
 
 requirements = ['requests', 'python-dotenv', 'deprecation', 'protobuf~=4.21.10', 'grpcio', 'google-api-python-client', 'boto3']
 
+extras_require = {
+    'async': ['httpx'],
+    'fast-json': ['orjson'],
+    'stream': ['ijson>=3.1'],
+}
+
 # removed in 0.7.1 test_requirements = ['pytest']
 
 setup(
@@ -31,6 +37,7 @@ setup(
     description="Modzy's Python SDK queries and deploys models, submits inference jobs and returns results directly to your editor.",
     python_requires='>=3.7',
     install_requires=requirements,
+    extras_require=extras_require,
     long_description=readme,
     long_description_content_type='text/markdown',
     include_package_data=True,
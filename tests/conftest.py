@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""A local HTTP server standing in for the Modzy API."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    failures = {}  # path -> (status, number of failures before succeeding)
+    bodies = {}  # path -> response body
+    etags = {}  # path -> ETag header
+    hits = {}  # path -> number of requests received
+    delays = {}  # path -> seconds to wait before responding
+    received = {}  # path -> request bodies, in the order received
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.received.setdefault(self.path, []).append(self.rfile.read(length))
+        self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        time.sleep(self.delays.get(self.path, 0))
+        etag = self.etags.get(self.path)
+        if etag is not None and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        status, remaining = self.failures.get(self.path, (200, 0))
+        if remaining > 0:
+            self.failures[self.path] = (status, remaining - 1)
+            body = json.dumps({'message': 'try again'}).encode('utf-8')
+        else:
+            status = 200
+            body = self.bodies.get(self.path) or json.dumps(
+                {'path': self.path, 'method': self.command}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+        if status in (429, 503):
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+    do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}/api'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def handler():
+    return _Handler
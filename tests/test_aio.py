@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the asyncio client."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from modzy import AsyncApiClient, error
+from modzy.jobs import Job
+from modzy.results import Result
+from modzy.retry import RetryPolicy
+
+
+def _handler(request):
+    path = request.url.path
+    if path == '/api/models':
+        return httpx.Response(200, json=[])
+    if path == '/api/jobs' and request.method == 'POST':
+        body = json.loads(request.content)
+        assert body['input']['sources'] == {'job': {'input.txt': 'Modzy is great!'}}
+        return httpx.Response(200, json={'jobIdentifier': 'abc', 'model': body['model']})
+    if path == '/api/jobs/abc':
+        return httpx.Response(200, json={'jobIdentifier': 'abc', 'status': 'COMPLETED'})
+    if path == '/api/results/abc':
+        return httpx.Response(200, json={'jobIdentifier': 'abc', 'finished': True,
+                                         'results': {'job': {'results.json': {'ok': True}}}})
+    return httpx.Response(404, json={'message': 'not found'})
+
+
+@pytest.fixture()
+def client():
+    client = AsyncApiClient(base_url='https://example.com/api', api_key='my-key')
+    client.http.session = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+    return client
+
+
+def test_submit_and_wait(client):
+    async def run():
+        async with client:
+            job = await client.jobs.submit_text('model', '1.0.0', {'input.txt': 'Modzy is great!'})
+            assert isinstance(job, Job)
+            assert job.status == client.jobs.status.SUBMITTED
+            job = await client.jobs.block_until_complete(job, poll_interval=0)
+            assert job.status == client.jobs.status.COMPLETED
+            result = await client.results.get(job)
+            assert isinstance(result, Result)
+            assert result.get_first_outputs()['results.json'].ok
+
+    asyncio.run(run())
+
+
+def test_not_found(client):
+    async def run():
+        async with client:
+            with pytest.raises(error.NotFoundError):
+                await client.models.get('notamodelidentifier')
+
+    asyncio.run(run())
+
+
+def test_check_and_retries():
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path, dict(request.url.params)))
+        if request.url.path == '/api/models':
+            return httpx.Response(200, json=[])
+        if request.url.path == '/api/jobs/flaky' and len(requests) < 4:
+            return httpx.Response(503, json={'message': 'try again'})
+        return httpx.Response(200, json={'jobIdentifier': 'flaky', 'status': 'COMPLETED'})
+
+    async def run():
+        client = AsyncApiClient(base_url='https://example.com/api', api_key='my-key',
+                                retry_policy=RetryPolicy(backoff_factor=0))
+        client.http.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            job = await client.jobs.get('flaky')
+            assert job.status == client.jobs.status.COMPLETED
+            # the check lists a single model, the 503s are retried
+            assert requests == [('GET', '/api/models', {'per-page': '1'})] + [('GET', '/api/jobs/flaky', {})] * 3
+            with pytest.raises(error.ServerError):
+                requests.clear()
+                await client.http.get('/jobs/flaky', retry=False)
+
+    asyncio.run(run())
+    assert requests == [('GET', '/api/jobs/flaky', {})]
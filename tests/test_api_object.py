@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for ApiObject and the JSON codecs."""
+
+import json
+
+import pytest
+
+from modzy._api_object import ApiList, ApiObject, wrap_json
+from modzy.codec import JsonCodec, StdlibJsonCodec, get_codec
+
+DOCUMENT = {
+    'jobIdentifier': 'abc',
+    'model': {'identifier': 'ed542963de', 'version': '1.0.1'},
+    'results': {'job': {'results.json': {'data': [{'className': 'positive', 'score': 0.9}]}}},
+    'inputs': [{'name': 'input.txt', 'acceptedMediaTypes': 'text/plain'}],
+}
+
+
+@pytest.fixture(params=['json', 'orjson', 'ujson', 'simdjson'])
+def codec(request):
+    try:
+        return get_codec(request.param)
+    except ImportError:
+        pytest.skip('{} is not installed'.format(request.param))
+
+
+def test_codec_round_trip(codec):
+    encoded = codec.encode(ApiObject(DOCUMENT))
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == DOCUMENT
+    assert codec.decode(encoded) == DOCUMENT
+
+
+def test_codec_rejects_invalid_json(codec):
+    with pytest.raises(ValueError):
+        codec.decode(b'<html>')
+
+
+def test_get_codec():
+    assert isinstance(get_codec(), JsonCodec)
+    assert isinstance(get_codec('json'), StdlibJsonCodec)
+    codec = StdlibJsonCodec()
+    assert get_codec(codec) is codec
+    with pytest.raises(ValueError):
+        get_codec('yaml')
+
+
+def test_nested_objects_are_wrapped_lazily():
+    obj = wrap_json(json.loads(json.dumps(DOCUMENT)))
+    assert type(obj) is ApiObject
+    assert type(dict.__getitem__(obj, 'model')) is dict
+    assert obj.model.identifier == 'ed542963de'
+    assert type(dict.__getitem__(obj, 'model')) is ApiObject
+    assert obj.model is obj['model']
+    assert obj.results['job']['results.json'].data[0].class_name == 'positive'
+    assert type(obj.inputs) is ApiList
+    assert obj.inputs[0].accepted_media_types == 'text/plain'
+    assert obj.get('model').version == '1.0.1'
+    assert obj.get('missing', 'default') == 'default'
+    assert all(isinstance(value, ApiObject) for value in obj.results.values())
+    assert all(isinstance(value, ApiObject) for _, value in obj.results.items())
+    assert obj == DOCUMENT
+
+
+def test_copies_wrap_nested_values():
+    for copy in (wrap_json(json.loads(json.dumps(DOCUMENT))).copy(),
+                 dict(wrap_json(json.loads(json.dumps(DOCUMENT)))),
+                 {**wrap_json(json.loads(json.dumps(DOCUMENT)))}):
+        assert type(dict.__getitem__(copy, 'model')) is ApiObject
+        assert type(dict.__getitem__(copy, 'inputs')) is ApiList
+        assert copy == DOCUMENT
+    copy = wrap_json(json.loads(json.dumps(DOCUMENT))).copy()
+    assert type(copy) is ApiObject
+    assert copy.results.job['results.json'].data[0].score == 0.9
+
+
+def test_top_level_list_is_wrapped():
+    items = wrap_json([{'identifier': 'a'}, {'identifier': 'b'}])
+    assert [item.identifier for item in items] == ['a', 'b']
+
+
+def test_snake_case_attribute_access():
+    obj = ApiObject({'jobIdentifier': 'abc', 'submittedBy': 'me', 'class': 'x'})
+    assert obj.job_identifier == obj.jobIdentifier == 'abc'
+    obj.submitted_by = 'you'
+    assert obj['submittedBy'] == 'you'
+    with pytest.raises(AttributeError):
+        obj.not_a_key
+    assert 'job_identifier' in dir(obj)
+    assert 'class' not in dir(obj)
+
+
+def test_snake_case_index_follows_key_changes():
+    obj = ApiObject({'jobIdentifier': 'abc'})
+    assert obj.job_identifier == 'abc'
+    obj['totalCount'] = 3
+    assert obj.total_count == 3
+    del obj['jobIdentifier']
+    with pytest.raises(AttributeError):
+        obj.job_identifier
+    obj.update({'jobIdentifier': 'def'})
+    assert obj.job_identifier == 'def'
+    obj.pop('jobIdentifier')
+    obj.setdefault('jobIdentifier', 'ghi')
+    assert obj.job_identifier == 'ghi'
+    del obj.job_identifier
+    assert 'jobIdentifier' not in obj
+    obj.clear()
+    with pytest.raises(AttributeError):
+        obj.total_count
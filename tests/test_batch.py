@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for pipelined batch inference."""
+
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from modzy import error
+from modzy.batch import MicroBatcher, map_inputs
+from modzy.cache import ResultCache
+from modzy.models import Model
+from modzy.results import Result
+
+
+class _FakeClient:
+    # submits jobs that complete after a random delay, inputs containing 'fail' are model failures
+
+    def __init__(self):
+        self.jobs = SimpleNamespace(submit=self.submit_text)
+        self.results = SimpleNamespace(block_until_complete=self.block_until_complete)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def submit_text(self, model, version, sources, explain=False):
+        if sources['input.txt'] == 'rejected':
+            raise error.NetworkError('rejected', 'url')
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return SimpleNamespace(job_identifier='job-' + sources['input.txt'], sources=sources)
+
+    def block_until_complete(self, job, timeout=None, poll_interval=1):
+        time.sleep(random.random() / 100)
+        with self.lock:
+            self.in_flight -= 1
+        text = job.sources['input.txt']
+        if 'fail' in text:
+            return Result({'jobIdentifier': job.job_identifier, 'finished': True,
+                           'failures': {'job': {'error': 'model crashed'}}})
+        return Result({'jobIdentifier': job.job_identifier, 'finished': True,
+                       'results': {'job': {'results.json': {'text': text}}}})
+
+
+def test_map_ordered():
+    client = _FakeClient()
+    texts = ['text-{}'.format(i) for i in range(50)]
+    texts[10], texts[20] = 'fail', 'rejected'
+    items = list(map_inputs(client, 'model', '1.0.0', ({'input.txt': text} for text in texts), concurrency=4))
+    assert [item.index for item in items] == list(range(50))
+    assert client.max_in_flight <= 4
+    assert items[0].ok and items[0].outputs['results.json'].text == 'text-0'
+    assert items[0].job_identifier == 'job-text-0'
+    assert isinstance(items[10].error, error.ResultsError)
+    assert isinstance(items[20].error, error.NetworkError) and items[20].job_identifier is None
+    assert sum(item.ok for item in items) == 48
+
+
+def test_map_unordered_and_stopped_early():
+    client = _FakeClient()
+    items = map_inputs(client, 'model', '1.0.0', ({'input.txt': str(i)} for i in range(20)), ordered=False,
+                       concurrency=5)
+    assert sorted(item.index for item in items) == list(range(20))
+
+    read = []
+    inputs = ({'input.txt': str(i)} for i in range(1000) if not read.append(i))
+    items = map_inputs(client, 'model', '1.0.0', inputs, concurrency=5)
+    assert next(items).index == 0
+    items.close()
+    assert len(read) <= 6  # inputs are read lazily
+
+    with pytest.raises(ValueError):
+        map_inputs(client, 'model', '1.0.0', [], concurrency=0)
+
+
+def test_micro_batcher():
+    client = _FakeClient()
+    jobs = []
+
+    def submit_text(model, version, sources, explain=False):
+        jobs.append(sources)
+        if any(inputs['input.txt'] == 'rejected' for inputs in sources.values()):
+            raise error.NetworkError('rejected', 'url')
+        return SimpleNamespace(job_identifier='job', sources=sources)
+
+    def block_until_complete(job, timeout=None, poll_interval=1):
+        return Result({'jobIdentifier': 'job', 'finished': True,
+                       'results': {name: {'results.json': {'text': inputs['input.txt']}}
+                                   for name, inputs in job.sources.items() if inputs['input.txt'] != 'fail'},
+                       'failures': {name: {'error': 'model crashed'}
+                                    for name, inputs in job.sources.items() if inputs['input.txt'] == 'fail'}})
+
+    client.results.block_until_complete = block_until_complete
+    with MicroBatcher(client, 'model', '1.0.0', max_sources=10, max_bytes=None, max_delay_ms=10000,
+                      submit=submit_text) as batcher:
+        futures = [batcher.submit({'input.txt': 'text-{}'.format(i)}) for i in range(25)]
+        futures.append(batcher.submit({'input.txt': 'fail'}))
+        assert futures[0].result(timeout=5)['results.json'].text == 'text-0'
+    texts = [future.result()['results.json'].text for future in futures[:25]]
+    assert texts == ['text-{}'.format(i) for i in range(25)]
+    assert isinstance(futures[25].exception(), error.ResultsError)
+    assert [len(sources) for sources in jobs] == [10, 10, 6]  # the last one flushed on close
+    with pytest.raises(RuntimeError):
+        batcher.submit({'input.txt': 'late'})
+
+    # flushed by size and by delay, a failed job fails all its inputs
+    jobs.clear()
+    batcher = MicroBatcher(client, 'model', '1.0.0', max_bytes=10, max_delay_ms=20, submit=submit_text)
+    first, second = batcher.submit({'input.txt': '123456'}), batcher.submit({'input.txt': '7890ab'})
+    assert first.result(timeout=5) and second.result(timeout=5)
+    rejected = [batcher.submit({'input.txt': 'rejected'}), batcher.submit({'input.txt': 'ok'})]
+    assert all(isinstance(future.exception(timeout=5), error.NetworkError) for future in rejected)
+    assert [len(sources) for sources in jobs] == [1, 1, 2]
+    batcher.close()
+
+    # text is counted in UTF-8 bytes
+    jobs.clear()
+    with MicroBatcher(client, 'model', '1.0.0', max_bytes=10, max_delay_ms=10000, submit=submit_text) as batcher:
+        batcher.submit({'input.txt': 'éééé'})
+        batcher.submit({'input.txt': 'abc'})
+    assert [len(sources) for sources in jobs] == [1, 1]
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(maxsize=2, path=str(tmp_path / 'results.db'))
+    image = tmp_path / 'image.png'
+    image.write_bytes(b'\x89PNG' * 1000)
+    key = cache.key('model', '1.0.0', {'image': image, 'config.json': '{}'})
+    assert key == cache.key('model', '1.0.0', {'config.json': '{}', 'image': open(str(image), 'rb')})
+    assert key == cache.key('model', '1.0.0', {'config.json': '{}', 'image': image.read_bytes()})
+    assert key != cache.key('model', '1.0.0', {'config.json': b'{}', 'image': image})
+    assert key != cache.key('model', '1.0.1', {'image': image, 'config.json': '{}'})
+    assert key == cache.key(Model({'modelId': 'model'}), '1.0.0', {'image': image, 'config.json': '{}'})
+    assert key != cache.key('model', '1.0.0', {'image': image, 'config.json': '{}'}, explain=True)
+    assert cache.key('model', '1.0.0', {'input': {'bucket': 'b', 'key': 'k'}}) is None
+
+    assert cache.get(key) is None
+    cache.put(key, {'results.json': {'label': 'cat'}})
+    outputs = cache.get(key)
+    assert outputs['results.json'].label == 'cat'
+    outputs['results.json']['label'] = 'dog'  # callers get their own copies
+    assert cache.get(key)['results.json'].label == 'cat'
+    for i in range(3):
+        cache.put(str(i), {})
+    assert len(cache) == 2
+    assert cache.get(key)['results.json'].label == 'cat'  # from disk
+    cache.close()
+
+    # shared with other processes
+    cache = ResultCache(path=str(tmp_path / 'results.db'), ttl=60)
+    assert cache.get(key)['results.json'].label == 'cat'
+    assert cache.stats() == {'hits': 0, 'disk_hits': 1, 'misses': 0, 'stores': 0, 'evictions': 0, 'size': 1}
+    cache.clear()
+    assert cache.get(key) is None
+
+
+def test_map_and_micro_batcher_use_result_cache():
+    client = _FakeClient()
+    client.result_cache = ResultCache()
+    texts = [{'input.txt': text} for text in ('a', 'b', 'a', 'fail', 'fail')]
+    items = list(map_inputs(client, 'model', '1.0.0', texts, concurrency=1))
+    assert [item.job_identifier for item in items] == ['job-a', 'job-b', None, 'job-fail', 'job-fail']
+    assert items[2].outputs == items[0].outputs
+    assert client.result_cache.stats()['hits'] == 1
+    # explainable results are cached apart
+    assert client.result_cache.key('model', '1.0.0', texts[0]) != \
+        client.result_cache.key('model', '1.0.0', texts[0], explain=True)
+    items = list(map_inputs(client, 'model', '1.0.0', texts[:1], concurrency=1, explain=True))
+    assert items[0].job_identifier == 'job-a'
+    assert client.result_cache.stats()['hits'] == 1
+
+    submitted = []
+    client.jobs.submit = lambda model, version, sources, explain: submitted.append((sources, explain))
+    with MicroBatcher(client, 'model', '1.0.0', max_delay_ms=1) as batcher:
+        future = batcher.submit({'input.txt': 'b'})
+    assert future.result()['results.json'].text == 'b'
+    assert submitted == []
+    with MicroBatcher(client, 'model', '1.0.0', max_delay_ms=1, explain=True) as batcher:
+        batcher.submit({'input.txt': 'b'})
+    assert [explain for _, explain in submitted] == [True]
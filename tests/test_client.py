@@ -3,6 +3,9 @@
 
 """Tests for `modzy` package."""
 
+import subprocess
+import sys
+
 from modzy import ApiClient
 
 
@@ -10,4 +13,20 @@ def test_can_construct_client():
     client = ApiClient('https://example.com', 'my-key')
     assert client is not None
 
+
+def test_import_does_not_load_optional_stacks():
+    # grpc, protobuf, boto3 and httpx are only needed by the edge client, storagegrid checks and
+    # the asyncio client, keep them out of `import modzy`
+    code = ("import sys, modzy; "
+            "print(' '.join(m for m in ('grpc', 'google.protobuf', 'boto3', 'botocore', 'httpx') "
+            "if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE).stdout.decode().split()
+    assert loaded == []
+
+
+def test_lazy_attributes():
+    import modzy
+    assert 'EdgeClient' in dir(modzy)
+    assert modzy.AsyncApiClient.__name__ == 'AsyncApiClient'
+
 # TODO: actual test suite
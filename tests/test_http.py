@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the HttpClient using a local HTTP server."""
+
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from modzy import ApiClient, error
+from modzy.cache import DiscoveryCache, MetadataCache
+from modzy.http import HttpClient
+from modzy.metrics import Histogram, MetricsRegistry, route_template
+from modzy.results import Result, Results
+from modzy.retry import RetryPolicy
+
+
+@pytest.fixture()
+def api_client(server):
+    return SimpleNamespace(base_url=server, api_key='my-key', cert=None)
+
+
+@pytest.fixture()
+def retry():
+    return RetryPolicy(total=3, backoff_factor=0)
+
+
+def test_get(api_client):
+    http = HttpClient(api_client)
+    assert http.get('/models').path == '/api/models'
+
+
+def test_shared_between_threads_reuses_connections(api_client):
+    http = HttpClient(api_client, pool_maxsize=8, pool_block=True)
+    with ThreadPoolExecutor(8) as executor:
+        paths = list(executor.map(lambda i: http.get('/jobs/{}'.format(i)).path, range(200)))
+    assert paths == ['/api/jobs/{}'.format(i) for i in range(200)]
+    stats, = http.pool_stats().values()
+    assert stats['requests'] == 200
+    assert stats['connections'] <= 8
+    assert stats['reused'] == stats['requests'] - stats['connections']
+    assert stats['reuse_rate'] > 0.9
+
+
+def test_retries_transient_errors(handler, api_client, retry):
+    handler.failures['/api/jobs/retried'] = (503, 2)
+    http = HttpClient(api_client, retry_policy=retry)
+    assert http.get('/jobs/retried').path == '/api/jobs/retried'
+
+
+def test_gives_up_after_total_retries(handler, api_client, retry):
+    handler.failures['/api/jobs/down'] = (502, 10)
+    http = HttpClient(api_client, retry_policy=retry)
+    with pytest.raises(error.ServerError):
+        http.get('/jobs/down')
+    assert handler.failures['/api/jobs/down'] == (502, 6)
+
+
+def test_does_not_retry_non_idempotent_requests(handler, api_client, retry):
+    handler.failures['/api/jobs'] = (503, 1)
+    http = HttpClient(api_client, retry_policy=retry)
+    with pytest.raises(error.ServerError):
+        http.post('/jobs', {'model': 'abc'})
+    handler.failures['/api/jobs'] = (429, 1)
+    assert http.post('/jobs', {'model': 'abc'}).method == 'POST'
+
+
+def test_per_call_override(handler, api_client, retry):
+    handler.failures['/api/jobs/override'] = (503, 1)
+    http = HttpClient(api_client, retry_policy=retry)
+    with pytest.raises(error.ServerError):
+        http.get('/jobs/override', retry=False)
+    assert http.get('/jobs/override').path == '/api/jobs/override'
+
+
+def test_retries_connection_errors(retry):
+    http = HttpClient(SimpleNamespace(base_url='http://127.0.0.1:9/api', api_key='my-key', cert=None),
+                      retry_policy=retry)
+    with pytest.raises(error.NetworkError):
+        http.post('/jobs', {'model': 'abc'})
+
+
+def test_backoff_is_bounded():
+    policy = RetryPolicy(backoff_factor=1, backoff_max=4)
+    for retry_number in range(10):
+        assert 0 <= policy.get_backoff(retry_number) <= min(4, 2 ** retry_number)
+
+
+RESULT = {
+    'jobIdentifier': 'abc',
+    'finished': True,
+    'results': {
+        'first': {'results.json': {'score': 0.5}},
+        'second': {'second': {'results.json': {'score': [1, 2]}}},
+    },
+    'failures': {'third': {'error': 'model crashed'}},
+}
+
+
+def test_stream(handler, api_client):
+    handler.bodies['/api/results/abc'] = json.dumps(RESULT).encode('utf-8')
+    http = HttpClient(api_client)
+    with http.stream('GET', '/results/abc') as body:
+        assert json.loads(body.read()) == RESULT
+    with pytest.raises(error.NotFoundError):
+        handler.failures['/api/results/missing'] = (404, 1)
+        with http.stream('GET', '/results/missing', retry=False):
+            pass
+
+
+def test_iter_source_outputs(handler, api_client):
+    handler.bodies['/api/results/abc'] = json.dumps(RESULT).encode('utf-8')
+    results = Results(SimpleNamespace(http=HttpClient(api_client)))
+    streamed = list(results.iter_source_outputs('abc'))
+    assert [name for name, _ in streamed] == ['first', 'second', 'third']
+    assert streamed[0][1]['results.json'].score == 0.5
+    assert streamed[1][1] == {'results.json': {'score': [1, 2]}}
+    assert isinstance(streamed[2][1], error.ResultsError)
+    assert str(streamed[2][1]) == 'model crashed'
+    with pytest.raises(error.ResultsError):
+        list(results.iter_source_outputs('abc', raise_failures=True))
+
+    result = Result(RESULT)
+    assert [(name, str(outputs)) for name, outputs in result.iter_source_outputs()] == \
+        [(name, str(outputs)) for name, outputs in streamed]
+    assert result.get_source_outputs('second') == streamed[1][1]
+    with pytest.raises(error.ResultsError):
+        result.get_source_outputs('third')
+
+
+@pytest.mark.parametrize('url, route', [
+    ('https://host/api/jobs/2b9a9c2c-6a62-4b6d-8e4d-000000000001', '/jobs/{job}'),
+    ('https://host/api/jobs/history?status=all', '/jobs/history'),
+    ('https://host/api/jobs/2b9a9c2c-6a62-4b6d-8e4d-000000000001/close', '/jobs/{job}/close'),
+    ('https://host/api/jobs/2b9a9c2c-6a62-4b6d-8e4d-000000000001/input/file.dat', '/jobs/{job}/{source}/{input}'),
+    ('https://host/api/results/abc', '/results/{job}'),
+    ('https://host/api/models/ed542963de/versions/1.0.1/sample-input',
+     '/models/{model}/versions/{version}/sample-input'),
+    ('https://host/api/models/tags/language_and_text', '/models/tags/{tag}'),
+    ('https://host/api/models/requirements/account', '/models/requirements/account'),
+])
+def test_route_template(url, route):
+    assert route_template(url, 'https://host/api/') == route
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 5
+    assert snapshot['buckets'] == {1: 1, 2: 3, 4: 4, float('inf'): 5}
+    assert 1 <= snapshot['p50'] <= 2
+    assert 4 <= snapshot['p99'] <= 10
+
+
+def test_metrics(handler, api_client, retry):
+    http = HttpClient(api_client, retry_policy=retry)
+    metrics = MetricsRegistry().instrument(http)
+    seen = []
+    http.add_hook('before_request', lambda info: 1 / 0)  # failing hooks don't break requests
+    http.add_hook('after_request', seen.append)
+    handler.failures['/api/jobs/2b9a9c2c-6a62-4b6d-8e4d-000000000002'] = (503, 1)
+    http.get('/jobs/2b9a9c2c-6a62-4b6d-8e4d-000000000002')
+    http.get('/jobs/2b9a9c2c-6a62-4b6d-8e4d-000000000003')
+    http.post('/jobs', {'model': 'abc'})
+    handler.failures['/api/results/missing'] = (404, 1)
+    with pytest.raises(error.NotFoundError):
+        http.get('/results/missing')
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot) == {'GET /jobs/{job}', 'POST /jobs', 'GET /results/{job}'}
+    jobs = snapshot['GET /jobs/{job}']
+    assert jobs['latency']['count'] == 2
+    assert jobs['statuses'] == {200: 2}
+    assert jobs['retries'] == 1
+    assert jobs['response_bytes'] > 0
+    assert snapshot['POST /jobs']['request_bytes'] == len(b'{"model":"abc"}')
+    assert snapshot['GET /results/{job}']['errors'] == {'NotFoundError': 1}
+    assert [info.status_code for info in seen] == [200, 200, 200, 404]
+
+    text = metrics.to_prometheus()
+    assert 'modzy_http_request_duration_seconds_count{method="GET",route="/jobs/{job}"} 2' in text
+    assert 'modzy_http_errors_total{method="GET",route="/results/{job}",error="NotFoundError"} 1' in text
+    assert 'modzy_http_request_duration_seconds_bucket{method="POST",route="/jobs",le="+Inf"} 1' in text
+
+    metrics.uninstrument(http)
+    http.get('/jobs/2b9a9c2c-6a62-4b6d-8e4d-000000000003')
+    assert metrics.snapshot()['GET /jobs/{job}']['latency']['count'] == 2
+
+
+def test_metadata_cache(handler, api_client):
+    cache = MetadataCache(ttl=60)
+    http = HttpClient(api_client, cache=cache)
+    first = http.get('/models/cached', cached=True)
+    first['path'] = 'changed'  # callers get their own copies
+    assert http.get('/models/cached', cached=True).path == '/api/models/cached'
+    assert http.request('GET', '/models/cached', cached=True, raw=True) == {
+        'path': '/api/models/cached', 'method': 'GET'}
+    http.get('/models/cached')
+    assert handler.hits['/api/models/cached'] == 2
+    assert cache.stats()['hits'] == 2
+
+    assert http.invalidate_cache('/models') == 1
+    http.get('/models/cached', cached=True)
+    assert handler.hits['/api/models/cached'] == 3
+
+
+def test_metadata_cache_revalidation(handler, api_client):
+    handler.etags['/api/models/etag'] = '"v1"'
+    cache = MetadataCache(ttl=0)
+    http = HttpClient(api_client, cache=cache)
+    assert http.get('/models/etag', cached=True).path == '/api/models/etag'
+    assert http.get('/models/etag', cached=True).path == '/api/models/etag'
+    assert handler.hits['/api/models/etag'] == 2
+    assert cache.stats()['revalidated'] == 1
+
+
+def test_metadata_cache_eviction():
+    cache = MetadataCache(maxsize=2)
+    for key in 'abc':
+        cache.put(key, b'{}')
+    assert cache.get('a') is None
+    assert cache.get('c').body == b'{}'
+    assert cache.stats()['evictions'] == 1
+    assert len(cache) == 2
+
+
+def test_coalesces_concurrent_gets(handler, api_client):
+    handler.delays['/api/jobs/slow'] = 0.5
+    http = HttpClient(api_client, pool_maxsize=8, coalesce=True)
+    metrics = MetricsRegistry().instrument(http)
+    barrier = threading.Barrier(8)
+
+    def get(_):
+        barrier.wait()
+        return http.get('/jobs/slow')
+
+    with ThreadPoolExecutor(8) as executor:
+        jobs = list(executor.map(get, range(8)))
+    assert handler.hits['/api/jobs/slow'] == 1
+    assert all(job.path == '/api/jobs/slow' for job in jobs)
+    assert len(set(map(id, jobs))) == 8  # every caller gets its own copy
+    assert metrics.snapshot()['GET /jobs/{job}']['coalesced'] == 7
+
+    http.get('/jobs/slow', coalesce=False)
+    assert handler.hits['/api/jobs/slow'] == 2
+
+
+def test_api_client_checks_base_url_lazily(server, handler):
+    root = server[:-len('/api')]
+    handler.failures['/models?per-page=1'] = (404, 100)
+    handler.hits.clear()
+    client = ApiClient(root, 'my-key')
+    assert handler.hits == {}
+    assert client.http.get('/jobs/lazy').path == '/api/jobs/lazy'
+    assert client.base_url == root + '/api/'
+    client.http.get('/jobs/lazy')
+    assert handler.hits == {'/models?per-page=1': 1, '/api/models?per-page=1': 1, '/api/jobs/lazy': 2}
+
+    handler.failures['/missing/api/models?per-page=1'] = (401, 100)
+    with pytest.raises(ValueError):
+        ApiClient(root + '/missing/api', 'my-key').verify()
+    with pytest.raises(ValueError):
+        ApiClient(root, '')
+
+    # a failed check leaves the base url alone and runs again on the next request
+    handler.failures['/api/models?per-page=1'] = (500, 1)
+    client = ApiClient(root, 'my-key', retry_policy=RetryPolicy(total=0))
+    with pytest.raises(error.ServerError):
+        client.jobs.get('job')
+    assert client.base_url == root
+    assert client.http.get('/jobs/lazy').path == '/api/jobs/lazy'
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        closed = 'http://127.0.0.1:{}'.format(unused.getsockname()[1])
+    client = ApiClient(closed, 'my-key', retry_policy=RetryPolicy(total=0))
+    with pytest.raises(error.NetworkError):
+        client.models.get('model')
+    assert client.base_url == closed
+
+
+def test_discovery_cache(server, handler, tmp_path):
+    root = server[:-len('/api')]
+    handler.failures['/models?per-page=1'] = (404, 100)
+    handler.bodies['/api/jobs/features'] = json.dumps({'inputChunkMaximumSize': '1M'}).encode('utf-8')
+    handler.hits.clear()
+    cache = DiscoveryCache(str(tmp_path), ttl=60)
+    client = ApiClient(root, 'my-key', discovery_cache=cache)
+    assert client.jobs.get_features().input_chunk_maximum_size == '1M'
+    assert client.base_url == root + '/api/'
+
+    # a second process starts warm: no base url check and no features request
+    handler.hits.clear()
+    client = ApiClient(root, 'my-key', discovery_cache=DiscoveryCache(str(tmp_path)))
+    assert client.jobs.get_features().input_chunk_maximum_size == '1M'
+    assert client.http.get('/jobs/warm').path == '/api/jobs/warm'
+    assert handler.hits == {'/api/jobs/warm': 1}
+    assert all('my-key' not in path.read_text() for path in tmp_path.iterdir())
+
+    # entries are not shared between api keys
+    assert cache.get(root, 'other-key', 'job_features') is None
+    cache.clear(root, 'my-key')
+    assert list(tmp_path.iterdir()) == []
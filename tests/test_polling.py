@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the poll schedules."""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from modzy import error
+from modzy.jobs import Job, Jobs
+from modzy.polling import (DecorrelatedJitterSchedule, EtaSchedule, ExponentialSchedule, FixedSchedule,
+                           get_schedule)
+from modzy.results import Result, Results
+
+MODEL = {'identifier': 'ed542963de', 'version': '1.0.1'}
+
+
+def test_schedules():
+    exponential = ExponentialSchedule(initial=0.5, factor=2, max_interval=3)
+    assert [exponential.next_delay(attempt, None, 0) for attempt in range(5)] == [0.5, 1, 2, 3, 3]
+
+    jitter = DecorrelatedJitterSchedule(initial=0.5, max_interval=3)
+    previous = None
+    for attempt in range(100):
+        delay = jitter.next_delay(attempt, previous, 0)
+        assert 0.5 <= delay <= min(3, (previous or 0.5) * 3)
+        previous = delay
+
+    eta = EtaSchedule(fallback=FixedSchedule(7), min_interval=0.5, max_interval=60)
+    assert eta.next_delay(0, None, 0, None) == 7
+    # 10 of 40 inputs done in 5 seconds: 15 seconds left
+    assert eta.next_delay(1, 7, 5, {'total': 40, 'completed': 8, 'failed': 2}) == 15
+    assert eta.next_delay(1, 7, 5, {'total': 40, 'completed': 39, 'failed': 0}) == 0.5
+    assert eta.next_delay(1, 7, 5, {'total': 40, 'completed': 0, 'model': MODEL}) == 7
+    # learned from completed waits: 0.5 second per input for this model version
+    eta.observe({'total': 4, 'completed': 4, 'model': MODEL}, 2)
+    assert eta.next_delay(0, None, 1, {'total': 10, 'completed': 0, 'model': MODEL}) == 4
+    assert eta.next_delay(0, None, 20, {'total': 10, 'completed': 0, 'model': MODEL}) == 7  # overdue
+    # a job submitted 30 seconds before the wait started, 10 of 40 inputs done: 90 seconds left
+    submitted_at = (datetime.now(timezone.utc) - timedelta(seconds=30)).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + '+0000'
+    assert 89 < eta.estimate_remaining({'total': 40, 'completed': 10, 'submittedAt': submitted_at}, 1) <= 90.1
+    assert eta.estimate_remaining({'total': 40, 'completed': 10, 'submittedAt': 'yesterday'}, 1) == 3
+
+    client = SimpleNamespace(poll_schedule=eta)
+    assert get_schedule(None, client) is eta
+    assert get_schedule(jitter, client) is jitter
+    assert get_schedule(2, client).next_delay(5, 2, 10) == 2
+    with pytest.raises(ValueError):
+        ExponentialSchedule(initial=0)
+
+
+class _FakeClient:
+    # a job that completes after a number of polls, its result is not found at first
+
+    def __init__(self, polls, schedule):
+        self.polls = polls
+        self.delays = []
+        self.poll_schedule = schedule
+        self.jobs = Jobs(self)
+        self.results = Results(self)
+        self.jobs.get = self.get_job
+        self.results.get = self.get_result
+
+    def get_job(self, identifier):
+        self.polls -= 1
+        status = 'COMPLETED' if self.polls <= 0 else 'IN_PROGRESS'
+        return Job({'jobIdentifier': identifier, 'status': status, 'total': 2, 'completed': 0, 'model': MODEL}, self)
+
+    def get_result(self, identifier):
+        if self.polls > 2:
+            self.polls -= 1
+            raise error.NotFoundError('not yet', 'url', None)
+        self.polls -= 1
+        return Result({'jobIdentifier': identifier, 'finished': self.polls <= 0, 'total': 2, 'completed': 1}, self)
+
+
+def test_block_until_complete(monkeypatch):
+    slept = []
+    monkeypatch.setattr('time.sleep', slept.append)
+    schedule = ExponentialSchedule(initial=0.1, max_interval=0.4)
+    client = _FakeClient(4, schedule)
+    assert client.jobs.block_until_complete('job', timeout=None).status == 'COMPLETED'
+    assert slept == [0.1, 0.2, 0.4, 0.4]
+
+    slept.clear()
+    client.polls = 4
+    assert client.results.block_until_complete('job', timeout=None).finished
+    assert slept == [0.1, 0.2]  # a 404, then in progress, then finished
+
+    # an explicit interval, and the last poll happens at the timeout
+    slept.clear()
+    client.polls = 100
+    with pytest.raises(error.Timeout):
+        client.jobs.block_until_complete('job', timeout=0, poll_interval=3)
+    assert slept == [0]
+    assert client.polls == 99
+
+    client.poll_schedule = EtaSchedule()
+    client.polls = 1
+    client.jobs.block_until_complete(Job({'jobIdentifier': 'job', 'status': 'SUBMITTED'}, client), timeout=None)
+    assert client.poll_schedule.estimate_remaining({'total': 1, 'completed': 0, 'model': MODEL}, 0) >= 0
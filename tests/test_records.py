@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the compact listing records."""
+
+import pickle
+
+import pytest
+
+from modzy.jobs import Job
+from modzy.models import Model, ModelVersion
+from modzy.records import JobSummary, ModelSummary, TagSummary, VersionSummary
+
+JOB = {
+    'jobIdentifier': 'abc',
+    'submittedBy': 'user',
+    'model': {'identifier': 'ed542963de', 'version': '1.0.1', 'name': 'Sentiment Analysis'},
+    'status': 'COMPLETED',
+    'total': 1,
+    'completed': 1,
+    'failed': 0,
+    'explain': False,
+    'submittedAt': '2021-09-01T10:00:00.000+0000',
+    'createdAt': '2021-09-01T10:00:00.000+0000',
+    'updatedAt': '2021-09-01T10:00:05.000+0000',
+}
+
+
+def test_job_summary_from_json():
+    summary = JobSummary.from_json(JOB)
+    assert summary.job_identifier == 'abc'
+    assert summary.model_identifier == 'ed542963de'
+    assert summary.model_version == '1.0.1'
+    assert summary.explain is False
+    assert summary.to_dict() == JOB
+
+
+def test_missing_fields_are_none():
+    summary = JobSummary.from_json({'jobIdentifier': 'abc', 'model': None})
+    assert summary.status is None
+    assert summary.model_identifier is None
+    assert summary.to_dict() == {'jobIdentifier': 'abc'}
+
+
+def test_records_are_read_only_and_compact():
+    summary = JobSummary.from_json(JOB)
+    with pytest.raises(AttributeError):
+        summary.status = 'CANCELED'
+    assert not hasattr(summary, '__dict__')
+    assert pickle.loads(pickle.dumps(summary)) == summary
+    assert len({summary, JobSummary.from_json(JOB)}) == 1
+
+
+def test_records_coerce_to_identifiers():
+    assert Job._coerce_identifier(JobSummary.from_json(JOB)) == 'abc'
+    model = ModelSummary.from_json({'modelId': 'ed542963de', 'versions': ['1.0.1'], 'latestVersion': '1.0.1'})
+    assert model.identifier == 'ed542963de'
+    assert Model._coerce_identifier(model) == 'ed542963de'
+    version = VersionSummary.from_json({'version': '1.0.1', 'isActive': True})
+    assert ModelVersion._coerce_identifier(version) == '1.0.1'
+    tag = TagSummary.from_json({'identifier': 'language_and_text', 'name': 'Language and Text'})
+    assert tag.data_type is None
+    assert tag.name == 'Language and Text'
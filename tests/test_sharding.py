@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for sharded jobs."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from modzy import error
+from modzy.jobs import Job, Jobs
+from modzy.results import Result
+from modzy.sharding import shard_sources
+
+
+def test_shard_sources():
+    sources = {'source-{}'.format(i): {'input.txt': 'x' * i} for i in range(10)}
+    assert [list(shard) for shard in shard_sources(sources, max_sources=4)] == \
+        [['source-0', 'source-1', 'source-2', 'source-3'], ['source-4', 'source-5', 'source-6', 'source-7'],
+         ['source-8', 'source-9']]
+    assert [len(shard) for shard in shard_sources(sources, max_bytes=10)] == [5, 1, 1, 1, 1, 1]
+    assert [len(shard) for shard in shard_sources({'s3': {'input': {'bucket': 'b' * 8, 'key': 'k' * 8}},
+                                                   'other': {'input': {'bucket': 'b', 'key': 'k'}}},
+                                                  max_bytes=16)] == [1, 1]
+    # text is counted in UTF-8 bytes, memoryviews in bytes
+    assert [len(shard) for shard in shard_sources({'a': {'input.txt': 'ééééé'}, 'b': {'input.txt': 'x'}},
+                                                  max_bytes=10)] == [1, 1]
+    assert [len(shard) for shard in shard_sources({'a': {'input': memoryview(bytes(8)).cast('I')},
+                                                   'b': {'input': b'x'}}, max_bytes=8)] == [1, 1]
+    assert shard_sources({}) == []
+
+
+def test_submit_sharded():
+    submitted, canceled = [], []
+
+    def submit_text(model, version, sources, explain=False):
+        if 'rejected' in sources:
+            raise error.NetworkError('rejected', 'url')
+        submitted.append((sources, explain))
+        return Job({'jobIdentifier': 'job-{}'.format(len(submitted)), 'sources': sources}, client)
+
+    def block_until_complete(job, timeout=None, poll_interval=1):
+        return Result({'jobIdentifier': job.job_identifier, 'finished': True,
+                       'results': {name: {'results.json': {'source': name}} for name in job.sources}})
+
+    def cancel(job):
+        canceled.append(job)
+        return {'jobIdentifier': job, 'status': 'CANCELED'}
+
+    client = SimpleNamespace(results=SimpleNamespace(block_until_complete=block_until_complete))
+    client.jobs = Jobs(client)
+    client.jobs.cancel = cancel
+    sources = {'source-{}'.format(i): {'input.txt': str(i)} for i in range(25)}
+    sharded = client.jobs.submit_sharded(submit_text, 'model', '1.0.0', sources, max_sources=10, explain=True)
+    assert len(sharded) == 3
+    assert [len(shard) for shard, _ in submitted] == [10, 10, 5] and all(explain for _, explain in submitted)
+    result = sharded.block_until_complete()
+    assert result.finished
+    assert result.get_source_outputs('source-17')['results.json'].source == 'source-17'
+    assert [name for name, _ in result.iter_source_outputs()] == list(sources)
+    with pytest.raises(KeyError):
+        result.get_source_outputs('missing')
+
+    # a shard that can't be submitted cancels the others
+    submitted.clear()
+    sources['rejected'] = {'input.txt': 'rejected'}
+    with pytest.raises(error.NetworkError):
+        client.jobs.submit_sharded(submit_text, 'model', '1.0.0', sources, max_sources=10)
+    assert sorted(canceled) == ['job-1', 'job-2']
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the multi-job completion tracker."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from modzy import error
+from modzy.jobs import Job
+from modzy.polling import ExponentialSchedule, FixedSchedule
+from modzy.records import JobSummary
+from modzy.tracker import JobTracker
+
+
+class _FakeJobs:
+    # each job completes after being polled `rounds` times, through the history or individually
+
+    def __init__(self, rounds):
+        self.rounds = dict(rounds)
+        self.lock = threading.Lock()
+        self.gets = []
+        self.pages = []
+        self.listed = []
+
+    def get_history(self, status='all', page=None, per_page=None, compact=False):
+        assert status == 'pending' and compact
+        with self.lock:
+            self.pages.append(page)
+            if page == 1:  # a new round
+                self.listed = [identifier for identifier, remaining in self.rounds.items() if remaining > 0]
+                for identifier in self.listed:
+                    self.rounds[identifier] -= 1
+            listed = self.listed[(page - 1) * per_page:page * per_page]
+        return [JobSummary.from_json({'jobIdentifier': identifier, 'status': 'IN_PROGRESS'}) for identifier in listed]
+
+    def get(self, identifier):
+        with self.lock:
+            self.gets.append(identifier)
+            if identifier not in self.rounds:
+                raise error.NotFoundError('unknown job', 'url', SimpleNamespace(status_code=404))
+            self.rounds[identifier] -= 1
+            status = 'COMPLETED' if self.rounds[identifier] < 0 else 'IN_PROGRESS'
+        return Job({'jobIdentifier': identifier, 'status': status})
+
+
+def test_wait_all_lists_pending_jobs():
+    jobs = _FakeJobs({'job-{}'.format(i): i % 3 for i in range(25)})
+    with JobTracker(SimpleNamespace(jobs=jobs), poll_interval=0.01, page_size=10) as tracker:
+        done = tracker.wait_all(['job-{}'.format(i) for i in range(25)], timeout=5)
+        assert [job.job_identifier for job in done] == ['job-{}'.format(i) for i in range(25)]
+        assert all(job.status == 'COMPLETED' for job in done)
+        # the running jobs are learned from the history: each job is fetched once, when it's done
+        assert sorted(jobs.gets) == sorted('job-{}'.format(i) for i in range(25))
+        assert jobs.pages[:2] == [1, 2]
+        assert len(tracker) == 0
+
+
+def test_as_completed_by_priority():
+    jobs = _FakeJobs({'slow': 5, 'fast': 0, 'urgent': 0, 'never': 1000})
+    with JobTracker(SimpleNamespace(jobs=jobs), poll_interval=0.05) as tracker:
+        future = tracker.track('slow')
+        assert tracker.track(Job({'jobIdentifier': 'slow'})) is future
+        completed = tracker.as_completed(['fast', 'urgent', 'missing', 'slow'], timeout=5, priority=0)
+        tracker.track('urgent', priority=1)
+        identifiers = []
+        with pytest.raises(error.NotFoundError):
+            for job in completed:
+                identifiers.append(job.job_identifier)
+        assert jobs.gets[:3] == ['urgent', 'slow', 'fast']
+        assert future.result(timeout=5).status == 'COMPLETED'
+
+        with pytest.raises(error.Timeout):
+            tracker.wait_all(['never'], timeout=0.1)
+    assert future.done()
+    with pytest.raises(RuntimeError):
+        tracker.track('late')
+
+
+def test_poll_schedule():
+    schedule = FixedSchedule(0.01)
+    jobs = _FakeJobs({'job': 2})
+    with JobTracker(SimpleNamespace(jobs=jobs, poll_schedule=schedule)) as tracker:
+        assert tracker.poll_schedule is schedule
+        assert tracker.wait_all(['job'], timeout=5)[0].status == 'COMPLETED'
+    exponential = ExponentialSchedule(initial=0.01)
+    assert JobTracker(SimpleNamespace(jobs=jobs, poll_schedule=schedule), exponential).poll_schedule is exponential
+    assert JobTracker(SimpleNamespace(jobs=jobs), 0.5).poll_schedule.next_delay(3, 0.5, 10) == 0.5
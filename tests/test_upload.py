@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the job submissions and input uploads using a local HTTP server."""
+
+import io
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from modzy import ApiClient, error
+from modzy._upload import InputUploader, upload_key
+from modzy._util import encode_data_uri
+
+
+def test_input_uploader_bounds_concurrency():
+    lock = threading.Lock()
+    state = {'inflight': 0, 'max_inflight': 0}
+    received = {}
+
+    def post_chunk(source_name, input_name, chunk):
+        with lock:
+            state['inflight'] += 1
+            state['max_inflight'] = max(state['max_inflight'], state['inflight'])
+        time.sleep(0.01)
+        with lock:
+            state['inflight'] -= 1
+            received.setdefault((source_name, input_name), []).append(chunk)
+
+    inputs = [('source-{}'.format(i), 'input', [bytes([i, n]) for n in range(5)]) for i in range(6)]
+    InputUploader(post_chunk, 2, max_inflight_chunks=3).upload(inputs)
+    assert received == {(source, name): chunks for source, name, chunks in inputs}
+    assert state['max_inflight'] == 3
+
+    state['max_inflight'] = 0
+    InputUploader(post_chunk, 2, max_inflight_chunks=3, max_inflight_bytes=4).upload(inputs)
+    assert state['max_inflight'] == 2
+
+
+def test_submit_file(server, handler):
+    handler.bodies['/api/jobs'] = json.dumps({'jobIdentifier': 'up'}).encode('utf-8')
+    handler.bodies['/api/jobs/features'] = json.dumps({'input_chunk_maximum_size': '4i'}).encode('utf-8')
+    handler.received.clear()
+    client = ApiClient(server, 'my-key')
+    client.jobs.submit_file('model', '1.0.0', {
+        'first': {'input': b'0123456789', 'config': b'{}'},
+        'second': {'input': io.BytesIO(b'abcdefghij')},
+    })
+    for path, chunks in (('/api/jobs/up/first/input', [b'0123', b'4567', b'89']),
+                         ('/api/jobs/up/first/config', [b'{}']),
+                         ('/api/jobs/up/second/input', [b'abcd', b'efgh', b'ij'])):
+        assert len(handler.received[path]) == len(chunks)
+        for body, chunk in zip(handler.received[path], chunks):
+            assert b'\r\n' + chunk + b'\r\n' in body
+    assert '/api/jobs/up/close' in handler.hits
+
+    # the open job is canceled on the first failure
+    handler.failures['/api/jobs/up/second/input'] = (400, 100)
+    handler.hits.clear()
+    with pytest.raises(error.ClientError):
+        client.jobs.submit_file('model', '1.0.0', {
+            'first': {'input': b'0123456789'},
+            'second': {'input': b'abcdefghij'},
+        })
+    assert handler.hits['/api/jobs/up'] == 1  # DELETE
+    assert '/api/jobs/up/close' not in handler.hits
+    del handler.failures['/api/jobs/up/second/input']
+
+
+def test_submit_embedded(server, handler):
+    handler.bodies['/api/jobs'] = json.dumps({'jobIdentifier': 'embedded'}).encode('utf-8')
+    handler.received.clear()
+    client = ApiClient(server, 'my-key')
+    job = client.jobs.submit_embedded('model', '1.0.0', {'job': {'input': b'\x00' * 1000000, 'config': b'{}'}})
+    assert job.job_identifier == 'embedded'
+    body, = handler.received['/api/jobs']  # sent with a Content-Length
+    sources = json.loads(body)['input']['sources']
+    assert sources == {'job': {'input': encode_data_uri(b'\x00' * 1000000), 'config': encode_data_uri(b'{}')}}
+
+
+def test_submit_chooses_transport(server, handler, tmp_path):
+    handler.bodies['/api/jobs'] = json.dumps({'jobIdentifier': 'routed'}).encode('utf-8')
+    handler.bodies['/api/jobs/features'] = json.dumps({'input_chunk_maximum_size': '64i'}).encode('utf-8')
+    image = tmp_path / 'image.png'
+    image.write_bytes(b'\x89PNG' * 4)
+    client = ApiClient(server, 'my-key')
+
+    def submitted(sources):
+        handler.received.clear()
+        handler.hits.clear()
+        client.jobs.submit('model', '1.0.0', sources)
+        return json.loads(handler.received['/api/jobs'][0]).get('input', 'file')
+
+    assert submitted({'input.txt': 'some text'}) == {'type': 'text', 'sources': {'job': {'input.txt': 'some text'}}}
+    assert submitted({'image': image, 'config.json': '{}'}) == {'type': 'embedded', 'sources': {'job': {
+        'image': encode_data_uri(b'\x89PNG' * 4), 'config.json': encode_data_uri(b'{}')}}}
+    assert submitted({'input': bytes(49)}) == 'file'  # 68 bytes once encoded
+    assert len(handler.received['/api/jobs/routed/job/input']) == 1
+    assert submitted({'input.txt': 'x' * 100}) == 'file'
+    assert handler.received['/api/jobs/routed/job/input.txt'] and '/api/jobs/routed/close' in handler.hits
+    unseekable = SimpleNamespace(read=io.BytesIO(b'small, but of unknown size').read)
+    assert submitted({'input': unseekable}) == 'file'
+
+    # the chunk size is looked up once per client, not for each job
+    client = ApiClient(server, 'my-key')
+    handler.hits.clear()
+    for sources in ({'input.txt': 'some text'}, {'input': bytes(49)}, {'input': bytes(100)}):
+        client.jobs.submit('model', '1.0.0', sources)
+    assert handler.hits['/api/jobs/features'] == 1
+
+
+def test_submit_file_resumes_from_journal(server, handler, tmp_path):
+    handler.bodies['/api/jobs'] = json.dumps({'jobIdentifier': 'resumable'}).encode('utf-8')
+    handler.bodies['/api/jobs/resumable'] = json.dumps({'jobIdentifier': 'resumable', 'status': 'OPEN'}).encode()
+    handler.bodies['/api/jobs/features'] = json.dumps({'input_chunk_maximum_size': '4i'}).encode('utf-8')
+    first, second, journal = tmp_path / 'first.dat', tmp_path / 'second.dat', tmp_path / 'journal'
+    first.write_bytes(b'0123456789')
+    second.write_bytes(b'abcdef')
+    sources = {'job': {'first': first, 'second': str(second)}}
+    client = ApiClient(server, 'my-key')
+
+    # interrupted: the job is left open
+    handler.failures['/api/jobs/resumable/job/second'] = (400, 1)
+    handler.received.clear()
+    handler.hits.clear()
+    with pytest.raises(error.ClientError):
+        client.jobs.submit_file('model', '1.0.0', sources, max_inflight_chunks=1, journal=journal)
+    assert handler.hits['/api/jobs'] == 1
+    assert '/api/jobs/resumable' not in handler.hits
+    assert len(list(journal.iterdir())) == 1
+
+    # resumed: the chunks already acknowledged are not sent again
+    client.jobs.submit_file('model', '1.0.0', sources, max_inflight_chunks=1, journal=journal)
+    assert handler.hits['/api/jobs'] == 1
+    assert handler.hits['/api/jobs/resumable'] == 1  # GET
+    assert len(handler.received['/api/jobs/resumable/job/first']) == 3
+    assert len(handler.received['/api/jobs/resumable/job/second']) == 3
+    assert '/api/jobs/resumable/close' in handler.hits
+    assert list(journal.iterdir()) == []
+
+    # an input changed since the upload started: the job is canceled and a new upload starts
+    handler.failures['/api/jobs/resumable/job/second'] = (400, 1)
+    with pytest.raises(error.ClientError):
+        client.jobs.submit_file('model', '1.0.0', sources, max_inflight_chunks=1, journal=journal)
+    first.write_bytes(b'0123456789-changed')
+    handler.received.clear()
+    handler.hits.clear()
+    client.jobs.submit_file('model', '1.0.0', sources, max_inflight_chunks=1, journal=journal)
+    assert handler.hits['/api/jobs/resumable'] == 2  # GET and DELETE
+    assert handler.hits['/api/jobs'] == 1
+    assert len(handler.received['/api/jobs/resumable/job/first']) == 5
+    assert len(handler.received['/api/jobs/resumable/job/second']) == 2
+    assert list(journal.iterdir()) == []
+
+    # in-memory inputs are told apart by their content, unnamed file objects are not journaled
+    assert upload_key('model', '1.0.0', False, {'job': {'input': b'abc'}}) != \
+        upload_key('model', '1.0.0', False, {'job': {'input': b'xyz'}})
+    assert upload_key('model', '1.0.0', False, {'job': {'input': io.BytesIO(b'abc')}}) is None
+    handler.failures['/api/jobs/resumable/job/second'] = (400, 1)
+    with pytest.raises(error.ClientError):
+        client.jobs.submit_file('model', '1.0.0', {'job': {'second': io.BytesIO(b'abc')}}, journal=journal)
+    assert not journal.exists() or list(journal.iterdir()) == []
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the input chunking utilities."""
+
+import io
+import json
+import pathlib
+
+import pytest
+
+from modzy._util import DataUri, JsonStream, bytes_to_chunks, encode_data_uri, file_to_chunks
+
+DATA = bytes(range(256)) * 40
+
+
+def _copies(chunks):
+    return [bytes(chunk) for chunk in chunks]
+
+
+def test_bytes_to_chunks():
+    chunks = list(bytes_to_chunks(DATA, 1000))
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    assert _copies(chunks) == [DATA[i:i + 1000] for i in range(0, len(DATA), 1000)]
+    assert chunks[0].obj is DATA  # views, not copies
+
+
+@pytest.mark.parametrize('as_path', [str, pathlib.Path])
+def test_file_to_chunks_maps_paths(tmp_path, as_path):
+    path = tmp_path / 'input.dat'
+    path.write_bytes(DATA)
+    assert _copies(file_to_chunks(as_path(path), 4096)) == [DATA[:4096], DATA[4096:8192], DATA[8192:]]
+
+    (tmp_path / 'empty.dat').write_bytes(b'')
+    assert list(file_to_chunks(str(tmp_path / 'empty.dat'), 4096)) == []
+
+
+def test_file_to_chunks_reuses_a_buffer():
+    chunks = file_to_chunks(io.BytesIO(DATA), 4096)
+    first = next(chunks)
+    assert bytes(first) == DATA[:4096]
+    second = next(chunks)
+    with pytest.raises(ValueError):
+        bytes(first)  # only valid until the next chunk is requested
+    assert bytes(second) == DATA[4096:8192]
+    assert _copies(chunks) == [DATA[8192:]]
+
+
+def test_file_to_chunks_fills_chunks_from_raw_files(tmp_path):
+    path = tmp_path / 'input.dat'
+    path.write_bytes(DATA)
+    with open(str(path), 'rb', buffering=0) as file:
+        assert [len(chunk) for chunk in file_to_chunks(file, 4000)] == [4000, 4000, 2240]
+
+
+def test_file_to_chunks_rejects_text_files(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text('text')
+    with open(str(path)) as file:
+        with pytest.raises(TypeError):
+            list(file_to_chunks(file, 4096))
+
+
+def test_json_stream():
+    inputs = {'image': DATA * 10, 'config': b'{}', 'empty': b'', 'odd': bytearray(b'abcd')}
+    body = {'model': {'identifier': 'ñ', 'version': '1.0.0'},
+            'input': {'type': 'embedded', 'sources': {'job': {key: DataUri(value) for key, value in inputs.items()}}}}
+    stream = JsonStream(body)
+    encoded = b''.join(stream)
+    assert len(stream) == len(encoded)
+    assert b''.join(stream) == encoded  # can be sent again
+    assert json.loads(encoded)['input']['sources']['job'] == {key: encode_data_uri(value)
+                                                              for key, value in inputs.items()}
+    assert max(map(len, stream)) <= DataUri.BLOCK_SIZE * 4 // 3
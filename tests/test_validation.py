@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the pre-flight input validation."""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from modzy.error import InputValidationError
+from modzy.jobs import Jobs
+from modzy.models import Model
+from modzy.validation import InputValidator, _parse_size, sniff_media_type
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(100)
+VERSION = {
+    'version': '1.0.0',
+    'inputs': [
+        {'name': 'image', 'acceptedMediaTypes': 'image/png, image/jpeg', 'maximumSize': 1000},
+        {'name': 'config.json', 'acceptedMediaTypes': 'application/json', 'maximumSize': '1K'},
+    ],
+}
+
+
+class _FakeHttp:
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, raw=False, cached=False):
+        self.requests.append((method, url))
+        return VERSION
+
+    def post(self, *args):
+        raise AssertionError('no data should be sent')
+
+
+@pytest.mark.parametrize('head, media_type', [
+    (PNG, 'image/png'),
+    (b'\xff\xd8\xff\xe0' + bytes(10), 'image/jpeg'),
+    (b'RIFF\x00\x00\x00\x00WAVEfmt ', 'audio/wav'),
+    (b'\x00\x00\x00\x18ftypmp42', 'video/mp4'),
+    (b'  {"threshold": 0.5}', 'application/json'),
+    ('texte accentué'.encode('utf-8') * 100, 'text/plain'),
+    (bytes(range(256)), None),
+    (b'', None),
+])
+def test_sniff_media_type(head, media_type):
+    assert sniff_media_type(head[:512]) == media_type
+
+
+def test_validate(tmp_path):
+    http = _FakeHttp()
+    validator = InputValidator(SimpleNamespace(http=http))
+    image = tmp_path / 'image.png'
+    image.write_bytes(PNG)
+    validator.validate('model', '1.0.0', {'first': {'image': PNG, 'config.json': b'{}'},
+                                          'second': {'image': str(image), 'config.json': io.BytesIO(b'[]')}},
+                       paths=True)
+    assert http.requests == [('GET', '/models/model/versions/1.0.0')]  # the specification is cached
+
+    with pytest.raises(InputValidationError) as info:
+        validator.validate('model', '1.0.0', {
+            'too-large': {'image': PNG + bytes(1000), 'config.json': b'{}'},
+            'wrong-type': {'image': b'{"not": "an image"}', 'config.json': PNG},
+            'names': {'imag': PNG},
+        })
+    assert info.value.problems == [
+        ('too-large', 'image', 'size 1108 exceeds the maximum size 1000'),
+        ('wrong-type', 'image', 'application/json data, accepted media types are image/png, image/jpeg'),
+        ('wrong-type', 'config.json', 'image/png data, accepted media types are application/json'),
+        ('names', 'image', 'missing input'),
+        ('names', 'config.json', 'missing input'),
+        ('names', 'imag', 'unknown input, expected one of config.json, image'),
+    ]
+    assert len(http.requests) == 1
+    assert validator.get_input_specs(Model({'modelId': 'model'}), '1.0.0')['image']['maximumSize'] == 1000
+    assert len(http.requests) == 1
+
+
+@pytest.mark.parametrize('size, expected', [
+    ('1000', 1000),
+    ('1K', 1000),
+    ('4Mi', 4 * 1024 * 1024),
+    ('1.5GB', 1536 * 1024 * 1024),
+    ('lots', None),
+    ('1XB', None),
+])
+def test_parse_size(size, expected):
+    assert _parse_size(size) == expected
+
+
+def test_submit_validates_before_sending():
+    client = SimpleNamespace(http=_FakeHttp())
+    jobs = Jobs(client)
+    with pytest.raises(InputValidationError):
+        jobs.submit_embedded('model', '1.0.0', {'job': {'image': b'GIF89a', 'config.json': b'{}'}}, validate=True)
+    with pytest.raises(InputValidationError):
+        jobs.submit_file('model', '1.0.0', {'image': io.BytesIO(PNG)}, validate=True)